@@ -1,20 +1,53 @@
-from google import genai
 from google.genai import types
-import os
-import json
+import asyncio
+import time
 
-# -----------------------------
-# Safe Gemini Client Factory
-# -----------------------------
-
-def get_gemini_client():
-    api_key = os.getenv("GEMINI_API_KEY")
+from cache import LessonCache, lesson_key
+from config import (
+    GEMINI_MODEL,
+    LESSON_CACHE_SIZE,
+    LESSON_CACHE_TTL,
+    LESSON_CACHE_PATH,
+    LESSON_GROUNDING,
+    QUIZ_SIZE,
+    QUIZ_STRUCTURED_OUTPUT,
+    QUIZ_REPAIR_ATTEMPTS,
+    CHAT_CONTEXT_TOKENS,
+    CHAT_MAX_OUTPUT_TOKENS,
+    CHAT_MAX_MESSAGE_CHARS
+)
+from dispatcher import INTERACTIVE, PREFETCH
+from llm import GeminiPool
+from memory import ShortTermMemory, approx_tokens
+from prompts import LESSON_PROMPTS, PromptRegistry
+from quiz_parser import parse_quiz
+from retrieval import Retriever, section_query
+import metrics
 
-    if not api_key:
-        raise RuntimeError("GEMINI_API_KEY not set in environment")
-
-    return genai.Client(api_key=api_key)
+# Output budget per MCQ; the whole quiz used to get a flat 800
+QUIZ_TOKENS_PER_QUESTION = 160
 
+QUIZ_SCHEMA = types.Schema(
+    type=types.Type.OBJECT,
+    properties={
+        "questions": types.Schema(
+            type=types.Type.ARRAY,
+            items=types.Schema(
+                type=types.Type.OBJECT,
+                properties={
+                    "question": types.Schema(type=types.Type.STRING),
+                    "options": types.Schema(
+                        type=types.Type.ARRAY,
+                        items=types.Schema(type=types.Type.STRING)
+                    ),
+                    "answer": types.Schema(type=types.Type.STRING)
+                },
+                required=["question", "options", "answer"]
+            )
+        )
+    },
+    required=["questions"]
+)
 
 # -----------------------------
 # Learning Agent
@@ -22,36 +55,201 @@ def get_gemini_client():
 
 class LearningAgent:
 
-    def __init__(self):
-        self.model = "gemini-2.0-flash"
-
-    def generate_lesson(self, section: str):
+    def __init__(
+        self,
+        llm: GeminiPool,
+        cache: LessonCache = None,
+        retriever: Retriever = None,
+        prompts: PromptRegistry = LESSON_PROMPTS
+    ):
+        self.llm = llm
+        self.retriever = retriever
+        self.prompts = prompts
+        self.tasks = set()
+        self.model = GEMINI_MODEL
+        self.cache = cache or LessonCache(
+            max_size=LESSON_CACHE_SIZE,
+            ttl=LESSON_CACHE_TTL,
+            path=LESSON_CACHE_PATH
+        )
 
-        client = get_gemini_client()
+    async def generate_lesson(
+        self,
+        section: str,
+        pace: str = "normal",
+        attempt: int = 0,
+        priority: int = INTERACTIVE
+    ):
 
-        prompt = f"""
-You are an AWS certification tutor.
+        template = self.prompts.select(pace, attempt)
+        model = self.llm.route(self.model)
+        notes = self._notes(section)
+        key = self._lesson_key(model, template, section, notes)
 
-Teach the section: {section}
+        cached = self.cache.get(key)
 
-Respond using:
-- Concept
-- Real World Example
-- Exam Tips
-- Common Mistakes
-"""
+        if cached is not None:
+            return cached
 
-        response = client.models.generate_content(
-            model=self.model,
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                temperature=0.7,
-                max_output_tokens=1000
+        try:
+            response = await self.llm.generate(
+                model=model,
+                contents=template.render(section=section, notes=notes),
+                config=template.config,
+                priority=priority
             )
-        )
+        except Exception as e:
+            degraded = self._degraded_lesson(section, notes)
+
+            if degraded is None:
+                raise
+
+            metrics.record_error("lesson_degraded", e)
+            return degraded
+
+        self.cache.set(key, response.text)
 
         return response.text
 
+    def has_lesson(self, section: str, pace: str = "normal", attempt: int = 0):
+
+        template = self.prompts.select(pace, attempt)
+        key = self._lesson_key(
+            self.llm.route(self.model),
+            template,
+            section,
+            self._notes(section)
+        )
+
+        return self.cache.contains(key)
+
+    async def stream_lesson(self, section: str, pace: str = "normal", attempt: int = 0):
+        """
+        Yield lesson text chunks as the model produces them.
+        The full text is written to the lesson cache once complete.
+        """
+
+        template = self.prompts.select(pace, attempt)
+        model = self.llm.route(self.model)
+        notes = self._notes(section)
+        key = self._lesson_key(model, template, section, notes)
+
+        cached = self.cache.get(key)
+
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+
+        try:
+            async for chunk in self.llm.stream(
+                model=model,
+                contents=template.render(section=section, notes=notes),
+                config=template.config
+            ):
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
+        except Exception as e:
+            # Half a lesson can't be patched with a different one
+            degraded = None if parts else self._degraded_lesson(section, notes)
+
+            if degraded is None:
+                raise
+
+            metrics.record_error("lesson_degraded", e)
+            yield degraded
+            return
+
+        self.cache.set(key, "".join(parts))
+
+    def warm(self, sections, concurrency: int = 2, after=()):
+        """
+        Pregenerate every cacheable variant of each section in the
+        background, a few at a time, skipping ones already cached.
+        Waits for the `after` tasks first, e.g. the searches that fill
+        the index lessons are grounded in.
+        """
+
+        slots = asyncio.Semaphore(concurrency)
+        after = list(after)
+
+        async def fill(template, section):
+            if after:
+                await asyncio.wait(after)
+
+            notes = self._notes(section)
+            key = self._lesson_key(self.model, template, section, notes)
+
+            if self.cache.contains(key):
+                return
+
+            async with slots:
+                try:
+                    response = await self.llm.generate(
+                        model=self.model,
+                        contents=template.render(section=section, notes=notes),
+                        config=template.config,
+                        priority=PREFETCH
+                    )
+                except Exception as e:
+                    metrics.record_error("lesson_warm", e)
+                    return
+
+            self.cache.set(key, response.text)
+
+        loop = asyncio.get_running_loop()
+
+        for template in self.prompts.cacheable():
+            for section in sections:
+                task = loop.create_task(fill(template, section))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+
+    async def aclose(self):
+
+        for task in self.tasks:
+            task.cancel()
+
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def _lesson_key(self, model, template, section, notes=""):
+        return lesson_key(model, template.version, section, template.name, notes)
+
+    def _degraded_lesson(self, section: str, notes: str = ""):
+        """
+        Any cached lesson for the section, whatever its variant, model
+        or grounding, for when generation is failing.
+        """
+
+        for model in (self.model, self.llm.fallback_model):
+            if not model:
+                continue
+
+            for template in self.prompts.templates.values():
+                for grounding in dict.fromkeys((notes, "")):
+                    # Probing every variant must not skew hit/miss stats
+                    lesson = self.cache.peek(self._lesson_key(model, template, section, grounding))
+
+                    if lesson is not None:
+                        return lesson
+
+        return None
+
+    def _notes(self, section: str):
+
+        # Grounding only reads the local index, never the network
+        if not (LESSON_GROUNDING and self.retriever):
+            return ""
+
+        context = self.retriever.local_context(section_query(section))
+
+        if not context:
+            return ""
+
+        return f"\nBase the lesson on these AWS documentation notes:\n{context}\n"
+
 
 # -----------------------------
 # Assessment Agent
@@ -59,12 +257,81 @@ Respond using:
 
 class AssessmentAgent:
 
-    def generate_quiz(self, section: str):
+    def __init__(self, llm: GeminiPool):
+        self.llm = llm
+        self.model = GEMINI_MODEL
+
+    async def generate_quiz(
+        self,
+        section: str,
+        count: int = QUIZ_SIZE,
+        priority: int = INTERACTIVE
+    ):
+        """
+        Returns {"questions": [...]} with up to `count` validated questions.
+
+        Complete questions are kept from truncated or partly invalid
+        output; follow-up calls only ask for the ones still missing.
+        """
+
+        questions = []
+
+        for _ in range(QUIZ_REPAIR_ATTEMPTS + 1):
+
+            missing = count - len(questions)
+
+            if missing <= 0:
+                break
+
+            try:
+                response = await self.llm.generate(
+                    model=self.llm.route(self.model),
+                    contents=self._quiz_prompt(
+                        section,
+                        missing,
+                        [q["question"] for q in questions]
+                    ),
+                    config=self._quiz_config(missing),
+                    priority=priority
+                )
+            except Exception as e:
+                # Keep what earlier rounds produced; fail only when empty
+                if not questions:
+                    raise
 
-        client = get_gemini_client()
+                metrics.record_error("quiz_generate", e)
+                break
+
+            started = time.perf_counter()
+
+            valid, truncated, rejected = parse_quiz(response.text)
+
+            metrics.observe_stage("quiz_parse", time.perf_counter() - started)
+
+            if valid is None:
+                metrics.record_error("quiz_parse", cause="bad_json")
+                continue
+
+            if truncated:
+                metrics.record_error("quiz_parse", cause="truncated")
+            if rejected:
+                metrics.record_error("quiz_parse", cause="invalid")
+            if not (valid or truncated or rejected):
+                metrics.record_error("quiz_parse", cause="empty")
+
+            known = {q["question"] for q in questions}
+
+            for question in valid:
+                if question["question"] not in known:
+                    known.add(question["question"])
+                    questions.append(question)
+
+        return {"questions": questions[:count]}
+
+    def _quiz_prompt(self, section: str, count: int, exclude):
 
         prompt = f"""
-Generate 5 AWS certification MCQs for section: {section}
+Generate {count} AWS certification MCQs for section: {section}
 
 Return ONLY valid JSON in this format:
 
@@ -77,21 +344,87 @@ Return ONLY valid JSON in this format:
     }}
   ]
 }}
+
+The answer must be the exact text of one of the options.
 """
 
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                temperature=0.4,
-                max_output_tokens=800
+        if exclude:
+            prompt += "\nDo not repeat these questions:\n" + "\n".join(
+                f"- {question}" for question in exclude
             )
+
+        return prompt
+
+    def _quiz_config(self, count: int):
+
+        config = types.GenerateContentConfig(
+            temperature=0.4,
+            max_output_tokens=QUIZ_TOKENS_PER_QUESTION * count + 100
         )
 
-        try:
-            return json.loads(response.text)
-        except:
-            return {"questions": []}
+        if QUIZ_STRUCTURED_OUTPUT:
+            config.response_mime_type = "application/json"
+            config.response_schema = QUIZ_SCHEMA
+
+        return config
+
+# -----------------------------
+# Chat Agent
+# -----------------------------
+
+class ChatAgent:
+
+    def __init__(self, llm: GeminiPool, memory: ShortTermMemory):
+        self.llm = llm
+        self.memory = memory
+        self.model = GEMINI_MODEL
+        self.config = types.GenerateContentConfig(
+            temperature=0.7,
+            max_output_tokens=CHAT_MAX_OUTPUT_TOKENS
+        )
+
+    async def reply(self, user_id: str, message: str, section: str = None):
+        """
+        Answer one chat message; the prompt carries at most
+        CHAT_CONTEXT_TOKENS of message and history however long the
+        chat gets.
+        """
+
+        # The message comes out of the same budget; history gets the rest
+        message = message[:min(CHAT_MAX_MESSAGE_CHARS, CHAT_CONTEXT_TOKENS * 4)]
+        budget = CHAT_CONTEXT_TOKENS - approx_tokens(message)
+
+        summary, recent = self.memory.context(user_id, budget)
+
+        response = await self.llm.generate(
+            model=self.llm.route(self.model),
+            contents=self._chat_prompt(message, summary, recent, section),
+            config=self.config
+        )
+
+        self.memory.add(user_id, "user", message)
+        self.memory.add(user_id, "assistant", response.text)
+
+        return response.text
+
+    def _chat_prompt(self, message, summary, recent, section):
+
+        prompt = "You are an AWS certification tutor chatting with a learner.\n"
+
+        if section:
+            prompt += f"They are currently studying: {section}\n"
+
+        if summary:
+            prompt += "\nEarlier in the conversation:\n" + "\n".join(
+                f"- {line}" for line in summary
+            ) + "\n"
+
+        if recent:
+            prompt += "\nRecent messages:\n" + "\n".join(
+                f"{m['role']}: {m['content']}" for m in recent
+            ) + "\n"
+
+        return prompt + f"\nuser: {message}\nassistant:"
 
 # -----------------------------
 # Feedback Agent
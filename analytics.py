@@ -0,0 +1,263 @@
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+
+from curriculum import CURRICULUM
+
+# Histogram buckets: 0-9, 10-19, ..., 90-100
+BUCKETS = 10
+
+
+# -----------------------------
+# Score Matrix
+# -----------------------------
+
+class ScoreMatrix:
+    """
+    Cohort scores in columnar NumPy arrays: one row per learner, one
+    column per curriculum section.
+
+    Each cell holds the latest and best score, the running total and
+    the attempt count, so instructor reports are a handful of
+    vectorized reductions instead of a walk over per-user dicts.
+    A column belongs to its section's certification, so a learner
+    enrolled in several certifications is counted in each for the
+    sections they took there. Arrays grow by doubling; rows and
+    columns are never removed. The last cache_size distinct reports
+    are cached, least recent evicted.
+    """
+
+    def __init__(self, capacity: int = 1024, sections: int = 8, cache_size: int = 32):
+        self.rows = {}
+        self.columns = {}
+        self.section_ids = []
+        self.column_certs = []
+        self.certs = {}
+        self.cert_names = []
+        self.n = 0
+
+        self.last = np.full((capacity, sections), np.nan, dtype=np.float32)
+        self.best = np.full((capacity, sections), np.nan, dtype=np.float32)
+        self.total = np.zeros((capacity, sections), dtype=np.float32)
+        self.attempts = np.zeros((capacity, sections), dtype=np.uint32)
+
+        self.version = 0
+        self.cache_size = cache_size
+        self.cached = OrderedDict()
+
+    # ---------------------------------------------------
+    # RECORD
+    # ---------------------------------------------------
+    def record(self, user_id: str, certification: str, section_id: str, score: int):
+
+        row, col = self._cell(user_id, certification, section_id)
+
+        score = float(max(0, min(100, score)))
+        best = self.best[row, col]
+
+        self.last[row, col] = score
+        self.best[row, col] = score if np.isnan(best) else max(best, score)
+        self.total[row, col] += score
+        self.attempts[row, col] += 1
+        self.version += 1
+
+    @classmethod
+    def from_sessions(cls, sessions, **kwargs):
+        """
+        A matrix rebuilt from (user_id, SessionRecord) pairs, e.g. the
+        session store's items() at startup.
+        """
+        matrix = cls(**kwargs)
+        curriculum = CURRICULUM.current()
+
+        for user_id, session in sessions:
+            cert = curriculum.certifications.get(session.certification)
+
+            if cert is None:
+                continue
+
+            for index, attempts, total, last, best in session.section_scores():
+                if index >= len(cert.sections):
+                    continue
+
+                row, col = matrix._cell(user_id, cert.name, cert.sections[index].id)
+                matrix.last[row, col] = last
+                matrix.best[row, col] = best
+                matrix.total[row, col] = total
+                matrix.attempts[row, col] = attempts
+
+        matrix.version += 1
+        return matrix
+
+    def _cell(self, user_id, certification, section_id):
+        row = self.rows.get(user_id)
+
+        if row is None:
+            row = self.rows[user_id] = self.n
+            self.n += 1
+
+        col = self.columns.get(section_id)
+
+        if col is None:
+            code = self.certs.get(certification)
+
+            if code is None:
+                code = self.certs[certification] = len(self.cert_names)
+                self.cert_names.append(certification)
+
+            col = self.columns[section_id] = len(self.section_ids)
+            self.section_ids.append(section_id)
+            self.column_certs.append(code)
+
+        self._ensure(row + 1, col + 1)
+
+        return row, col
+
+    def _ensure(self, rows, cols):
+        capacity, width = self.last.shape
+
+        if rows <= capacity and cols <= width:
+            return
+
+        capacity = max(capacity, 1)
+        while capacity < rows:
+            capacity *= 2
+        width = max(width, cols)
+
+        def grow(array, fill):
+            shape = (capacity, width) if array.ndim == 2 else (capacity,)
+            grown = np.full(shape, fill, dtype=array.dtype)
+            grown[tuple(slice(0, d) for d in array.shape)] = array
+            return grown
+
+        self.last = grow(self.last, np.nan)
+        self.best = grow(self.best, np.nan)
+        self.total = grow(self.total, 0)
+        self.attempts = grow(self.attempts, 0)
+
+    # ---------------------------------------------------
+    # REPORT
+    # ---------------------------------------------------
+    def summary(
+        self,
+        certification: str = None,
+        pass_mark: float = 70,
+        min_attempts: int = 1,
+        top: int = 5
+    ):
+        """
+        Per-section pass rates, score percentiles and histograms, plus
+        the weakest sections; cached until the next record().
+        """
+
+        key = (certification, pass_mark, min_attempts, top)
+        cached = self.cached.get(key)
+
+        if cached and cached[0] == self.version:
+            self.cached.move_to_end(key)
+            return cached[1]
+
+        result = self._summary(certification, pass_mark, min_attempts, top)
+        self.cached[key] = (self.version, result)
+        self.cached.move_to_end(key)
+
+        while len(self.cached) > self.cache_size:
+            self.cached.popitem(last=False)
+
+        return result
+
+    def _summary(self, certification, pass_mark, min_attempts, top):
+
+        n = self.n
+        columns = np.arange(len(self.section_ids))
+
+        if certification is not None:
+            code = self.certs.get(certification, -2)
+            columns = np.flatnonzero(np.asarray(self.column_certs, dtype=np.int64) == code)
+
+        section_ids = [self.section_ids[c] for c in columns]
+        k = len(section_ids)
+        attempts = self.attempts[:n, columns]
+        # Only learners who took one of these sections
+        rows = (attempts > 0).any(axis=1)
+
+        last = self.last[:n, columns][rows]
+        best = self.best[:n, columns][rows]
+        total = self.total[:n, columns][rows]
+        attempts = attempts[rows]
+
+        learners = int(last.shape[0])
+
+        if not learners:
+            return {"learners": 0, "pass_mark": pass_mark, "sections": [], "weakest": []}
+
+        tried = attempts > 0
+        attempted = tried.sum(axis=0)
+        attempt_count = attempts.sum(axis=0)
+        passed = (last >= pass_mark).sum(axis=0)
+
+        with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+            # All-empty columns give NaN here; they are filtered below
+            warnings.simplefilter("ignore", RuntimeWarning)
+            pass_rate = passed / attempted
+            mean_last = np.nansum(last, axis=0) / attempted
+            mean_score = total.sum(axis=0) / attempt_count
+            p25, p50, p90 = np.nanpercentile(last, [25, 50, 90], axis=0)
+            mean_best = np.nansum(best, axis=0) / attempted
+
+        # One bincount over (bucket, column) pairs for every histogram
+        buckets = np.minimum(np.nan_to_num(last, nan=0) // (100 / BUCKETS), BUCKETS - 1)
+        cells = (buckets.astype(np.int64) * k + np.arange(k))[tried]
+        histogram = np.bincount(cells, minlength=BUCKETS * k).reshape(BUCKETS, k)
+
+        curriculum = CURRICULUM.current()
+        sections = []
+
+        for col in np.flatnonzero(attempted):
+            section = curriculum.sections.get(section_ids[col])
+
+            sections.append({
+                "section_id": section_ids[col],
+                "section": section.name if section else section_ids[col],
+                "certification": section.certification if section else None,
+                "learners": int(attempted[col]),
+                "attempts": int(attempt_count[col]),
+                "pass_rate": round(float(pass_rate[col]), 4),
+                "mean_latest": round(float(mean_last[col]), 2),
+                "mean_best": round(float(mean_best[col]), 2),
+                "mean_all_attempts": round(float(mean_score[col]), 2),
+                "p25": float(p25[col]),
+                "p50": float(p50[col]),
+                "p90": float(p90[col]),
+                "histogram": histogram[:, col].tolist()
+            })
+
+        # Weakest first: lowest pass rate, then lowest mean latest score
+        eligible = np.flatnonzero(attempted >= max(min_attempts, 1))
+        order = eligible[np.lexsort((mean_last[eligible], pass_rate[eligible]))]
+        by_id = {s["section_id"]: s for s in sections}
+
+        return {
+            "learners": learners,
+            "pass_mark": pass_mark,
+            "sections": sections,
+            "weakest": [
+                {
+                    "section": by_id[section_ids[col]]["section"],
+                    "pass_rate": by_id[section_ids[col]]["pass_rate"],
+                    "mean_latest": by_id[section_ids[col]]["mean_latest"]
+                }
+                for col in order[:top]
+            ]
+        }
+
+    def stats(self):
+        return {
+            "learners": self.n,
+            "sections": len(self.section_ids),
+            "bytes": int(
+                self.last.nbytes + self.best.nbytes + self.total.nbytes
+                + self.attempts.nbytes
+            )
+        }
@@ -1,9 +1,111 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
+import hashlib
+import json
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from config import (
+    QUIZ_POOL_WARM,
+    API_LIMIT_CONCURRENCY,
+    API_WORKERS,
+    API_RELOAD,
+    BATCH_MAX_USERS,
+    CHAT_MAX_MESSAGE_CHARS,
+    TRACE_RECORD_PATH,
+    TRACE_SALT
+)
+from curriculum import CURRICULUM
+from dispatcher import LLMOverloaded
 from orchestrator import Orchestrator
+from traces import TraceRecorder
+import metrics
 
-app = FastAPI()
 orch = Orchestrator()
+metrics.REGISTRY.register_collector(orch.metric_samples)
+
+# Anonymized request trace for replay.py, when enabled
+recorder = TraceRecorder(TRACE_RECORD_PATH, TRACE_SALT) if TRACE_RECORD_PATH else None
+
+# Send "X-Trace: 1" to get per-stage timings back in Server-Timing
+TRACE_HEADER = "x-trace"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled Gemini client for the whole process
+    try:
+        orch.llm.open()
+    except RuntimeError as e:
+        print(f"⚠️ {e}")
+
+    orch.warm(generate=QUIZ_POOL_WARM)
+    yield
+    await orch.aclose()
+
+    if recorder:
+        recorder.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware("http")
+async def instrument(request: Request, call_next):
+    trace = [] if request.headers.get(TRACE_HEADER) else None
+    token = metrics.current_trace.set(trace)
+    # Starlette caches the body, so the route still receives it
+    body = await request.body() if recorder else b""
+
+    metrics.IN_FLIGHT.inc("http")
+    started = time.perf_counter()
+    status = 500
+
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.IN_FLIGHT.dec("http")
+        metrics.current_trace.reset(token)
+
+        route = request.scope.get("route")
+        metrics.HTTP_SECONDS.observe(
+            route.path if route else "unmatched",
+            str(status),
+            value=elapsed
+        )
+
+        if recorder and route:
+            recorder.record(
+                request.method,
+                route.path,
+                request.path_params,
+                {
+                    key: request.query_params.getlist(key)
+                    for key in dict.fromkeys(request.query_params.keys())
+                },
+                body,
+                status,
+                elapsed
+            )
+
+    if trace is not None:
+        trace.append(("total", elapsed))
+        response.headers["Server-Timing"] = metrics.server_timing(trace)
+
+    return response
+
+
+@app.exception_handler(LLMOverloaded)
+async def llm_overloaded(request: Request, exc: LLMOverloaded):
+    return JSONResponse(
+        {"error": str(exc)},
+        status_code=503,
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))}
+    )
+
 
 class StartReq(BaseModel):
     user_id: str
@@ -14,34 +116,193 @@ class TeachReq(BaseModel):
 
 class ScoreReq(BaseModel):
     user_id: str
-    score: int
+    score: int = Field(ge=0, le=100)
+
+class AnswersReq(BaseModel):
+    user_id: str
+    quiz_id: str
+    answers: list[int]
+
+class SearchReq(BaseModel):
+    query: str
+
+class ChatReq(BaseModel):
+    user_id: str
+    message: str = Field(min_length=1, max_length=CHAT_MAX_MESSAGE_CHARS)
+
+class BulkStartReq(BaseModel):
+    user_ids: list[str] = Field(min_length=1, max_length=BATCH_MAX_USERS)
+    certification: str
+
+class BulkScoreReq(BaseModel):
+    scores: list[ScoreReq] = Field(min_length=1, max_length=BATCH_MAX_USERS)
+
+
+def conditional_json(request: Request, payload):
+    """
+    JSON response with a content ETag; 304 with no body when the
+    client's If-None-Match already has it.
+    """
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@app.get("/certifications")
+async def certifications(request: Request):
+    # Body is pre-rendered per curriculum version; clients revalidate
+    curriculum = CURRICULUM.current()
+    etag = f'"{curriculum.version}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=60"}
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    return Response(
+        curriculum.public_json,
+        media_type="application/json",
+        headers=headers
+    )
 
 
 @app.post("/start")
-def start(req: StartReq):
+async def start(req: StartReq):
     return orch.start(req.user_id, req.certification)
 
 
+@app.post("/start/batch")
+async def start_batch(req: BulkStartReq):
+    return orch.start_many(req.user_ids, req.certification)
+
+
 @app.post("/teach")
-def teach(req: TeachReq):
-    return {"lesson": orch.teach(req.user_id)}
+async def teach(req: TeachReq):
+    return {"lesson": await orch.teach(req.user_id)}
+
+
+@app.post("/teach/stream")
+async def teach_stream(req: TeachReq):
+    chunks = orch.teach_stream(req.user_id)
+
+    async def events():
+        # Each chunk is JSON-encoded so embedded newlines survive SSE framing
+        if chunks is None:
+            yield sse("error", {"error": "Session not found"})
+            return
+
+        try:
+            async for text in chunks:
+                yield sse("chunk", {"text": text})
+        except Exception as e:
+            yield sse("error", {"error": str(e)})
+            return
+
+        yield sse("done", {})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def sse(event: str, data: dict):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat")
+async def chat(req: ChatReq):
+    return {"response": await orch.chat(req.user_id, req.message)}
 
 
 @app.post("/assess")
-def assess(req: TeachReq):
-    return {"quiz": orch.assess(req.user_id)}
+async def assess(req: TeachReq):
+    return {"quiz": await orch.assess(req.user_id)}
 
 
 @app.post("/submit-score")
-def submit_score(req: ScoreReq):
+async def submit_score(req: ScoreReq):
     return orch.submit_score(req.user_id, req.score)
 
 
+@app.post("/submit-score/batch")
+async def submit_score_batch(req: BulkScoreReq):
+    return orch.import_scores((s.user_id, s.score) for s in req.scores)
+
+
+@app.post("/submit-answers")
+async def submit_answers(req: AnswersReq):
+    return orch.submit_answers(req.user_id, req.quiz_id, req.answers)
+
+
+@app.get("/progress")
+async def progress_batch(
+    request: Request,
+    user_id: list[str] = Query(min_length=1, max_length=BATCH_MAX_USERS)
+):
+    return conditional_json(request, orch.get_progress_many(user_id))
+
+
 @app.get("/progress/{user_id}")
-def progress(user_id: str):
-    return orch.get_progress(user_id)
+async def progress(request: Request, user_id: str):
+    return conditional_json(request, orch.get_progress(user_id))
+
+
+@app.get("/analytics")
+async def analytics(
+    certification: str = None,
+    pass_mark: float = Query(70, ge=0, le=100),
+    min_attempts: int = Query(1, ge=1)
+):
+    return await orch.get_analytics(certification, pass_mark, min_attempts)
+
+
+@app.post("/reviews/due")
+async def reviews_due(limit: int = Query(1000, ge=1, le=BATCH_MAX_USERS)):
+    return orch.drain_due_reviews(limit)
+
+
+@app.get("/reviews/{user_id}")
+async def reviews(user_id: str):
+    return orch.get_reviews(user_id)
+
+
+@app.post("/search")
+async def search(req: SearchReq):
+    return await orch.retriever.search(req.query)
+
+
+@app.get("/stats")
+async def stats():
+    return orch.stats()
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(
+        metrics.REGISTRY.render(),
+        media_type="text/plain; version=0.0.4"
+    )
 
 if __name__ == "__main__":
     import uvicorn
     print("🚀 Starting AWS Agentic Learning API...")
-    uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True)
+
+    # API_WORKERS > 1: one process per core. Sessions, open quizzes,
+    # review schedules, chat memory and quiz history live in
+    # STATE_BACKEND, so any worker can serve any user without sticky
+    # routing. Each worker still keeps its own question pools and
+    # analytics, so /analytics covers only the worker that answers it
+    uvicorn.run(
+        "api:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=API_WORKERS,
+        reload=API_RELOAD,
+        limit_concurrency=API_LIMIT_CONCURRENCY
+    )
@@ -1,9 +1,12 @@
 # app.py - Streamlit Frontend
 import streamlit as st
 import requests
+import time
 import uuid
 
 API_URL = "http://localhost:8000"
+# Sidebar progress is revalidated at most this often
+PROGRESS_REFRESH = 15
 
 st.set_page_config(
     page_title="AWS Learning Agent", 
@@ -17,6 +20,29 @@ if "user_id" not in st.session_state:
     st.session_state.messages = []
     st.session_state.started = False
 
+@st.cache_data(ttl=300)
+def load_certifications():
+    """Valid certification names, from the API's curriculum."""
+    r = requests.get(f"{API_URL}/certifications", timeout=10)
+    r.raise_for_status()
+    return [cert["name"] for cert in r.json()["certifications"]]
+
+def load_progress(user_id):
+    """Progress, revalidated with If-None-Match once PROGRESS_REFRESH has passed."""
+    cached = st.session_state.get("progress")
+    now = time.monotonic()
+    if cached and now - cached["at"] < PROGRESS_REFRESH:
+        return cached["body"]
+    headers = {"If-None-Match": cached["etag"]} if cached else {}
+    r = requests.get(f"{API_URL}/progress/{user_id}", headers=headers, timeout=10)
+    if r.status_code == 304:
+        body = cached["body"]
+    else:
+        r.raise_for_status()
+        body = r.json()
+    st.session_state.progress = {"etag": r.headers.get("ETag"), "body": body, "at": now}
+    return body
+
 # Sidebar
 with st.sidebar:
     st.title("☁️ AWS Learning Agent")
@@ -25,14 +51,14 @@ with st.sidebar:
     
     if not st.session_state.started:
         st.subheader("Choose Certification")
-        cert = st.selectbox(
-            "Select your path:",
-            ["AWS Cloud Practitioner", 
-             "AWS Solutions Architect Associate",
-             "AWS Developer Associate"]
-        )
+        try:
+            certifications = load_certifications()
+        except Exception as e:
+            certifications = []
+            st.error(f"Could not load certifications: {str(e)}")
+        cert = st.selectbox("Select your path:", certifications)
         
-        if st.button("🚀 Start Learning", use_container_width=True):
+        if st.button("🚀 Start Learning", use_container_width=True, disabled=not cert):
             try:
                 response = requests.post(
                     f"{API_URL}/start",
@@ -53,9 +79,7 @@ with st.sidebar:
     else:
         # Show progress
         try:
-            progress = requests.get(
-                f"{API_URL}/progress/{st.session_state.user_id}"
-            ).json()
+            progress = load_progress(st.session_state.user_id)
             
             st.success("🎓 Active Session")
             st.metric("Certification", progress.get("certification", "N/A"))
@@ -65,6 +89,7 @@ with st.sidebar:
             if st.button("🔄 Reset Session", use_container_width=True):
                 st.session_state.started = False
                 st.session_state.messages = []
+                st.session_state.pop("progress", None)
                 st.rerun()
         except Exception as e:
             st.warning("Could not load progress")
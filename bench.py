@@ -0,0 +1,406 @@
+# bench.py - Offline load benchmark
+#
+# Drives start -> teach -> assess -> submit-score -> progress flows at
+# rising concurrency against fake Gemini/Tavily backends, so no API
+# quota is spent. Results are written as JSON for comparing commits:
+#
+#   python bench.py --modes orchestrator,asgi --levels 1,10,50,100
+#   python bench.py --compare bench_results.json
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+CERTIFICATION = "AWS Cloud Practitioner"
+
+
+# -----------------------------
+# Stats
+# -----------------------------
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(samples):
+    return {
+        op: {
+            "count": len(values),
+            "mean_ms": round(sum(values) / len(values) * 1000, 2),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2)
+        }
+        for op, values in samples.items() if values
+    }
+
+
+def rss_mb(pid=None):
+    """
+    Current resident set size; falls back to peak RSS off Linux.
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+# -----------------------------
+# Targets
+# -----------------------------
+
+class OrchestratorTarget:
+    """
+    Calls Orchestrator methods directly, no HTTP.
+    """
+
+    def __init__(self):
+        from orchestrator import Orchestrator
+        self.orch = Orchestrator()
+
+    async def __aenter__(self):
+        self.orch.llm.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.orch.aclose()
+
+    async def call(self, op, user_id, score=None):
+        if op == "start":
+            return self.orch.start(user_id, CERTIFICATION)
+        if op == "teach":
+            return await self.orch.teach(user_id)
+        if op == "assess":
+            return await self.orch.assess(user_id)
+        if op == "submit":
+            return self.orch.submit_score(user_id, score)
+        return self.orch.get_progress(user_id)
+
+
+class HttpTarget:
+    """
+    Calls the FastAPI app in-process (ASGI transport) or over a socket.
+    """
+
+    def __init__(self, base_url=None):
+        self.base_url = base_url
+        self.client = None
+        self.lifespan = None
+
+    async def __aenter__(self):
+        import httpx
+
+        limits = httpx.Limits(max_connections=1000, max_keepalive_connections=1000)
+
+        if self.base_url:
+            self.client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=limits,
+                timeout=120
+            )
+        else:
+            import api
+            # ASGITransport does not run the lifespan, so enter it here
+            self.lifespan = api.lifespan(api.app)
+            await self.lifespan.__aenter__()
+            self.client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=api.app),
+                base_url="http://bench",
+                timeout=120
+            )
+
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+
+        if self.lifespan:
+            await self.lifespan.__aexit__(None, None, None)
+
+    async def call(self, op, user_id, score=None):
+        if op == "start":
+            r = await self.client.post(
+                "/start",
+                json={"user_id": user_id, "certification": CERTIFICATION}
+            )
+        elif op == "teach":
+            r = await self.client.post("/teach", json={"user_id": user_id})
+        elif op == "assess":
+            r = await self.client.post("/assess", json={"user_id": user_id})
+        elif op == "submit":
+            r = await self.client.post(
+                "/submit-score",
+                json={"user_id": user_id, "score": score}
+            )
+        else:
+            r = await self.client.get(f"/progress/{user_id}")
+
+        r.raise_for_status()
+        return r.json()
+
+
+# -----------------------------
+# Runner
+# -----------------------------
+
+OPS = ["start", "teach", "assess", "submit", "progress"]
+
+
+async def run_level(target, concurrency, flows, seed):
+    rng = random.Random(seed)
+    samples = {op: [] for op in OPS}
+    errors = {}
+    queue = asyncio.Queue()
+
+    for i in range(flows):
+        queue.put_nowait((f"bench-{seed}-{i}", rng.choice([50, 75, 95])))
+
+    async def worker():
+        while True:
+            try:
+                user_id, score = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            for op in OPS:
+                started = time.perf_counter()
+                try:
+                    await target.call(op, user_id, score)
+                except Exception as e:
+                    name = type(e).__name__
+                    errors[name] = errors.get(name, 0) + 1
+                    break
+                samples[op].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    completed = len(samples["progress"])
+
+    return {
+        "concurrency": concurrency,
+        "flows": flows,
+        "completed_flows": completed,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_flows_s": round(completed / elapsed, 2) if elapsed else 0.0,
+        "throughput_requests_s": round(
+            sum(len(v) for v in samples.values()) / elapsed, 2
+        ) if elapsed else 0.0,
+        "errors": errors,
+        "ops": summarize(samples)
+    }
+
+
+async def run_mode(mode, args):
+    server = None
+
+    if mode == "orchestrator":
+        target = OrchestratorTarget()
+    elif mode == "asgi":
+        target = HttpTarget()
+    else:
+        server = start_server(args.port)
+        target = HttpTarget(f"http://127.0.0.1:{args.port}")
+
+    results = []
+
+    try:
+        async with target:
+            for level in args.levels:
+                # tracemalloc slows every allocation, so it is opt-in
+                if args.trace_memory:
+                    tracemalloc.start()
+
+                result = await run_level(
+                    target,
+                    level,
+                    max(level, args.flows_per_level),
+                    seed=level
+                )
+
+                result["mode"] = mode
+                result["memory"] = {"client_rss_mb": rss_mb()}
+
+                if args.trace_memory:
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    result["memory"]["client_peak_traced_mb"] = round(
+                        peak / 1024 / 1024, 2
+                    )
+
+                if server:
+                    result["memory"]["server_rss_mb"] = rss_mb(server.pid)
+
+                results.append(result)
+                print_result(result)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    return results
+
+
+def start_server(port):
+    """
+    Launch api.py under uvicorn with fake backends and wait for it.
+    """
+    import httpx
+
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "api:app",
+            "--host", "127.0.0.1",
+            "--port", str(port),
+            "--log-level", "warning"
+        ],
+        env=os.environ.copy()
+    )
+
+    deadline = time.time() + 30
+
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/stats", timeout=1)
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+
+    server.terminate()
+    raise RuntimeError("API server did not start")
+
+
+# -----------------------------
+# Reporting
+# -----------------------------
+
+def print_result(result):
+    print(
+        f"{result['mode']:>12} c={result['concurrency']:<4} "
+        f"{result['throughput_requests_s']:>8} req/s  "
+        f"errors={sum(result['errors'].values())}"
+    )
+
+    for op, s in result["ops"].items():
+        print(
+            f"{'':>14}{op:<9} p50={s['p50_ms']:>8}ms "
+            f"p95={s['p95_ms']:>8}ms p99={s['p99_ms']:>8}ms"
+        )
+
+
+def compare(old_path, new_results):
+    """
+    Print throughput and p95 deltas against an earlier results file.
+    """
+    with open(old_path) as f:
+        old = {
+            (r["mode"], r["concurrency"]): r for r in json.load(f)["results"]
+        }
+
+    print("\n📊 Compared with", old_path)
+
+    for new in new_results:
+        before = old.get((new["mode"], new["concurrency"]))
+
+        if not before:
+            continue
+
+        def delta(a, b):
+            return f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+
+        print(
+            f"{new['mode']:>12} c={new['concurrency']:<4} throughput "
+            f"{delta(before['throughput_requests_s'], new['throughput_requests_s'])}"
+        )
+
+        for op, s in new["ops"].items():
+            if op in before["ops"]:
+                print(
+                    f"{'':>14}{op:<9} p95 "
+                    f"{delta(before['ops'][op]['p95_ms'], s['p95_ms'])}"
+                )
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL,
+            text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# -----------------------------
+# Entry Point
+# -----------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline tutor benchmark")
+    parser.add_argument("--modes", default="orchestrator,asgi,http")
+    parser.add_argument("--levels", default="1,10,50,100")
+    parser.add_argument("--flows-per-level", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--search-latency", type=float, default=0.3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--trace-memory", action="store_true")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results JSON to diff against")
+    args = parser.parse_args()
+    args.levels = [int(x) for x in args.levels.split(",")]
+
+    # Must be set before config is imported, here and in the server
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["SEARCH_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY"] = str(args.llm_latency)
+    os.environ["FAKE_SEARCH_LATENCY"] = str(args.search_latency)
+
+    print("🏁 Running offline benchmark...")
+
+    results = []
+
+    for mode in args.modes.split(","):
+        results += asyncio.run(run_mode(mode, args))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "llm_latency_s": args.llm_latency,
+            "search_latency_s": args.search_latency,
+            "flows_per_level": args.flows_per_level
+        },
+        "results": results
+    }
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"✅ Results saved to {args.out}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def lesson_key(model: str, prompt_version: str, section: str, variant: str, notes: str = ""):
+    """
+    Content address for a generated lesson. Grounding notes are part
+    of the prompt, so they are part of the address too.
+    """
+    parts = [model, prompt_version, section, variant]
+
+    if notes:
+        parts.append(hashlib.sha256(notes.encode("utf-8")).hexdigest())
+
+    raw = "\x1f".join(parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# -----------------------------
+# On-Disk Tier
+# -----------------------------
+
+class SQLiteTier:
+    """
+    Optional persistent tier shared across restarts.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS lessons ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def get(self, key: str, now: float):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, expires_at FROM lessons WHERE key = ?",
+                (key,)
+            ).fetchone()
+
+            if not row:
+                return None
+
+            if row[1] <= now:
+                self.conn.execute("DELETE FROM lessons WHERE key = ?", (key,))
+                self.conn.commit()
+                return None
+
+            return row
+
+    def set(self, key: str, value: str, expires_at: float):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO lessons (key, value, expires_at)"
+                " VALUES (?, ?, ?)",
+                (key, value, expires_at)
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class KVTier:
+    """
+    Second tier in a shared_state store, shared by all workers.
+    """
+
+    PREFIX = "lesson:"
+
+    def __init__(self, kv):
+        self.kv = kv
+
+    def get(self, key: str, now: float):
+        row = self.kv.get(self.PREFIX + key)
+
+        if not row:
+            return None
+
+        value, expires_at = json.loads(row)
+        return (value, expires_at) if expires_at > now else None
+
+    def set(self, key: str, value: str, expires_at: float):
+        self.kv.set(
+            self.PREFIX + key,
+            json.dumps([value, expires_at]),
+            ttl=expires_at - time.time()
+        )
+
+    def close(self):
+        pass
+
+
+# -----------------------------
+# Lesson Cache
+# -----------------------------
+
+class LessonCache:
+    """
+    Two-tier TTL + LRU cache for generated lessons.
+
+    The in-process tier is bounded by max_size; the optional second
+    tier (a SQLite file, or a shared store via KVTier) keeps entries
+    across restarts and workers and refills memory on a hit.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 512,
+        ttl: int = 86400,
+        path: str = "",
+        tier=None
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.disk = tier or (SQLiteTier(path) if path else None)
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        now = time.time()
+
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is not None:
+                value, expires_at = entry
+
+                if expires_at > now:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+
+                del self.entries[key]
+
+        if self.disk:
+            row = self.disk.get(key, now)
+
+            if row:
+                with self.lock:
+                    self._store(key, row[0], row[1])
+                    self.disk_hits += 1
+                return row[0]
+
+        with self.lock:
+            self.misses += 1
+
+        return None
+
+    def peek(self, key: str):
+        """
+        What get() would return, without counting as a lookup or
+        touching LRU order.
+        """
+        now = time.time()
+
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is not None and entry[1] > now:
+                return entry[0]
+
+        if self.disk:
+            row = self.disk.get(key, now)
+
+            if row:
+                return row[0]
+
+        return None
+
+    def contains(self, key: str):
+        """
+        Whether get() would hit, without counting as a lookup.
+        """
+        return self.peek(key) is not None
+
+    def set(self, key: str, value: str):
+        if not value:
+            return
+
+        expires_at = time.time() + self.ttl
+
+        with self.lock:
+            self._store(key, value, expires_at)
+
+        if self.disk:
+            self.disk.set(key, value, expires_at)
+
+    def _store(self, key, value, expires_at):
+        self.entries[key] = (value, expires_at)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (
+                    (self.hits + self.disk_hits) / lookups if lookups else 0.0
+                )
+            }
+
+    def close(self):
+        if self.disk:
+            self.disk.close()
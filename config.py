@@ -1,23 +1,234 @@
+import json
 import os
 
 GEMINI_API_KEY = ""
 TAVILY_API_KEY = ""
 
-CERTIFICATIONS = {
-    "AWS Cloud Practitioner": {
-        "domains": [
-            {"name": "Cloud Concepts"},
-            {"name": "Security & Compliance"},
-            {"name": "Technology"},
-            {"name": "Billing & Pricing"}
-        ]
-    },
-    "AWS Solutions Architect Associate": {
-        "domains": [
-            {"name": "Design Resilient Architectures"},
-            {"name": "Design Secure Architectures"},
-            {"name": "Design Cost-Optimized Architectures"}
-        ]
-    }
-
-}
+# -----------------------------
+# Model Settings
+# -----------------------------
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+
+# "gemini" or "fake" (canned output for benchmarks, no API quota)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "tavily")
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.5"))
+FAKE_SEARCH_LATENCY = float(os.getenv("FAKE_SEARCH_LATENCY", "0.3"))
+
+# -----------------------------
+# Gemini Connection Pool
+# -----------------------------
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+
+# -----------------------------
+# LLM Dispatcher
+# -----------------------------
+
+# Per-model quota each worker keeps under: requests and tokens per minute
+LLM_RPM = float(os.getenv("LLM_RPM", "1000"))
+LLM_TPM = float(os.getenv("LLM_TPM", "1000000"))
+# Overrides as JSON, e.g. {"gemini-2.0-flash": [2000, 4000000]}
+LLM_MODEL_LIMITS = json.loads(os.getenv("LLM_MODEL_LIMITS", "{}"))
+# Calls allowed to wait for a slot before new ones are rejected
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "256"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+
+# -----------------------------
+# Resilience
+# -----------------------------
+
+# Consecutive upstream failures that open a model's breaker, and how
+# long it stays open before a probe is let through
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+# Cheaper model used while GEMINI_MODEL's breaker is open ("" for none)
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "gemini-2.0-flash-lite")
+# Send a second attempt when the first is slower than the recent p95
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.25"))
+
+# Requests uvicorn admits before answering 503 (per worker)
+API_LIMIT_CONCURRENCY = int(os.getenv("API_LIMIT_CONCURRENCY", "1000"))
+
+# -----------------------------
+# Deployment
+# -----------------------------
+
+# More than one worker is production mode: no reload, shared state
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+API_RELOAD = API_WORKERS == 1 and os.getenv("API_RELOAD", "1") == "1"
+
+# Where sessions, open quizzes, caches, review schedules, chat memory
+# and quiz history live: "memory" (one process), "sqlite" (one file
+# shared by local workers) or "redis". With a shared backend no route
+# needs sticky routing; question pools and /analytics stay per worker
+STATE_BACKEND = os.getenv("STATE_BACKEND", "sqlite" if API_WORKERS > 1 else "memory")
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "state.db")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# -----------------------------
+# Session Store
+# -----------------------------
+
+# "memory", "sqlite" or "redis"
+SESSION_STORE = os.getenv("SESSION_STORE", STATE_BACKEND)
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+# 0 writes through, so other workers see every update immediately
+SESSION_FLUSH_INTERVAL = float(
+    os.getenv("SESSION_FLUSH_INTERVAL", "0" if API_WORKERS > 1 else "0.5")
+)
+SESSION_FLUSH_BATCH = int(os.getenv("SESSION_FLUSH_BATCH", "256"))
+# Resident cap and idle expiry for the in-memory backend
+SESSION_MAX_RESIDENT = int(os.getenv("SESSION_MAX_RESIDENT", "100000"))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", str(6 * 3600)))
+# Scores kept per session (oldest dropped first)
+SESSION_SCORE_HISTORY = 16
+
+# -----------------------------
+# Prefetch
+# -----------------------------
+
+# Next-section prefetches allowed per minute (per worker), and how
+# many may generate at once
+PREFETCH_PER_MINUTE = float(os.getenv("PREFETCH_PER_MINUTE", "30"))
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "2"))
+# Prefetch once a score is this close below the advance threshold
+PREFETCH_SCORE_MARGIN = int(os.getenv("PREFETCH_SCORE_MARGIN", "15"))
+
+# -----------------------------
+# Lesson Cache
+# -----------------------------
+
+LESSON_CACHE_SIZE = int(os.getenv("LESSON_CACHE_SIZE", "512"))
+LESSON_CACHE_TTL = int(os.getenv("LESSON_CACHE_TTL", str(24 * 3600)))
+# Empty path keeps the cache in-process only
+LESSON_CACHE_PATH = os.getenv("LESSON_CACHE_PATH", "")
+
+# -----------------------------
+# Review Scheduler
+# -----------------------------
+
+# Empty path keeps review schedules in memory only. Ignored when
+# STATE_BACKEND is shared: schedules then live in that store
+REVIEW_STATE_PATH = os.getenv("REVIEW_STATE_PATH", "")
+# Granularity of the global reminder timing wheel
+REVIEW_SLOT_SECONDS = int(os.getenv("REVIEW_SLOT_SECONDS", "60"))
+
+# -----------------------------
+# Retrieval
+# -----------------------------
+
+# "basic" is one credit and much faster; "advanced" costs two
+TAVILY_SEARCH_DEPTH = os.getenv("TAVILY_SEARCH_DEPTH", "basic")
+# Empty path keeps search cache and snippet index in memory only
+RETRIEVAL_DB_PATH = os.getenv(
+    "RETRIEVAL_DB_PATH",
+    STATE_DB_PATH if STATE_BACKEND == "sqlite" else ""
+)
+RETRIEVAL_CACHE_TTL = int(os.getenv("RETRIEVAL_CACHE_TTL", str(7 * 86400)))
+# Local BM25 answers are used only above both thresholds
+RETRIEVAL_MIN_SCORE = float(os.getenv("RETRIEVAL_MIN_SCORE", "2.0"))
+RETRIEVAL_MIN_COVERAGE = float(os.getenv("RETRIEVAL_MIN_COVERAGE", "0.6"))
+# Add locally indexed AWS docs snippets to lesson prompts
+LESSON_GROUNDING = os.getenv("LESSON_GROUNDING", "1") == "1"
+
+# -----------------------------
+# Quiz Bank
+# -----------------------------
+
+QUIZ_SIZE = 5
+QUIZ_POOL_LOW_WATER = int(os.getenv("QUIZ_POOL_LOW_WATER", "10"))
+QUIZ_POOL_HIGH_WATER = int(os.getenv("QUIZ_POOL_HIGH_WATER", "25"))
+QUIZ_REFILL_WORKERS = int(os.getenv("QUIZ_REFILL_WORKERS", "2"))
+# Fill every section's pool when the API starts
+QUIZ_POOL_WARM = os.getenv("QUIZ_POOL_WARM", "1") == "1"
+# Ask Gemini for schema-constrained JSON instead of free text
+QUIZ_STRUCTURED_OUTPUT = os.getenv("QUIZ_STRUCTURED_OUTPUT", "1") == "1"
+# Ungraded quizzes are discarded after this many seconds
+QUIZ_SESSION_TTL = int(os.getenv("QUIZ_SESSION_TTL", "3600"))
+# Follow-up calls allowed to replace truncated or invalid questions
+QUIZ_REPAIR_ATTEMPTS = int(os.getenv("QUIZ_REPAIR_ATTEMPTS", "2"))
+
+# -----------------------------
+# Question Store
+# -----------------------------
+
+# Estimated word-bigram Jaccard at which a new question counts as a repeat
+QUESTION_DEDUP_THRESHOLD = float(os.getenv("QUESTION_DEDUP_THRESHOLD", "0.7"))
+# Questions kept per worker; past that the oldest make way for new ones
+QUESTION_STORE_MAX = int(os.getenv("QUESTION_STORE_MAX", "50000"))
+
+# -----------------------------
+# Chat
+# -----------------------------
+
+# Recent turns kept verbatim per user; older ones are summarized
+CHAT_HISTORY_TURNS = int(os.getenv("CHAT_HISTORY_TURNS", "20"))
+CHAT_SUMMARY_LINES = int(os.getenv("CHAT_SUMMARY_LINES", "20"))
+CHAT_MAX_USERS = int(os.getenv("CHAT_MAX_USERS", "10000"))
+# With a shared STATE_BACKEND, chats idle this long are dropped
+CHAT_MEMORY_TTL = float(os.getenv("CHAT_MEMORY_TTL", str(6 * 3600)))
+# Prompt tokens spent on history plus the new message, and the reply's
+# output budget
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "1500"))
+CHAT_MAX_OUTPUT_TOKENS = int(os.getenv("CHAT_MAX_OUTPUT_TOKENS", "600"))
+# Longest chat message accepted, about 1000 tokens
+CHAT_MAX_MESSAGE_CHARS = int(os.getenv("CHAT_MAX_MESSAGE_CHARS", "4000"))
+
+# -----------------------------
+# Event Log
+# -----------------------------
+
+# Directory for the session event log and its snapshots; empty disables
+# it. One process per directory: startup fails if API_WORKERS > 1.
+EVENT_LOG_DIR = os.getenv("EVENT_LOG_DIR", "")
+# Buffered events are written and fsynced this often; 0 syncs each event
+EVENT_LOG_FSYNC_INTERVAL = float(os.getenv("EVENT_LOG_FSYNC_INTERVAL", "0.2"))
+EVENT_LOG_SNAPSHOT_EVERY = int(os.getenv("EVENT_LOG_SNAPSHOT_EVERY", "10000"))
+# Keep segments a snapshot covers, as a full history for offline analysis
+EVENT_LOG_KEEP_HISTORY = os.getenv("EVENT_LOG_KEEP_HISTORY", "0") == "1"
+
+# -----------------------------
+# Analytics
+# -----------------------------
+
+# With a SQLite or shared session store, /analytics is rebuilt from it
+# at most this often so it includes scores other workers recorded
+ANALYTICS_REFRESH_SECONDS = float(os.getenv("ANALYTICS_REFRESH_SECONDS", "60"))
+
+# -----------------------------
+# Batch APIs
+# -----------------------------
+
+# Most learners one bulk progress/start/score request may name
+BATCH_MAX_USERS = int(os.getenv("BATCH_MAX_USERS", "1000"))
+
+# -----------------------------
+# Traffic Recording
+# -----------------------------
+
+# JSONL file that receives an anonymized trace of every API request,
+# for replay.py; empty disables recording
+TRACE_RECORD_PATH = os.getenv("TRACE_RECORD_PATH", "")
+# Key for user id pseudonyms; set it when several workers record
+TRACE_SALT = os.getenv("TRACE_SALT", "")
+
+# -----------------------------
+# Curriculum
+# -----------------------------
+
+# Certifications and their domains, in teaching order
+CURRICULUM_PATH = os.getenv(
+    "CURRICULUM_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "curriculum.json")
+)
+# How often each worker checks the file for edits
+CURRICULUM_RELOAD_INTERVAL = float(os.getenv("CURRICULUM_RELOAD_INTERVAL", "5"))
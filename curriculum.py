@@ -0,0 +1,276 @@
+import hashlib
+import json
+import os
+import sys
+import time
+from types import MappingProxyType
+from typing import NamedTuple
+
+from config import CURRICULUM_PATH, CURRICULUM_RELOAD_INTERVAL
+
+
+class CurriculumError(ValueError):
+    """
+    The curriculum file is malformed or inconsistent.
+    """
+
+
+class Section(NamedTuple):
+    id: str
+    name: str
+    certification: str
+    index: int
+    weight: float
+    prev: str
+    next: str
+
+
+class Certification(NamedTuple):
+    id: str
+    name: str
+    sections: tuple
+
+
+# -----------------------------
+# Validation
+# -----------------------------
+
+def validate(data):
+    """
+    Every problem in a parsed curriculum file; empty when valid.
+    """
+    problems = []
+
+    certs = data.get("certifications") if isinstance(data, dict) else None
+
+    if not isinstance(certs, list) or not certs:
+        return ["'certifications' must be a non-empty list"]
+
+    cert_ids, cert_names, section_ids = set(), set(), set()
+
+    for i, cert in enumerate(certs):
+        where = f"certifications[{i}]"
+
+        if not isinstance(cert, dict):
+            problems.append(f"{where} must be an object")
+            continue
+
+        for field, seen in (("id", cert_ids), ("name", cert_names)):
+            value = cert.get(field)
+
+            if not isinstance(value, str) or not value.strip():
+                problems.append(f"{where}.{field} must be a non-empty string")
+            elif value in seen:
+                problems.append(f"{where}.{field} {value!r} is duplicated")
+            else:
+                seen.add(value)
+
+        domains = cert.get("domains")
+
+        if not isinstance(domains, list) or not domains:
+            problems.append(f"{where}.domains must be a non-empty list")
+            continue
+
+        names = set()
+
+        for j, domain in enumerate(domains):
+            at = f"{where}.domains[{j}]"
+
+            if not isinstance(domain, dict):
+                problems.append(f"{at} must be an object")
+                continue
+
+            for field, seen in (("id", section_ids), ("name", names)):
+                value = domain.get(field)
+
+                if not isinstance(value, str) or not value.strip():
+                    problems.append(f"{at}.{field} must be a non-empty string")
+                elif value in seen:
+                    problems.append(f"{at}.{field} {value!r} is duplicated")
+                else:
+                    seen.add(value)
+
+            weight = domain.get("weight", 1)
+
+            if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight <= 0:
+                problems.append(f"{at}.weight must be a positive number")
+
+    return problems
+
+
+# -----------------------------
+# Curriculum Index
+# -----------------------------
+
+class Curriculum:
+    """
+    Immutable index over one version of the curriculum file.
+
+    IDs and names are interned; sections link to their neighbours by
+    id, so every lookup the request path needs is a dict hit.
+    """
+
+    def __init__(self, data: dict, version: str = ""):
+        problems = validate(data)
+
+        if problems:
+            raise CurriculumError("; ".join(problems))
+
+        certifications = {}
+        sections = {}
+        by_name = {}
+
+        for cert in data["certifications"]:
+            cert_name = sys.intern(cert["name"])
+            ids = [sys.intern(d["id"]) for d in cert["domains"]]
+
+            chain = tuple(
+                Section(
+                    id=ids[i],
+                    name=sys.intern(domain["name"]),
+                    certification=cert_name,
+                    index=i,
+                    weight=float(domain.get("weight", 1)),
+                    prev=ids[i - 1] if i > 0 else None,
+                    next=ids[i + 1] if i + 1 < len(ids) else None
+                )
+                for i, domain in enumerate(cert["domains"])
+            )
+
+            certifications[cert_name] = Certification(
+                sys.intern(cert["id"]),
+                cert_name,
+                chain
+            )
+
+            for section in chain:
+                sections[section.id] = section
+                by_name[(cert_name, section.name)] = section
+
+        self.version = version
+        self.certifications = MappingProxyType(certifications)
+        self.sections = MappingProxyType(sections)
+        self.by_name = MappingProxyType(by_name)
+
+        # Rendered once per version for the /certifications endpoint
+        self.public_json = json.dumps({
+            "version": version,
+            "certifications": [
+                {
+                    "id": cert.id,
+                    "name": cert.name,
+                    "sections": [
+                        {"id": s.id, "name": s.name, "weight": s.weight}
+                        for s in cert.sections
+                    ]
+                }
+                for cert in certifications.values()
+            ]
+        }).encode("utf-8")
+
+    def certification(self, name: str):
+        return self.certifications.get(name)
+
+    def section_names(self):
+        return [section.name for section in self.sections.values()]
+
+    def check_compatible(self, previous):
+        """
+        Sessions store section positions, so a reload may add sections
+        after the existing ones but not remove or reorder them.
+        """
+        for name, cert in previous.certifications.items():
+            current = self.certifications.get(name)
+
+            if current is None:
+                raise CurriculumError(f"certification {name!r} was removed")
+
+            old_ids = [s.id for s in cert.sections]
+            new_ids = [s.id for s in current.sections[:len(old_ids)]]
+
+            if new_ids != old_ids:
+                raise CurriculumError(f"sections of {name!r} were removed or reordered")
+
+
+# -----------------------------
+# Hot-Reloading Store
+# -----------------------------
+
+class CurriculumStore:
+    """
+    The live curriculum for this process.
+
+    current() re-stats the file at most every `interval` seconds and
+    swaps in a new index when it changed, so edits reach every worker
+    without a restart. A bad edit is reported and the previous index
+    stays in use.
+    """
+
+    def __init__(self, path: str, interval: float = 5.0):
+        self.path = path
+        self.interval = interval
+        self.mtime = os.stat(path).st_mtime_ns
+        self.checked = time.monotonic()
+        self.curriculum = self._load()
+
+        self.reloads = 0
+        self.errors = 0
+        self.last_error = None
+
+    def current(self):
+        now = time.monotonic()
+
+        if now - self.checked >= self.interval:
+            self.checked = now
+            self.reload_if_changed()
+
+        return self.curriculum
+
+    def reload_if_changed(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+
+        if mtime == self.mtime:
+            return False
+
+        self.mtime = mtime
+
+        try:
+            curriculum = self._load()
+            curriculum.check_compatible(self.curriculum)
+        except (OSError, ValueError) as e:
+            self.errors += 1
+            self.last_error = str(e)
+            print(f"⚠️ Curriculum reload failed, keeping {self.curriculum.version}: {e}")
+            return False
+
+        self.curriculum = curriculum
+        self.reloads += 1
+
+        return True
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            raw = f.read()
+
+        return Curriculum(
+            json.loads(raw),
+            version=hashlib.sha256(raw).hexdigest()[:16]
+        )
+
+    def stats(self):
+        curriculum = self.current()
+
+        return {
+            "version": curriculum.version,
+            "certifications": len(curriculum.certifications),
+            "sections": len(curriculum.sections),
+            "reloads": self.reloads,
+            "reload_errors": self.errors,
+            "last_error": self.last_error
+        }
+
+
+CURRICULUM = CurriculumStore(CURRICULUM_PATH, CURRICULUM_RELOAD_INTERVAL)
@@ -0,0 +1,327 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+
+import httpx
+
+import metrics
+
+# Priority classes, lowest value served first
+INTERACTIVE = 0
+PREFETCH = 1
+
+# Upstream statuses worth another try after a pause
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class LLMOverloaded(RuntimeError):
+    """
+    Raised at once, instead of queueing, when the dispatcher is full.
+    """
+
+    def __init__(
+        self,
+        retry_after: float,
+        message: str = "LLM dispatcher queue is full, try again shortly"
+    ):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """
+    The priority of one logical call across its retries. promote()
+    can raise it while the call waits, e.g. when a learner joins a
+    prefetch for the same prompt.
+    """
+
+    __slots__ = ("priority", "future")
+
+    def __init__(self, priority: int):
+        self.priority = priority
+        self.future = None
+
+
+def is_retryable(exc: BaseException):
+    if isinstance(exc, (httpx.TransportError, asyncio.TimeoutError, TimeoutError)):
+        return True
+
+    return getattr(exc, "code", None) in RETRYABLE_STATUS
+
+
+# -----------------------------
+# Token Bucket
+# -----------------------------
+
+class TokenBucket:
+    """
+    Refills at rate_per_minute, holding at most one minute's worth.
+    The level may go negative when actual usage beats the estimate.
+    """
+
+    __slots__ = ("rate", "capacity", "level", "updated")
+
+    def __init__(self, rate_per_minute: float):
+        self.rate = rate_per_minute / 60
+        self.capacity = float(rate_per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float):
+        """
+        Seconds until `amount` can be taken; 0 if it can be taken now.
+        """
+        self._refill(now)
+        # Oversized requests only need a full bucket, not more
+        need = min(amount, self.capacity)
+        return 0.0 if self.level >= need else (need - self.level) / self.rate
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.level -= amount
+
+    def adjust(self, delta: float):
+        self.level = min(self.capacity, self.level - delta)
+
+
+class ModelLimits:
+
+    __slots__ = ("requests", "tokens")
+
+    def __init__(self, rpm: float, tpm: float):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+
+# -----------------------------
+# Dispatcher
+# -----------------------------
+
+class Dispatcher:
+    """
+    Admission control in front of every Gemini call.
+
+    Callers wait in one priority queue (interactive before prefetch,
+    FIFO within a class) until a concurrency slot is free and the
+    model's request and token buckets allow the call. A full queue
+    rejects new work immediately rather than letting latency grow;
+    prefetch work is turned away at half depth so it never crowds out
+    learners. Transient upstream failures are retried with jittered
+    exponential backoff.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 64,
+        rpm: float = 1000,
+        tpm: float = 1000000,
+        max_queue: int = 256,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        model_limits: dict = None
+    ):
+        self.max_concurrency = max_concurrency
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.model_limits = model_limits or {}
+
+        self.limits = {}
+        self.queue = []
+        self.seq = itertools.count()
+        self.active = 0
+        self.timer = None
+
+        self.admitted = [0, 0]
+        self.rejected = [0, 0]
+        self.retries = 0
+        self.throttled = 0
+
+    def _limits(self, model):
+        limits = self.limits.get(model)
+
+        if limits is None:
+            rpm, tpm = self.model_limits.get(model, (self.rpm, self.tpm))
+            limits = self.limits[model] = ModelLimits(rpm, tpm)
+
+        return limits
+
+    # ---------------------------------------------------
+    # ADMISSION
+    # ---------------------------------------------------
+    async def acquire(self, model: str, tokens: int, priority: int = INTERACTIVE, ticket: Ticket = None):
+        """
+        Wait for a slot; pair every successful acquire with release().
+        """
+
+        if ticket is not None:
+            priority = ticket.priority
+
+        depth = self.max_queue if priority == INTERACTIVE else self.max_queue // 2
+
+        if len(self.queue) >= depth:
+            self.rejected[priority] += 1
+            metrics.record_error("llm_dispatch", cause="overloaded")
+            raise LLMOverloaded(retry_after=self.backoff_base)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.queue, (priority, next(self.seq), model, tokens, future))
+
+        if ticket is not None:
+            ticket.future = future
+
+        self._pump()
+
+        try:
+            with metrics.timed("llm_queue"):
+                await future
+        except asyncio.CancelledError:
+            # Granted just as the caller gave up: hand the slot back
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+        self.admitted[ticket.priority if ticket else priority] += 1
+
+    def promote(self, ticket: Ticket, priority: int):
+        """
+        Raise a ticket's priority, moving it up the queue if it waits.
+        """
+
+        if priority >= ticket.priority:
+            return
+
+        ticket.priority = priority
+
+        for i, entry in enumerate(self.queue):
+            if entry[4] is ticket.future:
+                self.queue[i] = (priority,) + entry[1:]
+                heapq.heapify(self.queue)
+                break
+
+    def try_acquire(self, model: str, tokens: int):
+        """
+        Take a slot only if one is free now and nobody is waiting for
+        it; used for optional extra calls such as hedges.
+        """
+
+        if self.queue or self.active >= self.max_concurrency:
+            return False
+
+        now = time.monotonic()
+        limits = self._limits(model)
+
+        if limits.requests.wait_time(1, now) or limits.tokens.wait_time(tokens, now):
+            return False
+
+        limits.requests.take(1, now)
+        limits.tokens.take(tokens, now)
+        self.active += 1
+
+        return True
+
+    def release(self):
+        self.active -= 1
+        self._pump()
+
+    def settle(self, model: str, estimated: int, actual: int):
+        """
+        Charge the token bucket for what a call really used.
+        """
+        if actual:
+            self._limits(model).tokens.adjust(actual - estimated)
+
+    def _pump(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+        now = time.monotonic()
+
+        while self.queue and self.active < self.max_concurrency:
+            _, _, model, tokens, future = self.queue[0]
+
+            if future.done():
+                heapq.heappop(self.queue)
+                continue
+
+            limits = self._limits(model)
+            wait = max(
+                limits.requests.wait_time(1, now),
+                limits.tokens.wait_time(tokens, now)
+            )
+
+            # Strict priority: nothing overtakes the head while it waits
+            if wait > 0:
+                self.throttled += 1
+                self.timer = asyncio.get_running_loop().call_later(wait, self._pump)
+                return
+
+            heapq.heappop(self.queue)
+            limits.requests.take(1, now)
+            limits.tokens.take(tokens, now)
+            self.active += 1
+            future.set_result(None)
+
+    # ---------------------------------------------------
+    # RETRIES
+    # ---------------------------------------------------
+    def backoff(self, attempt: int):
+        """
+        Full jitter: uniform over [0, base * 2^attempt], capped.
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def run(self, model: str, tokens: int, priority: int, call, ticket: Ticket = None, before=None):
+        """
+        Admit, then await call(); transient failures are retried, each
+        attempt going back through admission at the ticket's current
+        priority. before() runs ahead of every admission and may raise
+        to refuse the attempt without taking a slot.
+        """
+
+        for attempt in range(self.max_retries + 1):
+            if before is not None:
+                before()
+
+            await self.acquire(model, tokens, priority, ticket)
+
+            try:
+                return await call()
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+
+                self.retries += 1
+                metrics.record_error("llm_retry", e)
+            finally:
+                self.release()
+
+            await asyncio.sleep(self.backoff(attempt))
+
+    def stats(self):
+        return {
+            "queued": len(self.queue),
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "admitted": {"interactive": self.admitted[0], "prefetch": self.admitted[1]},
+            "rejected": {"interactive": self.rejected[0], "prefetch": self.rejected[1]},
+            "retries": self.retries,
+            "throttled": self.throttled
+        }
+
+    def close(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
@@ -0,0 +1,328 @@
+import glob
+import json
+import os
+import threading
+import time
+
+from session_store import SessionRecord
+
+
+# -----------------------------
+# Replay
+# -----------------------------
+
+def apply_event(sessions: dict, event: dict):
+    """
+    Fold one orchestrator event into {user_id: SessionRecord}.
+    """
+    kind = event["type"]
+    user_id = event["user_id"]
+
+    if kind == "start":
+        sessions[user_id] = SessionRecord(event["certification"])
+        return
+
+    session = sessions.get(user_id)
+
+    if session is None:
+        return
+
+    if kind == "score":
+        session.add_score(event["score"])
+    elif kind == "complete":
+        session.completed |= 1 << event["index"]
+    elif kind == "weak":
+        session.weak |= 1 << event["index"]
+    elif kind == "advance":
+        session.current_index = event["index"]
+    elif kind == "pace":
+        session.learning_pace = event["pace"]
+
+
+def iter_events(path: str, after: int = -1):
+    """
+    Every event in a log directory with seq > after, oldest first.
+    Lines a crash left half-written are skipped.
+    """
+    for segment in _segments(path):
+        with open(segment, "rb") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+
+                if event["seq"] > after:
+                    yield event
+
+
+def _segments(path):
+    return sorted(glob.glob(os.path.join(path, "events-*.jsonl")))
+
+
+def _snapshots(path):
+    return sorted(glob.glob(os.path.join(path, "snapshot-*.json")))
+
+
+# -----------------------------
+# Event Log
+# -----------------------------
+
+class EventLog:
+    """
+    Append-only JSON-lines log of session events, with snapshots.
+
+    append() only buffers; a background thread writes the buffer and
+    fsyncs once per fsync_interval, so a crash loses at most that much
+    and the request path never waits on disk. An interval of 0 writes
+    and fsyncs every event instead.
+
+    The log keeps no sessions of its own. Once snapshot_due(), the
+    orchestrator hands snapshot() the session store's records; they
+    are serialized on the spot, a new segment starts, and the flush
+    thread writes the snapshot and deletes the segments it covers, so
+    recovery is one snapshot load plus a short tail replay.
+
+    One process per directory: workers must not share a log.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fsync_interval: float = 0.2,
+        snapshot_every: int = 10000,
+        keep_history: bool = False
+    ):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = snapshot_every
+        self.keep_history = keep_history
+
+        self.lock = threading.Lock()
+        self.io_lock = threading.Lock()
+        self.pending = []
+        self.wakeup = threading.Event()
+        self.stopped = False
+
+        self.seq = 0
+        self.applied_seq = -1
+        self.snapshot_seq = -1
+        self.since_snapshot = 0
+        self.snapshot_job = None
+        self.file = None
+
+        self.appended = 0
+        self.fsyncs = 0
+        self.snapshots = 0
+        self.replayed = 0
+        self.recovery_seconds = 0.0
+
+        os.makedirs(path, exist_ok=True)
+
+        self.flusher = None
+
+        if fsync_interval > 0:
+            self.flusher = threading.Thread(
+                target=self._flush_loop,
+                name="event-log-flush",
+                daemon=True
+            )
+
+    # ---------------------------------------------------
+    # RECOVERY
+    # ---------------------------------------------------
+    def recover(self):
+        """
+        Load the latest snapshot, replay the tail after it and open a
+        segment for new events. Returns the recovered sessions.
+        """
+        started = time.perf_counter()
+        snapshots = _snapshots(self.path)
+        sessions = {}
+
+        if snapshots:
+            with open(snapshots[-1]) as f:
+                snapshot = json.load(f)
+
+            self.snapshot_seq = self.applied_seq = snapshot["seq"]
+            self.seq = snapshot["seq"] + 1
+            sessions = {
+                user_id: SessionRecord.from_dict(data)
+                for user_id, data in snapshot["sessions"].items()
+            }
+
+        for event in iter_events(self.path, after=self.snapshot_seq):
+            apply_event(sessions, event)
+            self.applied_seq = event["seq"]
+            self.seq = event["seq"] + 1
+            self.replayed += 1
+
+        self.since_snapshot = self.replayed
+        self._open_segment(self.seq)
+        self.recovery_seconds = time.perf_counter() - started
+
+        if self.flusher and not self.flusher.is_alive():
+            self.flusher.start()
+
+        return sessions
+
+    def _open_segment(self, first_seq: int):
+        if self.file:
+            self.file.close()
+
+        name = os.path.join(self.path, f"events-{first_seq:012d}.jsonl")
+
+        # Drop a half-written last line so new events start on a fresh one
+        if os.path.exists(name):
+            with open(name, "rb+") as f:
+                data = f.read()
+                f.truncate(data.rfind(b"\n") + 1)
+
+        self.file = open(name, "ab")
+
+    # ---------------------------------------------------
+    # APPEND
+    # ---------------------------------------------------
+    def append(self, kind: str, user_id: str, **fields):
+
+        with self.lock:
+            event = {
+                "seq": self.seq,
+                "ts": round(time.time(), 3),
+                "type": kind,
+                "user_id": user_id,
+                **fields
+            }
+            self.seq += 1
+            self.pending.append(event)
+            self.appended += 1
+
+        if self.flusher is None:
+            self.flush()
+
+    def flush(self):
+
+        with self.io_lock:
+            self._write_pending()
+            job, self.snapshot_job = self.snapshot_job, None
+
+        if job:
+            self._write_snapshot(*job)
+
+    def _write_pending(self):
+        # Called with io_lock held
+        with self.lock:
+            batch, self.pending = self.pending, []
+
+        if not batch:
+            return
+
+        self.file.write(b"".join(
+            json.dumps(event, separators=(",", ":")).encode("utf-8") + b"\n"
+            for event in batch
+        ))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.fsyncs += 1
+
+        self.applied_seq = batch[-1]["seq"]
+        self.since_snapshot += len(batch)
+
+    def _flush_loop(self):
+        while not self.stopped:
+            self.wakeup.wait(self.fsync_interval)
+            self.wakeup.clear()
+
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"⚠️ Event log flush failed: {e}")
+
+    # ---------------------------------------------------
+    # SNAPSHOT
+    # ---------------------------------------------------
+    def snapshot_due(self):
+        return self.file is not None and self.snapshot_job is None and (
+            self.since_snapshot + len(self.pending) >= self.snapshot_every
+        )
+
+    def snapshot(self, sessions):
+        """
+        Snapshot (user_id, SessionRecord) pairs that reflect every event
+        appended so far. Call it from the thread that appends events.
+        """
+        data = {user_id: session.to_dict() for user_id, session in sessions}
+
+        with self.io_lock:
+            # Events up to here go to the old segment, the rest to a new one
+            self._write_pending()
+            seq = self.seq - 1
+            old_segments = _segments(self.path)
+            self._open_segment(seq + 1)
+            self.since_snapshot = 0
+            self.snapshot_job = (seq, data, old_segments)
+
+        if self.flusher is None:
+            self.flush()
+        else:
+            self.wakeup.set()
+
+    def _write_snapshot(self, seq, data, old_segments):
+        name = os.path.join(self.path, f"snapshot-{seq:012d}.json")
+        tmp = f"{name}.tmp"
+
+        with open(tmp, "w") as f:
+            json.dump({"seq": seq, "sessions": data}, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp, name)
+
+        # Until now a crash recovers from the older snapshot and segments
+        for old in _snapshots(self.path)[:-1]:
+            os.remove(old)
+
+        if not self.keep_history:
+            for old in old_segments:
+                os.remove(old)
+
+        self.snapshot_seq = seq
+        self.snapshots += 1
+
+    def stats(self):
+        with self.lock:
+            pending = len(self.pending)
+
+        return {
+            "seq": self.seq,
+            "pending": pending,
+            "appended": self.appended,
+            "fsyncs": self.fsyncs,
+            "snapshots": self.snapshots,
+            "snapshot_seq": self.snapshot_seq,
+            "replayed_on_start": self.replayed,
+            "recovery_seconds": round(self.recovery_seconds, 4)
+        }
+
+    def close(self, sessions=None):
+        """
+        Flush and stop; with the store's sessions, leave a snapshot
+        behind so the next start replays nothing.
+        """
+        self.stopped = True
+        self.wakeup.set()
+
+        if self.flusher and self.flusher.is_alive():
+            self.flusher.join(timeout=5)
+
+        if self.file is None:
+            return
+
+        if sessions is not None and self.since_snapshot + len(self.pending):
+            self.snapshot(sessions)
+
+        self.flush()
+
+        with self.io_lock:
+            self.file.close()
+            self.file = None
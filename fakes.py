@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import itertools
+import json
+import time
+
+
+# -----------------------------
+# Fake Gemini
+# -----------------------------
+
+class FakeUsage:
+
+    def __init__(self, prompt_tokens: int, output_tokens: int):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+
+class FakeResponse:
+
+    def __init__(self, text: str, prompt: str = ""):
+        self.text = text
+        # Roughly four characters per token, like the real tokenizer
+        self.usage_metadata = FakeUsage(len(prompt) // 4, len(text) // 4)
+
+
+class FakeModels:
+    """
+    Stand-in for client.aio.models with canned, deterministic output.
+    """
+
+    def __init__(self, latency: float, stream_chunks: int):
+        self.latency = latency
+        self.stream_chunks = stream_chunks
+        self.counter = itertools.count()
+        self.calls = 0
+
+    async def generate_content(self, model: str, contents, config=None):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return FakeResponse(self._reply(str(contents)), str(contents))
+
+    async def generate_content_stream(self, model: str, contents, config=None):
+        self.calls += 1
+        text = self._reply(str(contents))
+        step = max(1, len(text) // self.stream_chunks)
+
+        async def chunks():
+            for i in range(0, len(text), step):
+                await asyncio.sleep(self.latency / self.stream_chunks)
+                yield FakeResponse(text[i:i + step])
+
+        return chunks()
+
+    def _reply(self, prompt: str):
+        seed = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+
+        if "MCQ" in prompt:
+            n = next(self.counter)
+            return json.dumps({
+                "questions": [
+                    {
+                        "question": f"Fake question {seed}-{n}-{i}?",
+                        "options": ["Option A", "Option B", "Option C", "Option D"],
+                        "answer": "Option A"
+                    }
+                    for i in range(5)
+                ]
+            })
+
+        return (
+            f"## Concept\nFake lesson {seed}.\n\n"
+            "## Real World Example\nAn example.\n\n"
+            "## Exam Tips\nA tip.\n\n"
+            "## Common Mistakes\nA mistake.\n"
+        )
+
+
+class FakeAio:
+
+    def __init__(self, models: FakeModels):
+        self.models = models
+
+    async def aclose(self):
+        pass
+
+
+class FakeGeminiClient:
+    """
+    Drop-in for genai.Client in benchmarks and load tests.
+    Every call sleeps for `latency` seconds, then returns canned text.
+    """
+
+    def __init__(self, latency: float = 0.5, stream_chunks: int = 8):
+        self.models = FakeModels(latency, stream_chunks)
+        self.aio = FakeAio(self.models)
+
+
+# -----------------------------
+# Fake Tavily
+# -----------------------------
+
+class FakeTavilyClient:
+    """
+    Drop-in for TavilyClient returning canned search results.
+    """
+
+    def __init__(self, latency: float = 0.3):
+        self.latency = latency
+        self.calls = 0
+
+    def search(self, query: str, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+
+        slug = "-".join(query.lower().split())
+
+        return {
+            "query": query,
+            "results": [
+                {
+                    "title": f"AWS docs: {query} ({i})",
+                    "url": f"https://docs.aws.amazon.com/fake/{slug}/{i}",
+                    "content": f"Reference material about {query}, part {i}.",
+                    "score": 1.0 - i / 10
+                }
+                for i in range(3)
+            ]
+        }
@@ -0,0 +1,318 @@
+import asyncio
+import os
+import time
+
+import httpx
+from google import genai
+from google.genai import types
+
+import metrics
+from dispatcher import Dispatcher, INTERACTIVE, Ticket, is_retryable
+from resilience import CircuitBreaker, LatencyWindow, hedged
+from singleflight import SingleFlight, prompt_key
+from config import (
+    LLM_BACKEND,
+    FAKE_LLM_LATENCY,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE,
+    LLM_KEEPALIVE_EXPIRY,
+    LLM_TIMEOUT,
+    LLM_RPM,
+    LLM_TPM,
+    LLM_MODEL_LIMITS,
+    LLM_MAX_QUEUE,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE,
+    LLM_BACKOFF_MAX,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_RESET,
+    LLM_FALLBACK_MODEL,
+    LLM_HEDGE,
+    LLM_HEDGE_MIN_DELAY
+)
+
+
+# -----------------------------
+# Safe Gemini Client Factory
+# -----------------------------
+
+def get_gemini_client():
+    if LLM_BACKEND == "fake":
+        from fakes import FakeGeminiClient
+        return FakeGeminiClient(latency=FAKE_LLM_LATENCY)
+
+    api_key = os.getenv("GEMINI_API_KEY")
+
+    if not api_key:
+        raise RuntimeError("GEMINI_API_KEY not set in environment")
+
+    # An explicit httpx transport keeps one keep-alive connection pool
+    # for every async call made through this client.
+    transport = httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+        )
+    )
+
+    return genai.Client(
+        api_key=api_key,
+        http_options=types.HttpOptions(
+            timeout=int(LLM_TIMEOUT * 1000),
+            async_client_args={"transport": transport}
+        )
+    )
+
+
+def estimate_tokens(contents, config=None):
+    """
+    Rough upfront charge for a call: ~4 characters per prompt token
+    plus the whole output budget. Settled against real usage later.
+    """
+    output = getattr(config, "max_output_tokens", None) or 0
+    return len(str(contents)) // 4 + output
+
+
+def total_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None) or 0
+
+
+# -----------------------------
+# Shared Gemini Pool
+# -----------------------------
+
+class GeminiPool:
+    """
+    One async Gemini client shared by every agent.
+
+    Created at app startup, closed at shutdown; every call is admitted
+    by the Dispatcher (priority, rate limits, retries), and identical
+    concurrent generations share a single upstream call.
+
+    Each model has a circuit breaker; route() picks the fallback model
+    while the primary's is open. Slow generations can be hedged.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        dispatcher: Dispatcher = None
+    ):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.dispatcher = dispatcher or Dispatcher(
+            max_concurrency=max_concurrency,
+            rpm=LLM_RPM,
+            tpm=LLM_TPM,
+            max_queue=LLM_MAX_QUEUE,
+            max_retries=LLM_MAX_RETRIES,
+            backoff_base=LLM_BACKOFF_BASE,
+            backoff_max=LLM_BACKOFF_MAX,
+            model_limits=LLM_MODEL_LIMITS
+        )
+        self.in_flight = 0
+        self.single_flight = SingleFlight()
+        self.fallback_model = LLM_FALLBACK_MODEL
+        self.breakers = {}
+        self.latency = {}
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def open(self):
+        if self.client is None:
+            self.client = get_gemini_client()
+        return self.client
+
+    def breaker(self, model: str):
+        breaker = self.breakers.get(model)
+
+        if breaker is None:
+            breaker = self.breakers[model] = CircuitBreaker(
+                model,
+                failures=LLM_BREAKER_FAILURES,
+                reset_timeout=LLM_BREAKER_RESET
+            )
+
+        return breaker
+
+    def route(self, model: str):
+        """
+        The model to call right now: `model` unless its breaker is open
+        and the fallback model's is not.
+        """
+
+        if self.breaker(model).available() or not self.fallback_model:
+            return model
+
+        if self.breaker(self.fallback_model).available():
+            return self.fallback_model
+
+        return model
+
+    async def generate(self, model: str, contents, config=None, priority: int = INTERACTIVE):
+
+        # A learner joining a queued prefetch of the same prompt lifts
+        # it to their priority instead of waiting behind it
+        ticket = Ticket(priority)
+
+        return await self.single_flight.do(
+            prompt_key(model, contents, config),
+            lambda: self._generate(model, contents, config, ticket),
+            state=ticket,
+            join=lambda leader: self.dispatcher.promote(leader, priority)
+        )
+
+    async def _generate(self, model, contents, config, ticket):
+
+        client = self.open()
+        tokens = estimate_tokens(contents, config)
+        breaker = self.breaker(model)
+        latency = self.latency.setdefault(model, LatencyWindow())
+
+        async def attempt():
+            self.in_flight += 1
+            try:
+                with metrics.timed("gemini_generate", track_in_flight=True):
+                    return await client.aio.models.generate_content(
+                        model=model,
+                        contents=contents,
+                        config=config
+                    )
+            finally:
+                self.in_flight -= 1
+
+        async def call():
+            started = time.perf_counter()
+
+            try:
+                response = await self._hedge(model, tokens, attempt, latency)
+            except Exception as e:
+                # Only outages count; a rejected request means it's up
+                if is_retryable(e):
+                    breaker.failure()
+                else:
+                    breaker.success()
+                raise
+
+            breaker.success()
+            latency.add(time.perf_counter() - started)
+
+            return response
+
+        # The breaker is checked before admission so an open circuit
+        # fails fast instead of waiting in the queue for a slot
+        response = await self.dispatcher.run(
+            model, tokens, ticket.priority, call, ticket, before=breaker.before
+        )
+
+        metrics.record_tokens(model, response)
+        self.dispatcher.settle(model, tokens, total_tokens(response))
+
+        return response
+
+    async def _hedge(self, model, tokens, attempt, latency):
+
+        delay = latency.percentile(0.95) if LLM_HEDGE else None
+
+        if delay is None:
+            return await attempt()
+
+        # A hedge is only sent with a spare slot and quota, never queued
+        def may_hedge():
+            if self.dispatcher.try_acquire(model, tokens):
+                self.hedges += 1
+                return True
+            return False
+
+        response, won = await hedged(
+            attempt,
+            max(delay, LLM_HEDGE_MIN_DELAY),
+            may_hedge,
+            release=self.dispatcher.release
+        )
+
+        self.hedge_wins += won
+
+        return response
+
+    async def stream(self, model: str, contents, config=None, priority: int = INTERACTIVE):
+
+        client = self.open()
+        tokens = estimate_tokens(contents, config)
+        dispatcher = self.dispatcher
+        breaker = self.breaker(model)
+
+        # Only opening the stream is retried; once chunks have been
+        # yielded a failure goes straight to the caller.
+        for attempt in range(dispatcher.max_retries + 1):
+            breaker.before()
+            await dispatcher.acquire(model, tokens, priority)
+            started = time.perf_counter()
+
+            try:
+                chunks = await client.aio.models.generate_content_stream(
+                    model=model,
+                    contents=contents,
+                    config=config
+                )
+                breaker.success()
+                break
+            except BaseException as e:
+                dispatcher.release()
+
+                if isinstance(e, Exception) and is_retryable(e):
+                    breaker.failure()
+
+                if (
+                    not isinstance(e, Exception)
+                    or attempt == dispatcher.max_retries
+                    or not is_retryable(e)
+                ):
+                    raise
+
+                dispatcher.retries += 1
+                metrics.record_error("llm_retry", e)
+
+            await asyncio.sleep(dispatcher.backoff(attempt))
+
+        self.in_flight += 1
+        chunk = None
+        try:
+            with metrics.timed("gemini_stream", track_in_flight=True):
+                async for chunk in chunks:
+                    if started is not None:
+                        metrics.observe_stage(
+                            "gemini_first_chunk",
+                            time.perf_counter() - started
+                        )
+                        started = None
+                    yield chunk
+
+            # Usage totals arrive on the final chunk
+            metrics.record_tokens(model, chunk)
+            dispatcher.settle(model, tokens, total_tokens(chunk))
+        finally:
+            self.in_flight -= 1
+            dispatcher.release()
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "single_flight": self.single_flight.stats(),
+            "dispatcher": self.dispatcher.stats(),
+            "breakers": {model: b.stats() for model, b in self.breakers.items()},
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins
+        }
+
+    async def aclose(self):
+        self.dispatcher.close()
+
+        if self.client is not None:
+            await self.client.aio.aclose()
+            self.client = None
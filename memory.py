@@ -1,15 +1,199 @@
+import json
+import re
+from collections import OrderedDict, deque
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s")
+
+
+def approx_tokens(text: str):
+    """
+    Roughly four characters per token, like the Gemini tokenizer.
+    """
+    return max(1, (len(text) + 3) // 4)
+
+
+class Message:
+    """
+    One chat turn with its token count and digest computed once.
+    """
+
+    __slots__ = ("role", "content", "tokens", "_digest")
+
+    def __init__(self, role: str, content: str):
+        self.role = role
+        self.content = content
+        self.tokens = approx_tokens(content)
+        self._digest = None
+
+    @property
+    def digest(self):
+        """
+        One short line standing in for the turn in a summary: the
+        first sentence, capped at 160 characters.
+        """
+        if self._digest is None:
+            first = _SENTENCE.split(" ".join(self.content.split()), 1)[0]
+            self._digest = f"{self.role}: {first[:160]}"
+        return self._digest
+
+    def to_dict(self):
+        return {"role": self.role, "content": self.content}
+
+
+class Conversation:
+
+    __slots__ = ("messages", "summary")
+
+    def __init__(self, capacity: int, summary_lines: int):
+        self.messages = deque(maxlen=capacity)
+        self.summary = deque(maxlen=summary_lines)
+
+    def add(self, role, content):
+        if len(self.messages) == self.messages.maxlen:
+            self.summary.append(self.messages[0].digest)
+
+        self.messages.append(Message(role, content))
+
+    def context(self, budget: int):
+        """
+        (summary lines, recent messages) fitting in `budget` tokens.
+
+        Recent turns are taken newest first from their cached counts
+        until the budget runs out; the turns that didn't fit join the
+        running summary, which gets whatever budget is left.
+        """
+        recent = []
+        used = 0
+        messages = self.messages
+        cut = 0
+
+        for i in range(len(messages) - 1, -1, -1):
+            message = messages[i]
+
+            if used + message.tokens > budget:
+                cut = i + 1
+                break
+
+            recent.append(message)
+            used += message.tokens
+
+        recent.reverse()
+
+        lines = list(self.summary)
+        lines += [messages[i].digest for i in range(cut)]
+
+        # Oldest summary lines go first when the summary itself is too long
+        summary = []
+
+        for line in reversed(lines):
+            cost = approx_tokens(line)
+
+            if used + cost > budget:
+                break
+
+            summary.append(line)
+            used += cost
+
+        summary.reverse()
+
+        return summary, [m.to_dict() for m in recent]
+
+
 class ShortTermMemory:
-    def __init__(self):
-        self.store = {}
+    """
+    Recent chat turns per user in a fixed-size ring buffer.
+
+    Turns pushed out of the buffer are folded into a bounded running
+    summary of one-line digests, so context stays the same size however
+    long the conversation runs. Least recently active users are dropped
+    past max_users.
+    """
+
+    def __init__(self, capacity: int = 10, summary_lines: int = 20, max_users: int = 10000):
+        self.capacity = capacity
+        self.summary_lines = summary_lines
+        self.max_users = max_users
+        self.store = OrderedDict()
+
+    def _conversation(self, user_id):
+        conversation = self.store.get(user_id)
+
+        if conversation is None:
+            conversation = Conversation(self.capacity, self.summary_lines)
+            self.store[user_id] = conversation
+
+            while len(self.store) > self.max_users:
+                self.store.popitem(last=False)
+
+        self.store.move_to_end(user_id)
+        return conversation
 
     def add(self, user_id, role, content):
-        if user_id not in self.store:
-            self.store[user_id] = []
-        self.store[user_id].append({"role": role, "content": content})
-        self.store[user_id] = self.store[user_id][-10:]
+        self._conversation(user_id).add(role, content)
 
     def get(self, user_id):
-        return self.store.get(user_id, [])
+        conversation = self.store.get(user_id)
+        return [m.to_dict() for m in conversation.messages] if conversation else []
+
+    def context(self, user_id, budget: int):
+        conversation = self.store.get(user_id)
+        return conversation.context(budget) if conversation else ([], [])
+
+    def count(self):
+        return len(self.store)
+
+
+class SharedShortTermMemory:
+    """
+    The same ring buffer and summary in a shared_state store, one
+    record per user, so any worker can continue a chat. Users idle
+    for ttl seconds are dropped by the store.
+    """
+
+    PREFIX = "chat:"
+
+    def __init__(self, kv, capacity: int = 10, summary_lines: int = 20, ttl: float = 6 * 3600):
+        self.kv = kv
+        self.capacity = capacity
+        self.summary_lines = summary_lines
+        self.ttl = ttl
+
+    def _load(self, user_id):
+        data = self.kv.get(self.PREFIX + user_id)
+
+        if not data:
+            return None
+
+        data = json.loads(data)
+        conversation = Conversation(self.capacity, self.summary_lines)
+        conversation.summary.extend(data["summary"])
+        conversation.messages.extend(Message(role, content) for role, content in data["messages"])
+
+        return conversation
+
+    def add(self, user_id, role, content):
+        conversation = self._load(user_id) or Conversation(self.capacity, self.summary_lines)
+        conversation.add(role, content)
+
+        self.kv.set(
+            self.PREFIX + user_id,
+            json.dumps({
+                "messages": [[m.role, m.content] for m in conversation.messages],
+                "summary": list(conversation.summary)
+            }),
+            ttl=self.ttl
+        )
+
+    def get(self, user_id):
+        conversation = self._load(user_id)
+        return [m.to_dict() for m in conversation.messages] if conversation else []
+
+    def context(self, user_id, budget: int):
+        conversation = self._load(user_id)
+        return conversation.context(budget) if conversation else ([], [])
+
+    def count(self):
+        return self.kv.count(self.PREFIX)
 
 class LongTermMemory:
     def __init__(self):
@@ -28,8 +212,10 @@ class LongTermMemory:
     def update_score(self, user_id, section, score):
         self.progress[user_id]["scores"][section] = score
 
-        if score < 70:
-            self.progress[user_id]["weak_topics"].append(section)
+        weak_topics = self.progress[user_id]["weak_topics"]
+
+        if score < 70 and section not in weak_topics:
+            weak_topics.append(section)
 
     def get(self, user_id):
         return self.progress.get(user_id)
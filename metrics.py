@@ -0,0 +1,277 @@
+import asyncio
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Seconds; spans cache hits (sub-ms) to slow LLM generations
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+    0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+# Per-request stage timings, only set when the caller asked for a trace
+current_trace = ContextVar("current_trace", default=None)
+
+
+def _label_value(value):
+    # Prometheus text format escapes only these three in label values
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+
+    pairs = ",".join(
+        f'{name}="{_label_value(value)}"'
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+# -----------------------------
+# Metric Types
+# -----------------------------
+
+class Counter:
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        with self.lock:
+            return [
+                f"{self.name}{_label_text(self.labels, key)} {value}"
+                for key, value in sorted(self.values.items())
+            ]
+
+
+class Gauge(Counter):
+
+    kind = "gauge"
+
+    def set(self, *labels, value: float):
+        with self.lock:
+            self.values[labels] = value
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram:
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, *labels, value: float):
+        with self.lock:
+            series = self.series.get(labels)
+
+            if series is None:
+                # One count per bucket plus +Inf, then sum
+                series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = []
+
+        with self.lock:
+            for key, series in sorted(self.series.items()):
+                cumulative = 0
+
+                for bound, count in zip(self.buckets + ("+Inf",), series):
+                    cumulative += count
+                    labels = _label_text(
+                        self.labels + ("le",),
+                        key + (bound,)
+                    )
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+
+                labels = _label_text(self.labels, key)
+                lines.append(f"{self.name}_sum{labels} {series[-1]}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+
+        return lines
+
+
+# -----------------------------
+# Registry
+# -----------------------------
+
+class Registry:
+    """
+    Holds metrics and renders them in Prometheus text format.
+
+    Collectors are callables returning (name, kind, labels, value)
+    samples read from live objects (cache stats, pool sizes) at
+    scrape time.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        self.collectors.append(collector)
+
+    def render(self):
+        lines = []
+
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+
+        declared = set()
+
+        for collector in self.collectors:
+            for name, kind, labels, value in collector():
+                if name not in declared:
+                    declared.add(name)
+                    lines.append(f"# TYPE {name} {kind}")
+
+                label_text = _label_text(tuple(labels), tuple(labels.values()))
+                lines.append(f"{name}{label_text} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.add(Histogram(
+    "tutor_stage_seconds",
+    "Time spent per hot-path stage",
+    labels=("stage",)
+))
+HTTP_SECONDS = REGISTRY.add(Histogram(
+    "tutor_http_request_seconds",
+    "API request latency by route",
+    labels=("route", "status")
+))
+LLM_TOKENS = REGISTRY.add(Counter(
+    "tutor_llm_tokens_total",
+    "Gemini tokens consumed",
+    labels=("model", "kind")
+))
+ERRORS = REGISTRY.add(Counter(
+    "tutor_errors_total",
+    "Failures by stage and cause",
+    labels=("stage", "cause")
+))
+IN_FLIGHT = REGISTRY.add(Gauge(
+    "tutor_in_flight",
+    "Operations currently in progress",
+    labels=("stage",)
+))
+
+
+# -----------------------------
+# Helpers
+# -----------------------------
+
+def classify_error(exc: BaseException):
+    """
+    Bucket an exception into quota, timeout, bad_json or other.
+    """
+    if isinstance(exc, json.JSONDecodeError):
+        return "bad_json"
+
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError)):
+        return "timeout"
+
+    text = f"{type(exc).__name__} {exc}".lower()
+
+    if "timeout" in text or "timed out" in text:
+        return "timeout"
+
+    code = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+
+    if code == 429 or "resource_exhausted" in text or "quota" in text:
+        return "quota"
+
+    return "other"
+
+
+def record_error(stage: str, exc: BaseException = None, cause: str = None):
+    ERRORS.inc(stage, cause or classify_error(exc))
+
+
+def record_tokens(model: str, response):
+    usage = getattr(response, "usage_metadata", None)
+
+    if usage is None:
+        return
+
+    LLM_TOKENS.inc(model, "prompt", amount=usage.prompt_token_count or 0)
+    LLM_TOKENS.inc(model, "output", amount=usage.candidates_token_count or 0)
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(stage, value=seconds)
+
+    trace = current_trace.get()
+
+    if trace is not None:
+        trace.append((stage, seconds))
+
+
+@contextmanager
+def timed(stage: str, track_in_flight: bool = False):
+    """
+    Time a block into tutor_stage_seconds; failures are counted by cause.
+    """
+    if track_in_flight:
+        IN_FLIGHT.inc(stage)
+
+    started = time.perf_counter()
+
+    try:
+        yield
+    except Exception as e:
+        record_error(stage, e)
+        raise
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+        if track_in_flight:
+            IN_FLIGHT.dec(stage)
+
+
+def server_timing(trace):
+    """
+    Format collected stage timings as a Server-Timing header value.
+    """
+    return ", ".join(
+        f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in trace
+    )
@@ -1,105 +1,411 @@
-from agent import LearningAgent, AssessmentAgent, FeedbackAgent
-from config import CERTIFICATIONS
+import asyncio
+import time
+
+from agent import LearningAgent, AssessmentAgent, ChatAgent, FeedbackAgent
+from analytics import ScoreMatrix
+from cache import KVTier, LessonCache
+from curriculum import CURRICULUM
+from config import (
+    QUIZ_SIZE,
+    QUIZ_POOL_LOW_WATER,
+    QUIZ_POOL_HIGH_WATER,
+    QUIZ_REFILL_WORKERS,
+    QUIZ_SESSION_TTL,
+    API_WORKERS,
+    SESSION_MAX_RESIDENT,
+    SESSION_IDLE_TTL,
+    LESSON_CACHE_SIZE,
+    LESSON_CACHE_TTL,
+    LESSON_CACHE_PATH,
+    REVIEW_STATE_PATH,
+    REVIEW_SLOT_SECONDS,
+    RETRIEVAL_DB_PATH,
+    RETRIEVAL_CACHE_TTL,
+    RETRIEVAL_MIN_SCORE,
+    RETRIEVAL_MIN_COVERAGE,
+    PREFETCH_PER_MINUTE,
+    PREFETCH_CONCURRENCY,
+    PREFETCH_SCORE_MARGIN,
+    CHAT_HISTORY_TURNS,
+    CHAT_SUMMARY_LINES,
+    CHAT_MAX_USERS,
+    CHAT_MEMORY_TTL,
+    QUESTION_DEDUP_THRESHOLD,
+    QUESTION_STORE_MAX,
+    EVENT_LOG_DIR,
+    EVENT_LOG_FSYNC_INTERVAL,
+    EVENT_LOG_SNAPSHOT_EVERY,
+    EVENT_LOG_KEEP_HISTORY,
+    ANALYTICS_REFRESH_SECONDS
+)
+from eventlog import EventLog
+from llm import GeminiPool
+from memory import ShortTermMemory, SharedShortTermMemory
+import metrics
+from prefetch import Prefetcher
+from question_store import QuestionStore
+from quiz_bank import QuizBank
+from quiz_session import QuizSessionStore, SharedQuizSessionStore
+from retrieval import Retriever, section_query
+from scheduler import ReviewScheduler, SharedReviewScheduler
+from session_store import (
+    MemorySessionStore,
+    SessionRecord,
+    SessionStore,
+    create_session_store
+)
+from shared_state import create_kv
+
+# Scores at or above this move the learner to the next section
+ADVANCE_SCORE = 90
+
+# Pace after advancing with a strong score: slow -> normal -> fast
+PACE_UP = {"slow": "normal", "normal": "fast", "fast": "fast"}
 
 
 class Orchestrator:
 
-    def __init__(self):
-        self.learning_agent = LearningAgent()
-        self.assessment_agent = AssessmentAgent()
+    def __init__(self, llm: GeminiPool = None, sessions: SessionStore = None):
+        self.llm = llm or GeminiPool()
+        # Shared across workers; None keeps everything in this process
+        self.state = create_kv()
+        self.retriever = Retriever(
+            path=RETRIEVAL_DB_PATH,
+            ttl=RETRIEVAL_CACHE_TTL,
+            min_score=RETRIEVAL_MIN_SCORE,
+            min_coverage=RETRIEVAL_MIN_COVERAGE
+        )
+        self.learning_agent = LearningAgent(
+            self.llm,
+            cache=LessonCache(
+                max_size=LESSON_CACHE_SIZE,
+                ttl=LESSON_CACHE_TTL,
+                path=LESSON_CACHE_PATH,
+                tier=KVTier(self.state) if self.state and not LESSON_CACHE_PATH else None
+            ),
+            retriever=self.retriever
+        )
+        self.assessment_agent = AssessmentAgent(self.llm)
         self.feedback_agent = FeedbackAgent()
-        self.sessions = {}
+        if self.state:
+            self.chat_memory = SharedShortTermMemory(
+                self.state,
+                capacity=CHAT_HISTORY_TURNS,
+                summary_lines=CHAT_SUMMARY_LINES,
+                ttl=CHAT_MEMORY_TTL
+            )
+        else:
+            self.chat_memory = ShortTermMemory(
+                capacity=CHAT_HISTORY_TURNS,
+                summary_lines=CHAT_SUMMARY_LINES,
+                max_users=CHAT_MAX_USERS
+            )
+        self.chat_agent = ChatAgent(self.llm, self.chat_memory)
+        self.quiz_bank = QuizBank(
+            self.assessment_agent.generate_quiz,
+            quiz_size=QUIZ_SIZE,
+            low_water=QUIZ_POOL_LOW_WATER,
+            high_water=QUIZ_POOL_HIGH_WATER,
+            workers=QUIZ_REFILL_WORKERS,
+            store=QuestionStore(
+                threshold=QUESTION_DEDUP_THRESHOLD,
+                max_items=QUESTION_STORE_MAX
+            ),
+            max_learners=SESSION_MAX_RESIDENT,
+            idle_ttl=SESSION_IDLE_TTL,
+            kv=self.state
+        )
+        self.prefetcher = Prefetcher(
+            self.learning_agent,
+            self.quiz_bank,
+            per_minute=PREFETCH_PER_MINUTE,
+            concurrency=PREFETCH_CONCURRENCY
+        )
+        self.sessions = sessions or create_session_store(self.state)
+        self.events = None
+        self.snapshot_scheduled = False
+
+        if EVENT_LOG_DIR:
+            if API_WORKERS > 1:
+                raise RuntimeError(
+                    "EVENT_LOG_DIR needs API_WORKERS=1: workers must not share an event log"
+                )
+
+            self.events = EventLog(
+                EVENT_LOG_DIR,
+                fsync_interval=EVENT_LOG_FSYNC_INTERVAL,
+                snapshot_every=EVENT_LOG_SNAPSHOT_EVERY,
+                keep_history=EVENT_LOG_KEEP_HISTORY
+            )
+            recovered = self.events.recover()
+
+            # A durable store still has its sessions; a fresh one lost them
+            if recovered and self.sessions.count() == 0:
+                self.sessions.put_many(recovered)
+
+        if self.state:
+            self.quiz_sessions = SharedQuizSessionStore(self.state, ttl=QUIZ_SESSION_TTL)
+        else:
+            self.quiz_sessions = QuizSessionStore(ttl=QUIZ_SESSION_TTL)
+        self.analytics = ScoreMatrix()
+        self.analytics_built = float("-inf")
+
+        if self.state:
+            self.reviews = SharedReviewScheduler(self.state, slot_seconds=REVIEW_SLOT_SECONDS)
+        else:
+            self.reviews = ReviewScheduler(
+                path=REVIEW_STATE_PATH,
+                slot_seconds=REVIEW_SLOT_SECONDS
+            )
 
     # ---------------------------------------------------
     # START SESSION
     # ---------------------------------------------------
     def start(self, user_id: str, certification: str):
 
-        if certification not in CERTIFICATIONS:
-            return {"error": "Invalid certification"}
+        cert = CURRICULUM.current().certification(certification)
 
-        domains = CERTIFICATIONS[certification]["domains"]
+        if cert is None:
+            return {"error": "Invalid certification"}
 
-        if not domains:
-            return {"error": "No curriculum found"}
+        # Validation guarantees every certification has sections
+        first_section = cert.sections[0].name
 
-        first_section = domains[0]["name"]
+        self.prefetcher.cancel(user_id)
+        self.sessions.put(user_id, SessionRecord(certification))
+        self._event("start", user_id, certification=certification)
 
-        self.sessions[user_id] = {
-            "certification": certification,
-            "current_index": 0,
-            "current_section": first_section,
-            "completed_sections": [],
-            "scores": [],
-            "weak_topics": [],
-            "learning_pace": "normal"
+        return {
+            "message": f"Started {certification}",
+            "current_section": first_section
         }
 
+    def start_many(self, user_ids, certification: str):
+        """
+        Enroll a cohort in one write; existing sessions are restarted.
+        """
+
+        cert = CURRICULUM.current().certification(certification)
+
+        if cert is None:
+            return {"error": "Invalid certification"}
+
+        for user_id in user_ids:
+            self.prefetcher.cancel(user_id)
+            self._event("start", user_id, certification=certification)
+
+        self.sessions.put_many({
+            user_id: SessionRecord(certification)
+            for user_id in user_ids
+        })
+
         return {
             "message": f"Started {certification}",
-            "current_section": first_section
+            "started": len(set(user_ids)),
+            "current_section": cert.sections[0].name
         }
 
     # ---------------------------------------------------
     # TEACH CURRENT SECTION
     # ---------------------------------------------------
-    def teach(self, user_id: str):
+    async def teach(self, user_id: str):
 
-        session = self.sessions.get(user_id)
+        session = self._session(user_id)
 
         if not session:
             return {"lesson": "Session not found"}
 
-        section = session["current_section"]
+        section = session.current_section
 
-        lesson = self.learning_agent.generate_lesson(section)
+        lesson = await self.learning_agent.generate_lesson(
+            section,
+            session.learning_pace,
+            session.current_attempt
+        )
 
         return lesson
 
+    def teach_stream(self, user_id: str):
+        """
+        Async iterator of lesson chunks, or None without a session.
+        """
+
+        session = self._session(user_id)
+
+        if not session:
+            return None
+
+        return self.learning_agent.stream_lesson(
+            session.current_section,
+            session.learning_pace,
+            session.current_attempt
+        )
+
+    # ---------------------------------------------------
+    # CHAT
+    # ---------------------------------------------------
+    async def chat(self, user_id: str, message: str):
+
+        session = self._session(user_id)
+
+        return await self.chat_agent.reply(
+            user_id,
+            message,
+            session.current_section if session else None
+        )
+
     # ---------------------------------------------------
     # GENERATE QUIZ
     # ---------------------------------------------------
-    def assess(self, user_id: str):
+    async def assess(self, user_id: str):
 
-        session = self.sessions.get(user_id)
+        session = self._session(user_id)
 
         if not session:
             return {"quiz": {"questions": []}}
 
-        section = session["current_section"]
+        section = session.current_section
+
+        # A failed section is retaken from stored questions, no generation
+        if session.current_attempt:
+            quiz = await self.quiz_bank.retake(user_id, section)
+        else:
+            quiz = await self.quiz_bank.take(user_id, section)
+
+        if not quiz["questions"]:
+            return {"quiz_id": None, "questions": []}
+
+        # Answer keys stay here; the learner only gets questions/options
+        quiz_id, questions = self.quiz_sessions.create(
+            user_id,
+            section,
+            quiz["questions"]
+        )
 
-        quiz = self.assessment_agent.generate_quiz(section)
+        # Learners who pass will want the next section right after
+        self._prefetch_next(user_id, session)
 
-        return quiz
+        return {"quiz_id": quiz_id, "questions": questions}
+
+    # ---------------------------------------------------
+    # GRADE ANSWERS
+    # ---------------------------------------------------
+    def submit_answers(self, user_id: str, quiz_id: str, answers):
+        """
+        Grade chosen option indexes against the stored key and apply
+        the result like submit_score, in one step.
+        """
+
+        # Look before taking: a wrong user or stale quiz must not use it up
+        quiz = self.quiz_sessions.get(quiz_id)
+
+        if not quiz or quiz.user_id != user_id:
+            return {"feedback": "Quiz not found or already submitted"}
+
+        session = self._session(user_id)
+
+        if not session or session.current_section != quiz.section:
+            return {"feedback": "Quiz is no longer current"}
+
+        # Atomic, so a quiz submitted twice at once is graded once
+        if self.quiz_sessions.pop(quiz_id) is None:
+            return {"feedback": "Quiz not found or already submitted"}
+
+        results = quiz.grade(answers)
+        self.quiz_bank.record_results(user_id, quiz.section, results)
+
+        outcome = self.submit_score(user_id, 0, results=results)
+
+        outcome["results"] = [
+            {"correct": correct, "answer_index": answer_index}
+            for correct, answer_index in zip(results, quiz.answer_key)
+        ]
+
+        return outcome
 
     # ---------------------------------------------------
     # SUBMIT SCORE & PERFORMANCE LOGIC
     # ---------------------------------------------------
-    def submit_score(self, user_id: str, score: int):
+    def submit_score(self, user_id: str, score: int, results=None):
 
-        session = self.sessions.get(user_id)
+        session = self._session(user_id)
 
         if not session:
             return {"feedback": "Session not found"}
 
-        session["scores"].append(score)
+        # Per-question results, when graded here, decide the score
+        if results:
+            score = round(100 * sum(results) / len(results))
+
+        self._record_score(user_id, session, score)
+
+        if score < ADVANCE_SCORE - PREFETCH_SCORE_MARGIN:
+            # Reteach ahead; the next section can wait
+            self.prefetcher.cancel(user_id)
+        elif score < ADVANCE_SCORE:
+            self._prefetch_next(user_id, session)
 
         feedback = self.feedback_agent.evaluate(score)
 
-        certification = session["certification"]
-        domains = CERTIFICATIONS[certification]["domains"]
+        outcome = self._apply_score(user_id, session, score, feedback)
+        outcome["score"] = score
+
+        return outcome
+
+    def import_scores(self, scores):
+        """
+        Apply (user_id, score) pairs in order, as submit_score does,
+        without scheduling prefetches for the imported learners.
+        """
+
+        imported = 0
+        missing = []
+        sections = {}
+
+        for user_id, score in scores:
+            session = self._session(user_id)
+
+            if not session:
+                missing.append(user_id)
+                continue
+
+            self._record_score(user_id, session, score)
+            self._apply_score(user_id, session, score, self.feedback_agent.evaluate(score))
+
+            sections[user_id] = session.current_section
+            imported += 1
+
+        return {
+            "imported": imported,
+            "missing": missing,
+            "current_sections": sections
+        }
+
+    def _record_score(self, user_id, session, score):
+        session.add_score(score)
+        self._event("score", user_id, section=session.section.id, score=score)
+        self.reviews.record(user_id, session.current_section, score)
+        self.analytics.record(user_id, session.certification, session.section.id, score)
+
+    def _apply_score(self, user_id, session, score, feedback):
 
         # --------------------------
         # PERFORMANCE-BASED FLOW
         # --------------------------
 
-        if score >= 90:
+        if score >= ADVANCE_SCORE:
+            # Strong learners step up a pace
+            session.learning_pace = PACE_UP.get(session.learning_pace, "fast")
+            self._event("pace", user_id, pace=session.learning_pace)
+
             # Move to next section immediately
-            return self._move_to_next_section(user_id, feedback)
+            return self._move_to_next_section(user_id, session, feedback)
 
         elif score >= 70:
             # Mark complete but suggest review
-            session["completed_sections"].append(session["current_section"])
+            session.complete_current()
+            self.sessions.put(user_id, session)
+            self._event("complete", user_id, index=session.current_index)
             return {
                 "feedback": feedback,
                 "next_action": "optional_review"
@@ -107,8 +413,11 @@ class Orchestrator:
 
         else:
             # Weak topic detected
-            session["weak_topics"].append(session["current_section"])
-            session["learning_pace"] = "slow"
+            session.mark_current_weak()
+            session.learning_pace = "slow"
+            self.sessions.put(user_id, session)
+            self._event("weak", user_id, index=session.current_index)
+            self._event("pace", user_id, pace="slow")
 
             return {
                 "feedback": feedback,
@@ -118,18 +427,19 @@ class Orchestrator:
     # ---------------------------------------------------
     # MOVE TO NEXT SECTION
     # ---------------------------------------------------
-    def _move_to_next_section(self, user_id: str, feedback: str):
-
-        session = self.sessions[user_id]
-        certification = session["certification"]
-        domains = CERTIFICATIONS[certification]["domains"]
-
-        current_index = session["current_index"]
-        session["completed_sections"].append(session["current_section"])
-
-        next_index = current_index + 1
-
-        if next_index >= len(domains):
+    def _move_to_next_section(
+        self,
+        user_id: str,
+        session: SessionRecord,
+        feedback: str
+    ):
+
+        section = session.section
+        session.complete_current()
+        self._event("complete", user_id, index=section.index)
+
+        if section.next is None:
+            self.sessions.put(user_id, session)
             return {
                 "feedback": feedback,
                 "message": "🎉 Certification curriculum completed!",
@@ -137,30 +447,232 @@ class Orchestrator:
             }
 
         # Update session
-        session["current_index"] = next_index
-        session["current_section"] = domains[next_index]["name"]
+        session.current_index = CURRICULUM.current().sections[section.next].index
+        self.sessions.put(user_id, session)
+        self._event("advance", user_id, index=session.current_index)
 
         return {
             "feedback": feedback,
-            "next_section": session["current_section"],
+            "next_section": session.current_section,
             "completed": False
         }
 
+    # ---------------------------------------------------
+    # LOOKAHEAD PREFETCH
+    # ---------------------------------------------------
+    def _prefetch_next(self, user_id: str, session: SessionRecord):
+
+        next_id = session.section.next
+
+        if next_id is None:
+            return
+
+        self.prefetcher.schedule(
+            user_id,
+            CURRICULUM.current().sections[next_id].name,
+            PACE_UP.get(session.learning_pace, "fast")
+        )
+
     # ---------------------------------------------------
     # PROGRESS
     # ---------------------------------------------------
     def get_progress(self, user_id: str):
 
-        session = self.sessions.get(user_id)
+        session = self._session(user_id)
 
         if not session:
             return {}
 
+        return self._progress(session)
+
+    def get_progress_many(self, user_ids):
+
+        with metrics.timed("session_lookup"):
+            sessions = self.sessions.get_many(user_ids)
+
+        return {
+            "progress": {
+                user_id: self._progress(session)
+                for user_id, session in sessions.items()
+            },
+            "missing": [u for u in dict.fromkeys(user_ids) if u not in sessions]
+        }
+
+    def _progress(self, session: SessionRecord):
+
+        return {
+            "certification": session.certification,
+            "current_section": session.current_section,
+            "completed_sections": session.completed_sections,
+            "scores": session.scores,
+            "weak_topics": session.weak_topics,
+            "learning_pace": session.learning_pace
+        }
+
+    # ---------------------------------------------------
+    # COHORT ANALYTICS
+    # ---------------------------------------------------
+    async def get_analytics(
+        self,
+        certification: str = None,
+        pass_mark: float = 70,
+        min_attempts: int = 1
+    ):
+
+        # An in-memory store only holds what this worker recorded live;
+        # any other store may also hold scores from other workers
+        if (
+            not isinstance(self.sessions, MemorySessionStore)
+            and time.monotonic() - self.analytics_built > ANALYTICS_REFRESH_SECONDS
+        ):
+            self.analytics_built = time.monotonic()
+            self.analytics = await asyncio.to_thread(self._rebuild_analytics)
+
+        with metrics.timed("analytics"):
+            return self.analytics.summary(certification, pass_mark, min_attempts)
+
+    def _rebuild_analytics(self):
+        return ScoreMatrix.from_sessions(self.sessions.items())
+
+    # ---------------------------------------------------
+    # REVIEWS
+    # ---------------------------------------------------
+    def get_reviews(self, user_id: str):
+
+        return {
+            "next": self.reviews.next_due(user_id),
+            "due": self.reviews.due_for(user_id)
+        }
+
+    def drain_due_reviews(self, limit: int = 1000):
+
+        due = self.reviews.drain_due(limit=limit)
+        self.reviews.save()
+
+        return {"due": due}
+
+    # ---------------------------------------------------
+    # EVENT LOG
+    # ---------------------------------------------------
+    def _event(self, kind: str, user_id: str, **fields):
+
+        if not self.events:
+            return
+
+        self.events.append(kind, user_id, **fields)
+
+        if self.snapshot_scheduled or not self.events.snapshot_due():
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop, no later turn to wait for; close() snapshots
+            return
+
+        # The event can precede its sessions.put(); snapshot once the
+        # current request's updates have all reached the store
+        self.snapshot_scheduled = True
+        loop.call_soon(self._snapshot_events)
+
+    def _snapshot_events(self):
+
+        self.snapshot_scheduled = False
+
+        if self.events and self.events.snapshot_due():
+            self.events.snapshot(self.sessions.items())
+
+    # ---------------------------------------------------
+    # SESSION LOOKUP
+    # ---------------------------------------------------
+    def _session(self, user_id: str):
+
+        with metrics.timed("session_lookup"):
+            return self.sessions.get(user_id)
+
+    # ---------------------------------------------------
+    # STATS
+    # ---------------------------------------------------
+    def stats(self):
+
         return {
-            "certification": session["certification"],
-            "current_section": session["current_section"],
-            "completed_sections": session["completed_sections"],
-            "scores": session["scores"],
-            "weak_topics": session["weak_topics"],
-            "learning_pace": session["learning_pace"]
+            "lesson_cache": self.learning_agent.cache.stats(),
+            "quiz_bank": self.quiz_bank.stats(),
+            "llm": self.llm.stats(),
+            "retrieval": self.retriever.stats(),
+            "sessions": self.sessions.stats(),
+            "open_quizzes": self.quiz_sessions.count(),
+            "prefetch": self.prefetcher.stats(),
+            "chat_users": self.chat_memory.count(),
+            "reviews": self.reviews.stats(),
+            "analytics": self.analytics.stats(),
+            "events": self.events.stats() if self.events else None,
+            "curriculum": CURRICULUM.stats()
         }
+
+    def metric_samples(self):
+        """
+        Live gauges for the /metrics collector.
+        """
+
+        lesson = self.learning_agent.cache.stats()
+        bank = self.quiz_bank.stats()
+        flight = self.llm.single_flight.stats()
+
+        samples = [
+            ("tutor_lesson_cache_hit_ratio", "gauge", {}, lesson["hit_ratio"]),
+            ("tutor_lesson_cache_entries", "gauge", {}, lesson["size"]),
+            ("tutor_lesson_cache_lookups_total", "counter", {"result": "hit"}, lesson["hits"]),
+            ("tutor_lesson_cache_lookups_total", "counter", {"result": "disk_hit"}, lesson["disk_hits"]),
+            ("tutor_lesson_cache_lookups_total", "counter", {"result": "miss"}, lesson["misses"]),
+            ("tutor_quiz_served_total", "counter", {"source": "pool"}, bank["served_from_pool"]),
+            ("tutor_quiz_served_total", "counter", {"source": "cold"}, bank["served_cold"]),
+            ("tutor_llm_calls_total", "counter", {"kind": "upstream"}, flight["upstream_calls"]),
+            ("tutor_llm_calls_total", "counter", {"kind": "coalesced"}, flight["coalesced_calls"]),
+            ("tutor_llm_in_flight", "gauge", {}, self.llm.in_flight),
+            ("tutor_sessions", "gauge", {}, self.sessions.stats()["sessions"])
+        ]
+
+        samples += [
+            ("tutor_quiz_pool_size", "gauge", {"section": section}, size)
+            for section, size in bank["pools"].items()
+        ]
+
+        return samples
+
+    # ---------------------------------------------------
+    # WARM-UP
+    # ---------------------------------------------------
+    def warm(self, generate: bool = True):
+
+        # Scores recorded before this start are only in the session store
+        self.analytics = self._rebuild_analytics()
+        self.analytics_built = time.monotonic()
+
+        if not generate:
+            return
+
+        sections = CURRICULUM.current().section_names()
+
+        self.quiz_bank.warm(sections)
+        searches = self.retriever.warm([section_query(s) for s in sections])
+        # Lessons are grounded in the index these searches fill
+        self.learning_agent.warm(sections, after=searches)
+
+    async def aclose(self):
+
+        await self.prefetcher.aclose()
+        await self.quiz_bank.aclose()
+        await self.learning_agent.aclose()
+        await self.retriever.aclose()
+        await self.llm.aclose()
+        self.learning_agent.cache.close()
+
+        if self.events:
+            self.events.close(self.sessions.items())
+
+        self.sessions.close()
+        self.reviews.save()
+
+        if self.state:
+            self.state.close()
@@ -0,0 +1,137 @@
+import asyncio
+import time
+
+import metrics
+from dispatcher import PREFETCH, TokenBucket
+
+
+# -----------------------------
+# Lookahead Prefetcher
+# -----------------------------
+
+class Prefetcher:
+    """
+    Prepares a learner's next section before they reach it: its lesson
+    goes into the lesson cache and its quiz pool gets topped up.
+
+    Each learner has at most one prefetch; scheduling another replaces
+    it. Prefetches wait for one of `concurrency` slots and can be
+    cancelled until they get one; after that they run to completion so
+    the generated lesson isn't thrown away. Every prefetch that has to
+    generate something spends one unit of a per-minute budget.
+    """
+
+    def __init__(
+        self,
+        learning_agent,
+        quiz_bank,
+        per_minute: float = 30,
+        concurrency: int = 2
+    ):
+        self.learning_agent = learning_agent
+        self.quiz_bank = quiz_bank
+        self.budget = TokenBucket(per_minute)
+        self.slots = asyncio.Semaphore(concurrency)
+
+        self.tasks = {}
+        self.keys = set()
+        self.running = set()
+
+        self.scheduled = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.over_budget = 0
+        self.failed = 0
+
+    def schedule(self, user_id: str, section: str, pace: str):
+
+        key = (section, pace)
+        current = self.tasks.get(user_id)
+
+        # Already coming, for this learner or another
+        if (current and current[0] == key) or key in self.keys:
+            return
+
+        lesson_ready = self.learning_agent.has_lesson(section, pace)
+        quiz_ready = self.quiz_bank.pool_size(section) >= self.quiz_bank.low_water
+
+        if lesson_ready and quiz_ready:
+            return
+
+        self.cancel(user_id)
+
+        now = time.monotonic()
+
+        if self.budget.wait_time(1, now) > 0:
+            self.over_budget += 1
+            return
+
+        self.budget.take(1, now)
+        self.scheduled += 1
+
+        task = asyncio.get_running_loop().create_task(
+            self._run(user_id, section, pace, lesson_ready, quiz_ready)
+        )
+        self.tasks[user_id] = (key, task)
+        self.keys.add(key)
+        task.add_done_callback(lambda t: self._done(user_id, key, t))
+
+    def cancel(self, user_id: str):
+        """
+        Drop a learner's prefetch if it hasn't started generating yet.
+        """
+
+        entry = self.tasks.get(user_id)
+
+        if entry and entry[1] not in self.running:
+            entry[1].cancel()
+            self.cancelled += 1
+
+    async def _run(self, user_id, section, pace, lesson_ready, quiz_ready):
+
+        async with self.slots:
+            # Per task: a replaced prefetch may still be running
+            self.running.add(asyncio.current_task())
+
+            if not quiz_ready:
+                self.quiz_bank.refill(section)
+
+            if not lesson_ready:
+                try:
+                    await self.learning_agent.generate_lesson(
+                        section,
+                        pace,
+                        priority=PREFETCH
+                    )
+                except Exception as e:
+                    self.failed += 1
+                    metrics.record_error("prefetch", e)
+                    return
+
+        self.completed += 1
+
+    def _done(self, user_id, key, task):
+        if self.tasks.get(user_id, (None, None))[1] is task:
+            del self.tasks[user_id]
+
+        self.running.discard(task)
+        self.keys.discard(key)
+
+    def stats(self):
+        return {
+            "pending": sum(1 for _, task in self.tasks.values() if task not in self.running),
+            "running": len(self.running),
+            "scheduled": self.scheduled,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "over_budget": self.over_budget,
+            "failed": self.failed
+        }
+
+    async def aclose(self):
+        tasks = {task for _, task in self.tasks.values()} | self.running
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
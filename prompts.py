@@ -0,0 +1,132 @@
+from string import Template
+
+from google.genai import types
+
+
+# -----------------------------
+# Prompt Template
+# -----------------------------
+
+class PromptTemplate:
+    """
+    A compiled, versioned prompt with its own generation budget.
+
+    Bump `version` whenever the text changes so cached output for
+    the old wording stops matching.
+    """
+
+    __slots__ = ("name", "version", "template", "config", "cacheable")
+
+    def __init__(
+        self,
+        name: str,
+        version: str,
+        text: str,
+        max_output_tokens: int,
+        temperature: float,
+        cacheable: bool = True
+    ):
+        self.name = name
+        self.version = version
+        self.template = Template(text)
+        self.cacheable = cacheable
+        # Built once and shared by every call using this variant
+        self.config = types.GenerateContentConfig(
+            temperature=temperature,
+            max_output_tokens=max_output_tokens
+        )
+
+    @property
+    def key(self):
+        return f"{self.name}@{self.version}"
+
+    def render(self, **fields):
+        return self.template.substitute(**fields)
+
+
+# -----------------------------
+# Lesson Variants
+# -----------------------------
+
+STANDARD = PromptTemplate(
+    "standard",
+    "v3",
+    """
+You are an AWS certification tutor.
+
+Teach the section: $section
+
+Respond using:
+- Concept
+- Real World Example
+- Exam Tips
+- Common Mistakes
+$notes""",
+    max_output_tokens=1000,
+    temperature=0.7
+)
+
+RETEACH = PromptTemplate(
+    "reteach",
+    "v1",
+    """
+You are a patient AWS certification tutor. The learner struggled with
+the section: $section
+
+Re-explain it simply and briefly:
+- The core idea in plain words
+- One everyday analogy
+- The single most tested exam fact
+$notes""",
+    max_output_tokens=500,
+    temperature=0.5
+)
+
+DEEP_DIVE = PromptTemplate(
+    "deep_dive",
+    "v1",
+    """
+You are an AWS certification tutor teaching a learner who is moving fast.
+
+Give an in-depth lesson on the section: $section
+
+Respond using:
+- Concept, including how services interact
+- Two Real World Architectures
+- Edge Cases and Limits
+- Exam Tips and Distractors
+$notes""",
+    max_output_tokens=1600,
+    temperature=0.7
+)
+
+
+class PromptRegistry:
+    """
+    Lesson variants by name, chosen from learning pace and attempt.
+    """
+
+    def __init__(self, templates=(STANDARD, RETEACH, DEEP_DIVE)):
+        self.templates = {t.name: t for t in templates}
+
+    def get(self, name: str):
+        return self.templates[name]
+
+    def select(self, pace: str, attempt: int = 0):
+        """
+        Re-attempts and slow learners get the short reteach; fast
+        learners get the deep dive; everyone else the standard lesson.
+        """
+        if attempt > 0 or pace == "slow":
+            return self.templates["reteach"]
+
+        if pace == "fast":
+            return self.templates["deep_dive"]
+
+        return self.templates["standard"]
+
+    def cacheable(self):
+        return [t for t in self.templates.values() if t.cacheable]
+
+
+LESSON_PROMPTS = PromptRegistry()
@@ -0,0 +1,208 @@
+import hashlib
+import random
+import re
+
+import numpy as np
+
+# MinHash signature length, split into LSH bands of equal rows
+NUM_PERM = 64
+BANDS = 16
+
+# Universal hashing mod a Mersenne prime; products stay below 2**63
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240611)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+
+_WORD = re.compile(r"\w+")
+
+
+def shingles(text: str):
+    """
+    Word bigrams of the normalized text; single words for one-word text.
+    """
+    words = _WORD.findall(text.lower())
+
+    if len(words) < 2:
+        return set(words)
+
+    return {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def minhash(text: str):
+    """
+    NUM_PERM-value MinHash signature of a question's text.
+    """
+    grams = shingles(text) or {""}
+    hashes = np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "little")
+            for g in grams
+        ),
+        dtype=np.uint64,
+        count=len(grams)
+    )
+
+    return ((np.outer(hashes, _A) + _B) % _PRIME).min(axis=0).astype(np.uint32)
+
+
+# -----------------------------
+# Question Store
+# -----------------------------
+
+class QuestionStore:
+    """
+    Every generated question, indexed by MinHash for near-duplicate
+    detection and similarity search, all in-process on the CPU.
+
+    add() rejects exact repeats and questions whose estimated Jaccard
+    similarity to a stored one reaches `threshold`; LSH banding keeps
+    that check to a handful of candidates. Signatures live in one
+    NumPy matrix, so ranking a section's questions against a few
+    others is a single vectorized comparison.
+
+    At most max_items are kept; past that each new question takes the
+    slot of the oldest, which leaves the index and its LSH bands.
+    """
+
+    def __init__(self, threshold: float = 0.7, max_items: int = 50000):
+        self.threshold = threshold
+        self.max_items = max_items
+        self.rows = NUM_PERM // BANDS
+
+        self.items = []
+        self.fingerprints = []
+        self.item_sections = []
+        self.ids = {}
+        self.sections = {}
+        self.buckets = {}
+        self.signatures = np.zeros((min(1024, max_items), NUM_PERM), dtype=np.uint32)
+        self.oldest = 0
+
+        self.rejected_exact = 0
+        self.rejected_near = 0
+        self.evicted = 0
+
+    # ---------------------------------------------------
+    # INSERT
+    # ---------------------------------------------------
+    def add(self, section: str, question: dict, fingerprint: str):
+        """
+        False if the question repeats a stored one.
+        """
+        if fingerprint in self.ids:
+            self.rejected_exact += 1
+            return False
+
+        signature = minhash(question["question"])
+        keys = self._band_keys(signature)
+        candidates = {i for key in keys for i in self.buckets.get(key, ())}
+
+        if candidates:
+            rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            similarity = (self.signatures[rows] == signature).mean(axis=1)
+
+            if similarity.max() >= self.threshold:
+                self.rejected_near += 1
+                return False
+
+        if len(self.items) < self.max_items:
+            index = len(self.items)
+
+            if index == len(self.signatures):
+                grown = min(2 * len(self.signatures), self.max_items)
+                self.signatures = np.concatenate([
+                    self.signatures,
+                    np.zeros((grown - len(self.signatures), NUM_PERM), dtype=np.uint32)
+                ])
+
+            self.items.append(question)
+            self.fingerprints.append(fingerprint)
+            self.item_sections.append(section)
+        else:
+            index = self.oldest
+            self.oldest = (index + 1) % self.max_items
+            self._evict(index)
+
+            self.items[index] = question
+            self.fingerprints[index] = fingerprint
+            self.item_sections[index] = section
+
+        self.signatures[index] = signature
+        self.ids[fingerprint] = index
+        # Dicts as ordered sets: eviction removes a member in O(1)
+        self.sections.setdefault(section, {})[index] = None
+
+        for key in keys:
+            self.buckets.setdefault(key, set()).add(index)
+
+        return True
+
+    def _evict(self, index):
+        del self.ids[self.fingerprints[index]]
+
+        section = self.sections[self.item_sections[index]]
+        del section[index]
+
+        if not section:
+            del self.sections[self.item_sections[index]]
+
+        for key in self._band_keys(self.signatures[index]):
+            bucket = self.buckets[key]
+            bucket.discard(index)
+
+            if not bucket:
+                del self.buckets[key]
+
+        self.evicted += 1
+
+    def _band_keys(self, signature):
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(BANDS)
+        ]
+
+    # ---------------------------------------------------
+    # LOOKUP
+    # ---------------------------------------------------
+    def section_size(self, section: str):
+        return len(self.sections.get(section, ()))
+
+    def retake(self, section: str, count: int, exclude=(), focus=()):
+        """
+        `count` stored questions for a section the learner hasn't seen
+        (fingerprints in exclude). With focus fingerprints, e.g. the
+        questions they missed, the closest matches come first;
+        otherwise the pick is random. Fewer if the section runs short.
+        """
+        pool = [
+            i for i in self.sections.get(section, ())
+            if self.fingerprints[i] not in exclude
+        ]
+
+        if len(pool) <= count:
+            return [self.items[i] for i in pool]
+
+        anchors = [self.ids[fp] for fp in focus if fp in self.ids]
+
+        if not anchors:
+            return [self.items[i] for i in random.sample(pool, count)]
+
+        rows = np.asarray(pool, dtype=np.int64)
+        # Similarity of every candidate to its closest anchor
+        similarity = (
+            self.signatures[rows][:, None, :] == self.signatures[anchors][None, :, :]
+        ).mean(axis=2).max(axis=1)
+
+        best = np.argsort(-similarity, kind="stable")[:count]
+
+        return [self.items[rows[i]] for i in best]
+
+    def stats(self):
+        return {
+            "questions": len(self.items),
+            "sections": {s: len(i) for s, i in self.sections.items()},
+            "rejected_exact": self.rejected_exact,
+            "rejected_near_duplicate": self.rejected_near,
+            "evicted": self.evicted
+        }
@@ -0,0 +1,416 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict, deque
+
+from dispatcher import INTERACTIVE, PREFETCH
+
+
+def question_fingerprint(question: dict):
+    """
+    Stable id for a question, insensitive to case and spacing.
+    """
+    text = " ".join(question.get("question", "").lower().split())
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+class LearnerHistory:
+    """
+    Questions one learner was recently served, their last quiz and the
+    questions of it they missed.
+    """
+
+    __slots__ = ("seen", "last_served", "missed", "last_seen")
+
+    def __init__(self):
+        self.seen = {}
+        self.last_served = None
+        self.missed = ()
+        self.last_seen = time.monotonic()
+
+    def to_dict(self):
+        return {
+            "seen": list(self.seen),
+            "last_served": self.last_served,
+            "missed": list(self.missed)
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        history = cls()
+        history.seen = dict.fromkeys(data["seen"])
+        history.last_served = data["last_served"]
+        history.missed = data["missed"]
+
+        return history
+
+
+# -----------------------------
+# Quiz Bank
+# -----------------------------
+
+class QuizBank:
+    """
+    Per-section pools of pre-generated questions.
+
+    take() serves a quiz straight from the pool; background tasks
+    top a pool back up to high_water once it drops below low_water.
+    Everything runs on the event loop, so pool updates need no locks.
+
+    With a QuestionStore, generated questions that repeat a stored one
+    never reach a pool; instead take() tops a short pool up with stored
+    questions the learner hasn't seen, and retakes come from the store.
+    A refill that turns up nothing new pauses that section's refills
+    for stale_cooldown seconds rather than keep paying for repeats.
+
+    Learner histories are kept in LRU order like the session store:
+    at most max_learners, and dropped after idle_ttl without a quiz.
+    With a shared_state store they live there instead, with idle_ttl
+    as the store's ttl, so any worker knows what a learner has seen.
+    """
+
+    HISTORY_PREFIX = "quiz-history:"
+
+    def __init__(
+        self,
+        generate,
+        quiz_size: int = 5,
+        low_water: int = 10,
+        high_water: int = 25,
+        workers: int = 2,
+        history_size: int = 200,
+        store=None,
+        stale_cooldown: float = 60,
+        max_learners: int = 100000,
+        idle_ttl: float = 6 * 3600,
+        kv=None
+    ):
+        self.generate = generate
+        self.store = store
+        self.stale_cooldown = stale_cooldown
+        self.stale_until = {}
+        self.quiz_size = quiz_size
+        self.low_water = low_water
+        self.high_water = high_water
+        self.history_size = history_size
+        self.max_learners = max_learners
+        self.idle_ttl = idle_ttl
+        self.kv = kv
+
+        self.pools = {}
+        self.learners = OrderedDict()
+        self.refilling = set()
+        self.tasks = set()
+        self.refill_slots = asyncio.Semaphore(workers)
+
+        self.served_from_pool = 0
+        self.served_cold = 0
+        self.served_degraded = 0
+        self.served_retake = 0
+        self.served_from_store = 0
+        self.refills = 0
+        self.refills_stale = 0
+        self.refill_errors = 0
+        self.learners_evicted = 0
+        self.learners_expired = 0
+
+    # ---------------------------------------------------
+    # SERVE
+    # ---------------------------------------------------
+    async def take(self, user_id: str, section: str):
+
+        picked = self._pick(user_id, section)
+        stored = self._from_store(user_id, section, picked)
+
+        if len(picked) == self.quiz_size:
+            self.served_from_pool += 1
+        elif len(picked) + len(stored) == self.quiz_size:
+            picked += stored
+            self.served_from_store += 1
+        else:
+            # Cold pool: this learner pays for one generation, the
+            # leftovers seed the pool for everyone else.
+            self.served_cold += 1
+
+            try:
+                self._add(section, await self._generate(section, INTERACTIVE))
+            except Exception:
+                # Degraded: stored questions first, then ones this
+                # learner has seen, rather than fail while generation is down
+                picked += self._from_store(user_id, section, picked)
+                picked += self._pick(
+                    user_id,
+                    section,
+                    self.quiz_size - len(picked),
+                    allow_seen=True
+                )
+
+                if not picked:
+                    raise
+
+                self.served_degraded += 1
+            else:
+                picked += self._pick(user_id, section, self.quiz_size - len(picked))
+                picked += self._from_store(user_id, section, picked)
+
+        self._remember(user_id, picked, section)
+
+        if len(self.pools[section]) < self.low_water:
+            self.refill(section)
+
+        return {"questions": picked}
+
+    async def retake(self, user_id: str, section: str):
+        """
+        A quiz for a section the learner failed, built from stored
+        questions they haven't seen, closest to the ones they missed.
+        Falls back to take() when the store has too few.
+        """
+
+        if self.store is None:
+            return await self.take(user_id, section)
+
+        history = self._history(user_id)
+        picked = self.store.retake(
+            section,
+            self.quiz_size,
+            exclude=history.seen if history else {},
+            focus=history.missed if history else ()
+        )
+
+        if len(picked) < self.quiz_size:
+            return await self.take(user_id, section)
+
+        self.served_retake += 1
+        self._remember(user_id, picked, section)
+
+        return {"questions": picked}
+
+    def _from_store(self, user_id, section, picked):
+        """
+        Stored questions to complete `picked`, none the learner has seen.
+        """
+
+        missing = self.quiz_size - len(picked)
+
+        if self.store is None or missing <= 0:
+            return []
+
+        history = self._history(user_id)
+        exclude = set(history.seen if history else ())
+        exclude.update(question_fingerprint(q) for q in picked)
+
+        return self.store.retake(section, missing, exclude=exclude)
+
+    def record_results(self, user_id: str, section: str, results):
+        """
+        Note which questions of the learner's last quiz they got wrong.
+        """
+
+        history = self._history(user_id)
+        served = history.last_served if history else None
+
+        if served and served[0] == section and len(served[1]) == len(results):
+            history.missed = [
+                fp for fp, correct in zip(served[1], results) if not correct
+            ]
+            self._save(user_id, history)
+
+    def pool_size(self, section: str):
+        return len(self.pools.get(section, ()))
+
+    def _pick(self, user_id, section, count=None, allow_seen=False):
+        count = self.quiz_size if count is None else count
+        pool = self.pools.setdefault(section, deque())
+        history = None if allow_seen else self._history(user_id)
+        seen = history.seen if history else {}
+
+        picked = []
+        skipped = []
+
+        while pool and len(picked) < count:
+            question = pool.popleft()
+
+            if question_fingerprint(question) in seen:
+                skipped.append(question)
+            else:
+                picked.append(question)
+
+        # Questions this learner already saw stay available to others
+        pool.extend(skipped)
+
+        return picked
+
+    def _remember(self, user_id, questions, section):
+        history = self._history(user_id)
+
+        if history is None:
+            history = LearnerHistory()
+
+            if self.kv is None:
+                self.learners[user_id] = history
+                self._evict()
+
+        seen = history.seen
+        served = [question_fingerprint(q) for q in questions]
+
+        for fp in served:
+            seen[fp] = None
+
+        history.last_served = (section, served)
+
+        while len(seen) > self.history_size:
+            del seen[next(iter(seen))]
+
+        self._save(user_id, history)
+
+    def _history(self, user_id):
+        if self.kv is not None:
+            data = self.kv.get(self.HISTORY_PREFIX + user_id)
+            return LearnerHistory.from_dict(json.loads(data)) if data else None
+
+        history = self.learners.get(user_id)
+
+        if history is None:
+            return None
+
+        now = time.monotonic()
+
+        if now - history.last_seen > self.idle_ttl:
+            del self.learners[user_id]
+            self.learners_expired += 1
+            return None
+
+        history.last_seen = now
+        self.learners.move_to_end(user_id)
+
+        return history
+
+    def _save(self, user_id, history):
+        # Local histories are edited in place
+        if self.kv is not None:
+            self.kv.set(
+                self.HISTORY_PREFIX + user_id,
+                json.dumps(history.to_dict()),
+                ttl=self.idle_ttl
+            )
+
+    def _evict(self):
+        now = time.monotonic()
+
+        while self.learners:
+            user_id, oldest = next(iter(self.learners.items()))
+
+            if len(self.learners) > self.max_learners:
+                self.learners_evicted += 1
+            elif now - oldest.last_seen > self.idle_ttl:
+                self.learners_expired += 1
+            else:
+                break
+
+            del self.learners[user_id]
+
+    def _add(self, section, questions):
+        """
+        Number of questions that were new and joined the pool.
+        """
+        pool = self.pools.setdefault(section, deque())
+        present = {question_fingerprint(q) for q in pool}
+        added = 0
+
+        for question in questions:
+            fp = question_fingerprint(question)
+
+            if fp in present:
+                continue
+
+            if self.store is not None and not self.store.add(section, question, fp):
+                continue
+
+            present.add(fp)
+            pool.append(question)
+            added += 1
+
+        return added
+
+    async def _generate(self, section, priority):
+        quiz = await self.generate(section, priority=priority) or {}
+        return [
+            q for q in quiz.get("questions", [])
+            if q.get("question") and q.get("options") and q.get("answer")
+        ]
+
+    # ---------------------------------------------------
+    # BACKGROUND REFILL
+    # ---------------------------------------------------
+    def refill(self, section: str):
+
+        if section in self.refilling:
+            return
+
+        if time.monotonic() < self.stale_until.get(section, 0):
+            return
+
+        self.refilling.add(section)
+
+        task = asyncio.get_running_loop().create_task(self._refill(section))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def warm(self, sections):
+        for section in sections:
+            self.refill(section)
+
+    async def _refill(self, section):
+        try:
+            async with self.refill_slots:
+                # Cap attempts so a model returning junk can't spin forever
+                for _ in range(self.high_water // max(self.quiz_size, 1) + 2):
+
+                    if len(self.pools.get(section, ())) >= self.high_water:
+                        break
+
+                    try:
+                        questions = await self._generate(section, PREFETCH)
+                    except Exception:
+                        self.refill_errors += 1
+                        break
+
+                    self.refills += 1
+
+                    if questions and not self._add(section, questions):
+                        # The model only repeats stored questions for now
+                        self.refills_stale += 1
+                        self.stale_until[section] = time.monotonic() + self.stale_cooldown
+                        break
+        finally:
+            self.refilling.discard(section)
+
+    # ---------------------------------------------------
+    # STATS
+    # ---------------------------------------------------
+    def stats(self):
+        return {
+            "pools": {s: len(p) for s, p in self.pools.items()},
+            "refilling": sorted(self.refilling),
+            # Shared histories aren't counted; /metrics reads these stats
+            "learners": len(self.learners) if self.kv is None else None,
+            "learners_evicted": self.learners_evicted,
+            "learners_expired": self.learners_expired,
+            "served_from_pool": self.served_from_pool,
+            "served_cold": self.served_cold,
+            "served_degraded": self.served_degraded,
+            "served_retake": self.served_retake,
+            "served_from_store": self.served_from_store,
+            "store": self.store.stats() if self.store is not None else None,
+            "refills": self.refills,
+            "refill_errors": self.refill_errors,
+            "refills_stale": self.refills_stale
+        }
+
+    async def aclose(self):
+        for task in list(self.tasks):
+            task.cancel()
+
+        await asyncio.gather(*self.tasks, return_exceptions=True)
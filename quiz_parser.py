@@ -0,0 +1,141 @@
+import json
+import re
+
+_decoder = json.JSONDecoder()
+
+# "A", "b)", "C." style answers that point at an option by letter
+_LETTER = re.compile(r"^\s*\(?([A-Fa-f])[\).:]?\s*$")
+# "A) text" / "B. text" prefixes some models put on options
+_PREFIX = re.compile(r"^\s*\(?[A-Fa-f][\).:]\s+")
+
+
+# -----------------------------
+# Incremental Extraction
+# -----------------------------
+
+def extract_questions(text: str):
+    """
+    Pull every complete question object out of model output.
+
+    Tolerates markdown fences, leading chatter and output cut off at
+    max_output_tokens: parsing stops at the first incomplete object and
+    keeps everything before it. Returns (questions, truncated), with
+    questions None when the text holds no question array at all.
+    """
+    if not text:
+        return None, False
+
+    start = _array_start(text)
+
+    if start is None:
+        return None, False
+
+    questions = []
+    pos = start + 1
+    end = len(text)
+
+    while pos < end:
+        # Skip whitespace and separators between objects
+        while pos < end and text[pos] in " \t\r\n,":
+            pos += 1
+
+        if pos >= end:
+            break
+
+        if text[pos] == "]":
+            return questions, False
+
+        try:
+            item, pos = _decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            return questions, True
+
+        if isinstance(item, dict):
+            questions.append(item)
+
+    return questions, True
+
+
+def _array_start(text):
+    key = text.find('"questions"')
+
+    if key != -1:
+        start = text.find("[", key)
+        return start if start != -1 else None
+
+    # Some replies skip the wrapper object and return a bare list
+    start = text.find("[")
+    return start if start != -1 else None
+
+
+# -----------------------------
+# Validation & Repair
+# -----------------------------
+
+def validate_question(item: dict):
+    """
+    Normalized copy of a question, or None if it can't be trusted.
+
+    The answer must match one of the options; letter answers ("B")
+    and lettered options ("B) S3") are repaired when unambiguous.
+    """
+    question = item.get("question")
+    options = item.get("options")
+    answer = item.get("answer")
+
+    if not isinstance(question, str) or not question.strip():
+        return None
+
+    if not isinstance(options, list) or len(options) < 2:
+        return None
+
+    if not all(isinstance(o, str) and o.strip() for o in options):
+        return None
+
+    options = [_PREFIX.sub("", o).strip() for o in options]
+
+    if len(set(options)) != len(options):
+        return None
+
+    if not isinstance(answer, str):
+        return None
+
+    letter = _LETTER.match(answer)
+
+    if letter:
+        index = ord(letter.group(1).upper()) - ord("A")
+        if index >= len(options):
+            return None
+        answer = options[index]
+    else:
+        answer = _PREFIX.sub("", answer).strip()
+
+    if answer not in options:
+        return None
+
+    return {
+        "question": question.strip(),
+        "options": options,
+        "answer": answer
+    }
+
+
+def parse_quiz(text: str):
+    """
+    Returns (valid questions, truncated, rejected count); valid is None
+    when the output isn't a question list, and [] when the model
+    returned an empty one.
+    """
+    items, truncated = extract_questions(text)
+
+    if items is None:
+        return None, False, 0
+
+    valid = []
+
+    for item in items:
+        question = validate_question(item)
+        if question:
+            valid.append(question)
+
+    return valid, truncated, len(items) - len(valid)
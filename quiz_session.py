@@ -0,0 +1,150 @@
+import json
+import time
+import uuid
+from collections import OrderedDict
+
+
+# -----------------------------
+# Quiz Session
+# -----------------------------
+
+class QuizSession:
+    """
+    A quiz handed to a learner; only the answer key stays on the server.
+    The key is one byte per question: the index of the correct option.
+    """
+
+    __slots__ = ("user_id", "section", "answer_key", "created_at")
+
+    def __init__(self, user_id: str, section: str, answer_key: bytes, created_at: float = None):
+        self.user_id = user_id
+        self.section = section
+        self.answer_key = answer_key
+        self.created_at = created_at or time.time()
+
+    def grade(self, answers):
+        """
+        Per-question correctness; missing or out-of-range answers count wrong.
+        """
+        return [
+            i < len(answers) and answers[i] == correct
+            for i, correct in enumerate(self.answer_key)
+        ]
+
+
+def split_quiz(questions):
+    """
+    Public questions (no answers) and the compact answer key.
+    """
+    public = []
+    key = bytearray()
+
+    for q in questions:
+        public.append({"question": q["question"], "options": q["options"]})
+        key.append(q["options"].index(q["answer"]))
+
+    return public, bytes(key)
+
+
+# -----------------------------
+# Quiz Session Store
+# -----------------------------
+
+class QuizSessionStore:
+    """
+    Open quizzes by id, oldest first, dropped after ttl seconds or when
+    more than max_sessions are open. Each quiz can be graded once.
+    """
+
+    def __init__(self, ttl: float = 3600, max_sessions: int = 100000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+
+    def create(self, user_id: str, section: str, questions):
+        public, answer_key = split_quiz(questions)
+        quiz_id = uuid.uuid4().hex
+
+        self.sessions[quiz_id] = QuizSession(user_id, section, answer_key)
+        self._expire()
+
+        return quiz_id, public
+
+    def get(self, quiz_id: str):
+        self._expire()
+        return self.sessions.get(quiz_id)
+
+    def pop(self, quiz_id: str):
+        self._expire()
+        return self.sessions.pop(quiz_id, None)
+
+    def count(self):
+        return len(self.sessions)
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+
+        while self.sessions:
+            quiz_id, oldest = next(iter(self.sessions.items()))
+
+            if len(self.sessions) <= self.max_sessions and oldest.created_at > cutoff:
+                break
+
+            del self.sessions[quiz_id]
+
+
+# -----------------------------
+# Shared Quiz Session Store
+# -----------------------------
+
+class SharedQuizSessionStore:
+    """
+    Open quizzes in a shared_state store, so the quiz can be graded by
+    whichever worker receives the answers. Expiry is the store's ttl,
+    and pop is atomic, so each quiz is still graded once.
+    """
+
+    PREFIX = "quiz:"
+
+    def __init__(self, kv, ttl: float = 3600):
+        self.kv = kv
+        self.ttl = ttl
+
+    def create(self, user_id: str, section: str, questions):
+        public, answer_key = split_quiz(questions)
+        quiz_id = uuid.uuid4().hex
+
+        self.kv.set(
+            self.PREFIX + quiz_id,
+            json.dumps({
+                "user_id": user_id,
+                "section": section,
+                "answer_key": answer_key.hex(),
+                "created_at": time.time()
+            }),
+            ttl=self.ttl
+        )
+
+        return quiz_id, public
+
+    def get(self, quiz_id: str):
+        return self._decode(self.kv.get(self.PREFIX + quiz_id))
+
+    def pop(self, quiz_id: str):
+        return self._decode(self.kv.pop(self.PREFIX + quiz_id))
+
+    def _decode(self, data):
+        if not data:
+            return None
+
+        data = json.loads(data)
+
+        return QuizSession(
+            data["user_id"],
+            data["section"],
+            bytes.fromhex(data["answer_key"]),
+            data["created_at"]
+        )
+
+    def count(self):
+        return self.kv.count(self.PREFIX)
@@ -0,0 +1,326 @@
+# replay.py - Replay recorded API traffic
+#
+# Reads a trace recorded with TRACE_RECORD_PATH and replays each
+# learner's requests in order, keeping their think time between
+# steps, against the API on fake Gemini/Tavily backends. Every --rates
+# multiplier compresses the trace in time (and --clones multiplies the
+# learners); the first rate the server cannot keep up with is reported
+# as the saturation point:
+#
+#   TRACE_RECORD_PATH=traces.jsonl python api.py
+#   python replay.py traces.jsonl --rates 1,2,4,8,16
+#   python replay.py traces.jsonl --url http://127.0.0.1:8000 --clones 10
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import time
+
+from bench import git_commit, percentile, start_server, summarize
+
+# Achieved throughput below this share of the offered rate is saturation
+KEEP_UP = 0.9
+
+
+# -----------------------------
+# Trace
+# -----------------------------
+
+def load_trace(path):
+    """
+    Recorded requests grouped into flows: one per learner pseudonym,
+    plus one per request that names no learner. Times become offsets
+    from the earliest request in the file.
+    """
+    flows = {}
+    start = None
+
+    with open(path) as f:
+        for i, line in enumerate(f):
+            if not line.strip():
+                continue
+
+            entry = json.loads(line)
+            start = entry["t"] if start is None else min(start, entry["t"])
+            learner = learner_of(entry)
+            flows.setdefault(learner or f"#{i}", []).append(entry)
+
+    for steps in flows.values():
+        for entry in steps:
+            entry["t"] = round(entry["t"] - start, 4)
+
+        steps.sort(key=lambda e: e["t"])
+
+    return list(flows.values())
+
+
+def learner_of(entry):
+    for source in (entry.get("params"), entry.get("body"), entry.get("query")):
+        if isinstance(source, dict) and source.get("user_id"):
+            user = source["user_id"]
+            return user[0] if isinstance(user, list) else user
+
+    return None
+
+
+def restore(payload, users, flow):
+    """
+    Rebuild a request payload: pseudonyms become replay user ids,
+    lengths become filler text and quiz ids come from this flow's
+    last /assess response.
+    """
+    if isinstance(payload, list):
+        return [restore(item, users, flow) for item in payload]
+
+    if not isinstance(payload, dict):
+        return payload
+
+    rebuilt = {}
+
+    for key, value in payload.items():
+        if key in ("user_id", "user_ids"):
+            rebuilt[key] = [users(v) for v in value] if isinstance(value, list) else users(value)
+        elif key.endswith("_chars"):
+            rebuilt[key[:-len("_chars")]] = ("what is " * value)[:value] or "?"
+        elif key == "quiz_id":
+            rebuilt[key] = flow.get("quiz_id")
+        else:
+            rebuilt[key] = restore(value, users, flow)
+
+    return rebuilt
+
+
+# -----------------------------
+# Replay
+# -----------------------------
+
+async def replay_level(client, flows, rate, clones, tag, seed):
+    rng = random.Random(seed)
+    samples = {}
+    statuses = {}
+    errors = {}
+
+    span = max((s[-1]["t"] for s in flows), default=0.0)
+    total = sum(len(s) for s in flows) * clones
+
+    async def run_flow(steps, clone):
+        flow = {}
+
+        def users(pseudonym):
+            return f"{pseudonym}-{tag}-{clone}"
+
+        # Clones start within a second of the original, scaled
+        await asyncio.sleep(max(0.0, steps[0]["t"] + rng.random() * (clone > 0)) / rate)
+
+        previous = None
+
+        for entry in steps:
+            if previous is not None:
+                # Think time: gap between the last response and this request
+                think = entry["t"] - previous["t"] - previous["ms"] / 1000
+                await asyncio.sleep(max(0.0, think) / rate)
+
+            previous = entry
+            endpoint = f"{entry['method']} {entry['route']}"
+            params = restore(entry.get("params") or {}, users, flow)
+            body = restore(entry.get("body"), users, flow)
+
+            started = time.perf_counter()
+
+            try:
+                r = await client.request(
+                    entry["method"],
+                    entry["route"].format(**params),
+                    params=restore(entry.get("query") or {}, users, flow) or None,
+                    json=body
+                )
+            except Exception as e:
+                name = type(e).__name__
+                errors[name] = errors.get(name, 0) + 1
+                continue
+
+            samples.setdefault(endpoint, []).append(time.perf_counter() - started)
+            statuses.setdefault(endpoint, {})
+            statuses[endpoint][r.status_code] = statuses[endpoint].get(r.status_code, 0) + 1
+
+            if entry["route"] == "/assess" and r.status_code == 200:
+                flow["quiz_id"] = (r.json().get("quiz") or {}).get("quiz_id")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        run_flow(steps, clone)
+        for steps in flows
+        for clone in range(clones)
+    ))
+    elapsed = time.perf_counter() - started
+
+    failed = sum(errors.values()) + sum(
+        count
+        for codes in statuses.values()
+        for code, count in codes.items() if code >= 500
+    )
+    completed = sum(len(v) for v in samples.values())
+    latencies = [x for v in samples.values() for x in v]
+
+    offered = total / (span / rate) if span else None
+    achieved = completed / elapsed if elapsed else 0.0
+
+    return {
+        "rate": rate,
+        "clones": clones,
+        "requests": total,
+        "completed": completed,
+        "elapsed_s": round(elapsed, 3),
+        "offered_rps": round(offered, 2) if offered else None,
+        "achieved_rps": round(achieved, 2),
+        "error_rate": round(failed / total, 4) if total else 0.0,
+        "errors": errors,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "statuses": {k: {str(c): n for c, n in v.items()} for k, v in statuses.items()},
+        "endpoints": summarize(samples)
+    }
+
+
+def saturated(result, slo_ms):
+    if result["error_rate"] > 0.01:
+        return True
+    if slo_ms and result["p95_ms"] > slo_ms:
+        return True
+    if result["offered_rps"] and result["achieved_rps"] < KEEP_UP * result["offered_rps"]:
+        return True
+    return False
+
+
+async def run(args, flows):
+    import httpx
+
+    server = None
+
+    if not args.url:
+        server = start_server(args.port)
+
+    base_url = args.url or f"http://127.0.0.1:{args.port}"
+    limits = httpx.Limits(
+        max_connections=args.max_connections,
+        max_keepalive_connections=args.max_connections
+    )
+    results = []
+
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+            for i, rate in enumerate(args.rates):
+                result = await replay_level(
+                    client,
+                    flows,
+                    rate,
+                    args.clones,
+                    tag=f"r{i}-{int(time.time())}",
+                    seed=i
+                )
+                result["saturated"] = saturated(result, args.slo_ms)
+                results.append(result)
+                print_result(result)
+
+                if result["saturated"] and not args.keep_going:
+                    break
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    return results
+
+
+# -----------------------------
+# Reporting
+# -----------------------------
+
+def print_result(result):
+    print(
+        f"x{result['rate']:<6} offered={result['offered_rps']} req/s "
+        f"achieved={result['achieved_rps']} req/s "
+        f"p95={result['p95_ms']}ms errors={result['error_rate']:.2%}"
+        f"{'  ⚠️ saturated' if result['saturated'] else ''}"
+    )
+
+    for endpoint, s in sorted(result["endpoints"].items()):
+        print(
+            f"{'':>8}{endpoint:<28} n={s['count']:<6} p50={s['p50_ms']:>8}ms "
+            f"p95={s['p95_ms']:>8}ms p99={s['p99_ms']:>8}ms"
+        )
+
+
+def saturation_point(results):
+    sustained = [r for r in results if not r["saturated"]]
+    first = next((r for r in results if r["saturated"]), None)
+
+    return {
+        "max_sustained_rate": sustained[-1]["rate"] if sustained else None,
+        "max_sustained_rps": max((r["achieved_rps"] for r in sustained), default=None),
+        "saturated_at_rate": first["rate"] if first else None,
+        "saturated_at_offered_rps": first["offered_rps"] if first else None
+    }
+
+
+# -----------------------------
+# Entry Point
+# -----------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded tutor traffic")
+    parser.add_argument("trace", help="JSONL trace recorded with TRACE_RECORD_PATH")
+    parser.add_argument("--rates", default="1,2,4,8,16")
+    parser.add_argument("--clones", type=int, default=1)
+    parser.add_argument("--url", help="running server; default starts one with fake backends")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--slo-ms", type=float, default=0, help="p95 above this counts as saturated")
+    parser.add_argument("--keep-going", action="store_true", help="run every rate, even past saturation")
+    parser.add_argument("--max-connections", type=int, default=1000)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--search-latency", type=float, default=0.3)
+    parser.add_argument("--out", default="replay_results.json")
+    args = parser.parse_args()
+    args.rates = [float(x) for x in args.rates.split(",")]
+
+    # Inherited by the server start_server() launches
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["SEARCH_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY"] = str(args.llm_latency)
+    os.environ["FAKE_SEARCH_LATENCY"] = str(args.search_latency)
+    # Don't record the replay into a trace
+    os.environ.pop("TRACE_RECORD_PATH", None)
+
+    flows = load_trace(args.trace)
+    print(f"🔁 Replaying {sum(len(s) for s in flows)} requests from {len(flows)} flows...")
+
+    results = asyncio.run(run(args, flows))
+    point = saturation_point(results)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "trace": args.trace,
+            "llm_latency_s": args.llm_latency,
+            "search_latency_s": args.search_latency
+        },
+        "saturation": point,
+        "results": results
+    }
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(
+        f"📈 Max sustained: x{point['max_sustained_rate']} "
+        f"({point['max_sustained_rps']} req/s); "
+        f"saturated at x{point['saturated_at_rate']}"
+    )
+    print(f"✅ Results saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import asyncio
+import time
+from collections import deque
+
+from dispatcher import LLMOverloaded
+
+
+class CircuitOpen(LLMOverloaded):
+    """
+    Raised without calling upstream while a model's breaker is open.
+    """
+
+    def __init__(self, model: str, retry_after: float):
+        super().__init__(retry_after, f"{model} is temporarily unavailable")
+
+
+# -----------------------------
+# Circuit Breaker
+# -----------------------------
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failures` consecutive upstream failures.
+    Open rejects every call for reset_timeout seconds, then lets a
+    single probe through (half-open): success closes the breaker,
+    failure opens it again.
+    """
+
+    def __init__(self, model: str, failures: int = 5, reset_timeout: float = 30):
+        self.model = model
+        self.threshold = failures
+        self.reset_timeout = reset_timeout
+
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started = None
+        self.trips = 0
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def available(self):
+        """
+        Whether a call would be let through right now; no side effects.
+        """
+        state = self.state
+
+        if state == "closed":
+            return True
+        if state == "open":
+            return False
+
+        return self._probe_free()
+
+    def before(self):
+        """
+        Admit a call or raise CircuitOpen.
+        """
+        state = self.state
+
+        if state == "closed":
+            return
+
+        if state == "half_open" and self._probe_free():
+            self.probe_started = time.monotonic()
+            return
+
+        raise CircuitOpen(
+            self.model,
+            retry_after=max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+        )
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started = None
+
+    def failure(self):
+        self.failures += 1
+        self.probe_started = None
+
+        if self.opened_at is not None or self.failures >= self.threshold:
+            if self.opened_at is None:
+                self.trips += 1
+            self.opened_at = time.monotonic()
+
+    def _probe_free(self):
+        # A probe that hangs past reset_timeout doesn't block the next one
+        return (
+            self.probe_started is None
+            or time.monotonic() - self.probe_started >= self.reset_timeout
+        )
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "trips": self.trips
+        }
+
+
+# -----------------------------
+# Latency Window
+# -----------------------------
+
+class LatencyWindow:
+    """
+    The last `size` call latencies, for percentile-based hedge delays.
+    """
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, q: float):
+        """
+        None until enough samples have been seen.
+        """
+        if len(self.samples) < self.min_samples:
+            return None
+
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# -----------------------------
+# Hedged Call
+# -----------------------------
+
+async def hedged(attempt, delay: float, may_hedge, release=None):
+    """
+    Await attempt(); if it hasn't answered after `delay` seconds and
+    may_hedge() allows it, start a second attempt and return whichever
+    succeeds first. Returns (result, hedge_won); the loser is cancelled
+    and release() runs once it has actually finished, so the hedge's
+    slot is held for as long as a request is still upstream.
+    """
+
+    tasks = [asyncio.ensure_future(attempt())]
+
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+
+        if done or not may_hedge():
+            return await tasks[0], False
+
+        tasks.append(asyncio.ensure_future(attempt()))
+        pending = set(tasks)
+        error = None
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), task is tasks[1]
+
+                error = error or task.exception()
+
+        raise error
+    finally:
+        running = [task for task in tasks if not task.done()]
+
+        for task in running:
+            task.cancel()
+
+        if len(tasks) > 1 and release is not None:
+            if running:
+                settled = asyncio.gather(*running, return_exceptions=True)
+                settled.add_done_callback(lambda _: release())
+            else:
+                release()
@@ -0,0 +1,363 @@
+import asyncio
+import json
+import math
+import re
+import sqlite3
+import time
+from collections import Counter
+
+import metrics
+from tools import search_aws
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from how in is it of on or the to what "
+    "when where which with aws amazon".split()
+)
+
+
+def tokenize(text: str):
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def section_query(section: str):
+    """
+    The search used to ground lessons for a curriculum section.
+    """
+    return f"AWS certification {section}"
+
+
+def normalize_query(query: str):
+    """
+    Cache key for a search: case, punctuation and spacing are ignored.
+    """
+    return " ".join(_TOKEN.findall(query.lower()))
+
+
+# -----------------------------
+# BM25 Index
+# -----------------------------
+
+class BM25Index:
+    """
+    In-memory inverted index over fetched search snippets.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.lengths = {}
+        self.docs = {}
+        self.total_length = 0
+
+    def add(self, doc_id: str, doc: dict):
+        if doc_id in self.docs:
+            return
+
+        terms = Counter(tokenize(f"{doc.get('title', '')} {doc.get('content', '')}"))
+
+        self.docs[doc_id] = doc
+        self.lengths[doc_id] = sum(terms.values())
+        self.total_length += self.lengths[doc_id]
+
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+
+    def search(self, query: str, k: int = 5):
+        """
+        Top-k (doc_id, score, coverage) for a query; coverage is the
+        share of query terms the document contains.
+        """
+        terms = set(tokenize(query))
+
+        if not terms or not self.docs:
+            return []
+
+        n = len(self.docs)
+        avg_length = self.total_length / n
+        scores = {}
+        matched = {}
+
+        for term in terms:
+            postings = self.postings.get(term)
+
+            if not postings:
+                continue
+
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+                matched[doc_id] = matched.get(doc_id, 0) + 1
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+        return [
+            (doc_id, score, matched[doc_id] / len(terms))
+            for doc_id, score in ranked
+        ]
+
+    def __len__(self):
+        return len(self.docs)
+
+
+# -----------------------------
+# Search Batcher
+# -----------------------------
+
+class SearchBatcher:
+    """
+    Groups searches arriving within a short window into one round of
+    concurrent upstream calls; identical queries in a batch share one.
+    """
+
+    def __init__(self, search_fn, window: float = 0.02, max_batch: int = 16):
+        self.search_fn = search_fn
+        self.window = window
+        self.max_batch = max_batch
+        self.pending = {}
+        self.in_flight = {}
+        self.timer = None
+        self.tasks = set()
+
+        self.batches = 0
+        self.deduped = 0
+
+    async def submit(self, key: str, query: str):
+
+        entry = self.pending.get(key) or self.in_flight.get(key)
+
+        if entry is not None:
+            self.deduped += 1
+            return await asyncio.shield(entry[1])
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending[key] = (query, future)
+
+        if len(self.pending) >= self.max_batch:
+            self._flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.window, self._flush)
+
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+        batch, self.pending = self.pending, {}
+        self.in_flight.update(batch)
+
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _run(self, batch):
+        self.batches += 1
+
+        results = await asyncio.gather(
+            *(asyncio.to_thread(self.search_fn, query) for query, _ in batch.values()),
+            return_exceptions=True
+        )
+
+        for key, result in zip(batch, results):
+            _, future = self.in_flight.pop(key)
+
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def aclose(self):
+        self._flush()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+# -----------------------------
+# Retriever
+# -----------------------------
+
+class Retriever:
+    """
+    Search front end: persistent result cache, then the local BM25
+    index, then batched Tavily calls whose results feed both.
+    """
+
+    def __init__(
+        self,
+        path: str = "",
+        ttl: int = 7 * 86400,
+        min_score: float = 2.0,
+        min_coverage: float = 0.6,
+        search_fn=search_aws
+    ):
+        self.ttl = ttl
+        self.min_score = min_score
+        self.min_coverage = min_coverage
+        self.index = BM25Index()
+        self.batcher = SearchBatcher(search_fn)
+
+        self.conn = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        if path:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_cache ("
+            " query TEXT PRIMARY KEY,"
+            " result TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " url TEXT PRIMARY KEY,"
+            " title TEXT,"
+            " content TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+        # Rebuild the in-memory index from stored snippets
+        for url, title, content in self.conn.execute(
+            "SELECT url, title, content FROM documents"
+        ):
+            self.index.add(url, {"url": url, "title": title, "content": content})
+
+        self.cache_hits = 0
+        self.local_hits = 0
+        self.remote_calls = 0
+
+    async def search(self, query: str):
+        """
+        Same shape as tools.search_aws, plus the tier that answered.
+        """
+
+        key = normalize_query(query)
+
+        cached = self._cached(key)
+
+        if cached is not None:
+            self.cache_hits += 1
+            return {"success": True, "data": cached, "source": "cache"}
+
+        local = self.search_local(query)
+
+        if local:
+            self.local_hits += 1
+            return {
+                "success": True,
+                "data": {"query": query, "results": local},
+                "source": "local"
+            }
+
+        self.remote_calls += 1
+        result = await self.batcher.submit(key, query)
+
+        if result.get("success"):
+            self._store(key, result["data"])
+
+        return {**result, "source": "remote"}
+
+    def warm(self, queries):
+        """
+        Fetch queries in the background so later lookups stay local.
+        Returns the fetch tasks.
+        """
+
+        loop = asyncio.get_running_loop()
+        tasks = []
+
+        for query in queries:
+            task = loop.create_task(self.search(query))
+            self.batcher.tasks.add(task)
+            task.add_done_callback(self.batcher.tasks.discard)
+            tasks.append(task)
+
+        return tasks
+
+    def search_local(self, query: str, k: int = 3):
+        """
+        Indexed snippets relevant enough to answer without a network
+        call; empty when the best match is too weak.
+        """
+
+        with metrics.timed("retrieval_local"):
+            hits = self.index.search(query, k)
+
+        if not hits:
+            return []
+
+        _, best_score, best_coverage = hits[0]
+
+        if best_score < self.min_score or best_coverage < self.min_coverage:
+            return []
+
+        return [
+            {**self.index.docs[doc_id], "score": round(score, 3)}
+            for doc_id, score, _ in hits
+        ]
+
+    def local_context(self, query: str, k: int = 3):
+        """
+        Grounding text for a prompt, from the local index only.
+        """
+
+        return "\n".join(
+            f"- {doc.get('title', '')}: {doc['content']}"
+            for doc in self.search_local(query, k)
+        )
+
+    def _cached(self, key):
+        row = self.conn.execute(
+            "SELECT result, expires_at FROM search_cache WHERE query = ?",
+            (key,)
+        ).fetchone()
+
+        if not row or row[1] <= time.time():
+            return None
+
+        return json.loads(row[0])
+
+    def _store(self, key, data):
+        docs = [
+            doc for doc in data.get("results", [])
+            if doc.get("url") and doc.get("content")
+        ]
+
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO search_cache (query, result, expires_at)"
+                " VALUES (?, ?, ?)",
+                (key, json.dumps(data), time.time() + self.ttl)
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO documents (url, title, content)"
+                " VALUES (?, ?, ?)",
+                [(d["url"], d.get("title", ""), d["content"]) for d in docs]
+            )
+
+        for doc in docs:
+            self.index.add(doc["url"], {
+                "url": doc["url"],
+                "title": doc.get("title", ""),
+                "content": doc["content"]
+            })
+
+    def stats(self):
+        return {
+            "indexed_documents": len(self.index),
+            "cache_hits": self.cache_hits,
+            "local_hits": self.local_hits,
+            "remote_calls": self.remote_calls,
+            "batches": self.batcher.batches,
+            "deduped": self.batcher.deduped
+        }
+
+    async def aclose(self):
+        await self.batcher.aclose()
+        self.conn.close()
@@ -0,0 +1,383 @@
+import heapq
+import json
+import os
+import time
+
+DAY = 86400
+
+
+# -----------------------------
+# Review Item
+# -----------------------------
+
+class ReviewItem:
+    """
+    SM-2 state for one (learner, section) pair.
+    """
+
+    __slots__ = ("user_id", "section", "easiness", "interval", "repetitions", "due")
+
+    def __init__(
+        self,
+        user_id: str,
+        section: str,
+        easiness: float = 2.5,
+        interval: float = 0,
+        repetitions: int = 0,
+        due: float = 0
+    ):
+        self.user_id = user_id
+        self.section = section
+        self.easiness = easiness
+        self.interval = interval
+        self.repetitions = repetitions
+        self.due = due
+
+    def review(self, score: int, now: float):
+        """
+        Apply one graded attempt; score is a 0-100 quiz percentage.
+        """
+        quality = max(0, min(5, round(score / 20)))
+
+        if quality < 3:
+            self.repetitions = 0
+            self.interval = 1
+        else:
+            self.repetitions += 1
+
+            if self.repetitions == 1:
+                self.interval = 1
+            elif self.repetitions == 2:
+                self.interval = 6
+            else:
+                self.interval = round(self.interval * self.easiness, 1)
+
+        self.easiness = max(
+            1.3,
+            self.easiness + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+        )
+        self.due = now + self.interval * DAY
+
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "section": self.section,
+            "easiness": round(self.easiness, 4),
+            "interval": self.interval,
+            "repetitions": self.repetitions,
+            "due": self.due
+        }
+
+
+# -----------------------------
+# Review Scheduler
+# -----------------------------
+
+class ReviewScheduler:
+    """
+    Spaced-repetition reviews for every learner.
+
+    Each learner has a min-heap of due times, so their next review is
+    an O(log n) lookup. A global timing wheel buckets reviews by
+    slot_seconds so reminder jobs can drain everything due across all
+    learners without scanning them.
+
+    A rescheduled review leaves its wheel slot at once. Its old heap
+    entry goes stale and is skipped when it surfaces; a learner's heap
+    is rebuilt once stale entries outnumber live ones, so both stay
+    proportional to live reviews, not to scores ever recorded.
+    """
+
+    def __init__(self, path: str = "", slot_seconds: int = 60):
+        self.path = path
+        self.slot_seconds = slot_seconds
+        self.items = {}
+        self.live = {}
+        self.heaps = {}
+        self.wheel = {}
+        self.slots = []
+        self.dirty = False
+
+        if path and os.path.exists(path):
+            self.load()
+
+    # ---------------------------------------------------
+    # RECORD
+    # ---------------------------------------------------
+    def record(self, user_id: str, section: str, score: int, now: float = None):
+
+        now = time.time() if now is None else now
+
+        item = self.items.get((user_id, section))
+
+        if item is None:
+            item = self._add(ReviewItem(user_id, section))
+        else:
+            self._unschedule(item)
+
+        item.review(score, now)
+        self._schedule(item)
+        self.dirty = True
+
+        return item.to_dict()
+
+    def _add(self, item):
+        self.items[(item.user_id, item.section)] = item
+        self.live[item.user_id] = self.live.get(item.user_id, 0) + 1
+        return item
+
+    def _schedule(self, item):
+        heap = self.heaps.setdefault(item.user_id, [])
+        heapq.heappush(heap, (item.due, item.section))
+
+        if len(heap) > 2 * self.live[item.user_id]:
+            self._compact(item.user_id)
+
+        slot = int(item.due // self.slot_seconds)
+
+        if slot not in self.wheel:
+            self.wheel[slot] = set()
+            heapq.heappush(self.slots, slot)
+
+            # Slots emptied by reschedules linger in the heap; drop them
+            if len(self.slots) > 2 * len(self.wheel):
+                self.slots = list(self.wheel)
+                heapq.heapify(self.slots)
+
+        self.wheel[slot].add((item.user_id, item.section))
+
+    def _unschedule(self, item):
+        # Its heap entry turns stale; its wheel entry goes now
+        slot = int(item.due // self.slot_seconds)
+        members = self.wheel.get(slot)
+
+        if members is None:
+            return
+
+        members.discard((item.user_id, item.section))
+
+        if not members:
+            del self.wheel[slot]
+
+    def _compact(self, user_id):
+        heap = self.heaps[user_id]
+        heap[:] = {
+            (due, section) for due, section in heap
+            if self._current(user_id, section, due)
+        }
+        heapq.heapify(heap)
+
+    def _current(self, user_id, section, due):
+        item = self.items.get((user_id, section))
+        return item if item is not None and item.due == due else None
+
+    # ---------------------------------------------------
+    # PER-LEARNER QUERIES
+    # ---------------------------------------------------
+    def next_due(self, user_id: str):
+
+        heap = self.heaps.get(user_id)
+
+        while heap:
+            due, section = heap[0]
+            item = self._current(user_id, section, due)
+
+            if item is not None:
+                return item.to_dict()
+
+            heapq.heappop(heap)
+
+        return None
+
+    def due_for(self, user_id: str, now: float = None):
+        """
+        This learner's reviews due by now, soonest first.
+        """
+
+        now = time.time() if now is None else now
+        due = {}
+
+        for when, section in self.heaps.get(user_id, ()):
+            if when <= now and self._current(user_id, section, when):
+                due[section] = self.items[(user_id, section)].to_dict()
+
+        return sorted(due.values(), key=lambda item: item["due"])
+
+    # ---------------------------------------------------
+    # BULK QUERY
+    # ---------------------------------------------------
+    def drain_due(self, now: float = None, limit: int = 1000):
+        """
+        Up to `limit` reviews due across all learners, for reminder
+        jobs. Drained entries leave the wheel, so each due review is
+        returned once; the rest wait for the next call.
+        """
+
+        now = time.time() if now is None else now
+        now_slot = int(now // self.slot_seconds)
+        due = []
+
+        while self.slots and self.slots[0] <= now_slot and len(due) < limit:
+            slot = self.slots[0]
+            members = self.wheel.get(slot, set())
+
+            while members and len(due) < limit:
+                user_id, section = members.pop()
+                due.append(self.items[(user_id, section)].to_dict())
+
+            if not members:
+                heapq.heappop(self.slots)
+                self.wheel.pop(slot, None)
+
+        return due
+
+    def stats(self):
+        return {
+            "items": len(self.items),
+            "learners": len(self.heaps),
+            "heap_entries": sum(len(heap) for heap in self.heaps.values()),
+            "wheel_slots": len(self.wheel)
+        }
+
+    # ---------------------------------------------------
+    # PERSISTENCE
+    # ---------------------------------------------------
+    def save(self):
+
+        if not self.path or not self.dirty:
+            return
+
+        tmp = f"{self.path}.tmp"
+
+        with open(tmp, "w") as f:
+            json.dump([item.to_dict() for item in self.items.values()], f)
+
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+    def load(self):
+
+        with open(self.path) as f:
+            for data in json.load(f):
+                self._schedule(self._add(ReviewItem(**data)))
+
+
+# -----------------------------
+# Shared Review Scheduler
+# -----------------------------
+
+class SharedReviewScheduler:
+    """
+    The same schedules in a shared_state store, so every worker sees
+    every learner's reviews.
+
+    Each learner's items are one record. The timing wheel is a ranked
+    set of (learner, section) members scored by slot: a reschedule
+    moves the member, and drain_due() reads only slots up to now and
+    removes what it returns atomically, so a due review is drained
+    once across workers.
+    """
+
+    PREFIX = "review:"
+    WHEEL = "review-wheel"
+
+    def __init__(self, kv, slot_seconds: int = 60):
+        self.kv = kv
+        self.slot_seconds = slot_seconds
+
+    # ---------------------------------------------------
+    # RECORD
+    # ---------------------------------------------------
+    def record(self, user_id: str, section: str, score: int, now: float = None):
+
+        now = time.time() if now is None else now
+
+        items = self._items(user_id)
+        item = items.get(section)
+
+        if item is None:
+            item = items[section] = ReviewItem(user_id, section)
+
+        item.review(score, now)
+        self.kv.set(
+            self.PREFIX + user_id,
+            json.dumps({s: i.to_dict() for s, i in items.items()})
+        )
+
+        self.kv.rank_add(
+            self.WHEEL,
+            json.dumps([user_id, section]),
+            int(item.due // self.slot_seconds)
+        )
+
+        return item.to_dict()
+
+    def _items(self, user_id):
+        data = self.kv.get(self.PREFIX + user_id)
+
+        if not data:
+            return {}
+
+        return {
+            section: ReviewItem(**item)
+            for section, item in json.loads(data).items()
+        }
+
+    # ---------------------------------------------------
+    # PER-LEARNER QUERIES
+    # ---------------------------------------------------
+    def next_due(self, user_id: str):
+
+        items = self._items(user_id).values()
+        item = min(items, key=lambda i: i.due, default=None)
+
+        return item.to_dict() if item else None
+
+    def due_for(self, user_id: str, now: float = None):
+
+        now = time.time() if now is None else now
+
+        return sorted(
+            (i.to_dict() for i in self._items(user_id).values() if i.due <= now),
+            key=lambda item: item["due"]
+        )
+
+    # ---------------------------------------------------
+    # BULK QUERY
+    # ---------------------------------------------------
+    def drain_due(self, now: float = None, limit: int = 1000):
+        """
+        Reads only wheel slots up to now, never the future ones.
+        """
+
+        now = time.time() if now is None else now
+        now_slot = int(now // self.slot_seconds)
+        due = []
+
+        for member, _ in self.kv.rank_pop(self.WHEEL, now_slot, limit):
+            user_id, section = json.loads(member)
+            item = self._items(user_id).get(section)
+
+            if item is None:
+                continue
+
+            slot = int(item.due // self.slot_seconds)
+
+            # Rescheduled while we drained: back into its later slot
+            if slot > now_slot:
+                self.kv.rank_add(self.WHEEL, member, slot)
+                continue
+
+            due.append(item.to_dict())
+
+        return due
+
+    def stats(self):
+        return {
+            "learners": self.kv.count(self.PREFIX),
+            "wheel_entries": self.kv.rank_count(self.WHEEL)
+        }
+
+    def save(self):
+        # Every record() is already in the store
+        pass
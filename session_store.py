@@ -0,0 +1,694 @@
+import json
+import sqlite3
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from config import (
+    SESSION_STORE,
+    SESSION_DB_PATH,
+    SESSION_FLUSH_INTERVAL,
+    SESSION_FLUSH_BATCH,
+    SESSION_MAX_RESIDENT,
+    SESSION_IDLE_TTL,
+    SESSION_SCORE_HISTORY
+)
+from curriculum import CURRICULUM
+
+
+# -----------------------------
+# Session Record
+# -----------------------------
+
+class SessionRecord:
+    """
+    Compact learner session.
+
+    Sections are stored as curriculum indexes: completed and weak
+    sections are bitsets, and only the last SESSION_SCORE_HISTORY
+    scores are kept in a byte ring buffer. Per-section attempts,
+    total, latest and best score sit in one flat uint32 array, four
+    values per section, so analytics can be rebuilt from sessions.
+    """
+
+    __slots__ = (
+        "certification",
+        "current_index",
+        "completed",
+        "weak",
+        "learning_pace",
+        "score_ring",
+        "score_count",
+        "section_stats",
+        "last_seen"
+    )
+
+    def __init__(self, certification: str, current_index: int = 0):
+        self.certification = sys.intern(certification)
+        self.current_index = current_index
+        self.completed = 0
+        self.weak = 0
+        self.learning_pace = "normal"
+        self.score_ring = array("B", bytes(SESSION_SCORE_HISTORY))
+        self.score_count = 0
+        self.section_stats = array("I")
+        self.last_seen = time.monotonic()
+
+    # ---------------------------------------------------
+    # CURRICULUM
+    # ---------------------------------------------------
+    @property
+    def domains(self):
+        return CURRICULUM.current().certifications[self.certification].sections
+
+    @property
+    def section(self):
+        return self.domains[self.current_index]
+
+    @property
+    def current_section(self):
+        return self.section.name
+
+    @property
+    def completed_sections(self):
+        return self._names(self.completed)
+
+    @property
+    def weak_topics(self):
+        return self._names(self.weak)
+
+    def _names(self, bits):
+        return [
+            section.name
+            for section in self.domains if bits >> section.index & 1
+        ]
+
+    def complete_current(self):
+        self.completed |= 1 << self.current_index
+
+    def mark_current_weak(self):
+        self.weak |= 1 << self.current_index
+
+    @property
+    def current_attempt(self):
+        """
+        0 on a first pass through the section, 1 once it was failed.
+        """
+        return self.weak >> self.current_index & 1
+
+    # ---------------------------------------------------
+    # SCORES
+    # ---------------------------------------------------
+    def add_score(self, score: int):
+        score = max(0, min(100, score))
+        self._push_score(score)
+
+        stats = self.section_stats
+        base = 4 * self.current_index
+
+        if len(stats) < base + 4:
+            stats.extend([0] * (base + 4 - len(stats)))
+
+        attempts = stats[base]
+        stats[base] = attempts + 1
+        stats[base + 1] += score
+        stats[base + 2] = score
+        stats[base + 3] = max(stats[base + 3], score) if attempts else score
+
+    def _push_score(self, score):
+        size = len(self.score_ring)
+        self.score_ring[self.score_count % size] = score
+        self.score_count += 1
+
+    def section_scores(self):
+        """
+        (section index, attempts, total, latest, best) per attempted section.
+        """
+        stats = self.section_stats
+
+        return [
+            (i // 4, stats[i], stats[i + 1], stats[i + 2], stats[i + 3])
+            for i in range(0, len(stats), 4) if stats[i]
+        ]
+
+    @property
+    def scores(self):
+        """
+        Retained scores, oldest first.
+        """
+        size = len(self.score_ring)
+
+        if self.score_count <= size:
+            return self.score_ring[:self.score_count].tolist()
+
+        start = self.score_count % size
+        return (self.score_ring[start:] + self.score_ring[:start]).tolist()
+
+    # ---------------------------------------------------
+    # SERIALIZATION
+    # ---------------------------------------------------
+    def to_dict(self):
+        return {
+            "certification": self.certification,
+            "current_index": self.current_index,
+            "completed": self.completed,
+            "weak": self.weak,
+            "learning_pace": self.learning_pace,
+            "scores": self.scores,
+            "section_stats": self.section_stats.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        record = cls(data["certification"], data["current_index"])
+        record.completed = data["completed"]
+        record.weak = data["weak"]
+        record.learning_pace = sys.intern(data["learning_pace"])
+
+        for score in data["scores"]:
+            record._push_score(score)
+
+        record.section_stats = array("I", data.get("section_stats", ()))
+
+        return record
+
+    def memory_size(self):
+        """
+        Approximate resident bytes, excluding shared interned strings.
+        """
+        return (
+            sys.getsizeof(self)
+            + sys.getsizeof(self.score_ring)
+            + sys.getsizeof(self.section_stats)
+            + sys.getsizeof(self.completed)
+            + sys.getsizeof(self.weak)
+        )
+
+
+# -----------------------------
+# Session Store Interface
+# -----------------------------
+
+class SessionStore:
+    """
+    Where Orchestrator keeps learner sessions.
+
+    Sessions are SessionRecords; callers put() a record back after
+    changing it so persistent backends see the update.
+    """
+
+    def get(self, user_id: str):
+        raise NotImplementedError
+
+    def get_many(self, user_ids):
+        """
+        {user_id: SessionRecord} for the ids that have a session.
+        """
+        found = {}
+
+        for user_id in user_ids:
+            session = self.get(user_id)
+
+            if session is not None:
+                found[user_id] = session
+
+        return found
+
+    def put(self, user_id: str, session: SessionRecord):
+        raise NotImplementedError
+
+    def put_many(self, sessions: dict):
+        for user_id, session in sessions.items():
+            self.put(user_id, session)
+
+    def delete(self, user_id: str):
+        raise NotImplementedError
+
+    def find(self, certification: str, current_section: str = None):
+        """
+        User ids enrolled in a certification, optionally at one section.
+        """
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def items(self):
+        """
+        Every stored (user_id, SessionRecord); for event log snapshots.
+        """
+        raise NotImplementedError
+
+    def stats(self):
+        return {"sessions": self.count()}
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+# -----------------------------
+# In-Memory Backend
+# -----------------------------
+
+class MemorySessionStore(SessionStore):
+    """
+    Resident sessions with a hard cap and idle expiry.
+
+    Records are kept in LRU order, so both the least recently used and
+    the longest idle sessions sit at the front and are evicted first.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 100000,
+        idle_ttl: float = 6 * 3600
+    ):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.sessions = OrderedDict()
+        self.index = {}
+        # Last indexed key per user; records are edited in place
+        self.keys = {}
+
+        self.evicted = 0
+        self.expired = 0
+
+    def get(self, user_id: str):
+        session = self.sessions.get(user_id)
+
+        if session is None:
+            return None
+
+        now = time.monotonic()
+
+        if now - session.last_seen > self.idle_ttl:
+            self.delete(user_id)
+            self.expired += 1
+            return None
+
+        session.last_seen = now
+        self.sessions.move_to_end(user_id)
+
+        return session
+
+    def put(self, user_id: str, session: SessionRecord):
+        self._unindex(user_id)
+        session.last_seen = time.monotonic()
+        self.sessions[user_id] = session
+        self.sessions.move_to_end(user_id)
+
+        key = (session.certification, session.current_index)
+        self.keys[user_id] = key
+        self.index.setdefault(key, set()).add(user_id)
+
+        self._evict()
+
+    def delete(self, user_id: str):
+        self._unindex(user_id)
+        self.sessions.pop(user_id, None)
+
+    def find(self, certification: str, current_section: str = None):
+        if current_section is not None:
+            section = CURRICULUM.current().by_name.get((certification, current_section))
+
+            if section is None:
+                return []
+
+            return sorted(self.index.get((certification, section.index), ()))
+
+        return sorted(
+            user_id
+            for (cert, _), users in self.index.items() if cert == certification
+            for user_id in users
+        )
+
+    def count(self):
+        return len(self.sessions)
+
+    def items(self):
+        return list(self.sessions.items())
+
+    def stats(self):
+        resident = len(self.sessions)
+        sample = next(reversed(self.sessions.values()), None)
+
+        return {
+            "sessions": resident,
+            "max_sessions": self.max_sessions,
+            "evicted": self.evicted,
+            "expired": self.expired,
+            "bytes_per_session": sample.memory_size() if sample else 0
+        }
+
+    def _evict(self):
+        now = time.monotonic()
+
+        while self.sessions:
+            user_id, oldest = next(iter(self.sessions.items()))
+
+            if len(self.sessions) > self.max_sessions:
+                self.evicted += 1
+            elif now - oldest.last_seen > self.idle_ttl:
+                self.expired += 1
+            else:
+                break
+
+            self.delete(user_id)
+
+    def _unindex(self, user_id):
+        key = self.keys.pop(user_id, None)
+
+        if key is None:
+            return
+
+        users = self.index.get(key)
+
+        if users:
+            users.discard(user_id)
+            if not users:
+                del self.index[key]
+
+
+# -----------------------------
+# SQLite Backend
+# -----------------------------
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Durable sessions in a WAL-mode SQLite file.
+
+    Writes are buffered and flushed in batches by a background thread
+    (write-behind), so the request path never waits on disk. Several
+    uvicorn workers can share one file; a write becomes visible to the
+    other workers once flushed, at most flush_interval later. A
+    flush_interval of 0 writes through instead.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 0.5,
+        batch_size: int = 256
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.wakeup = threading.Event()
+        self.stopped = False
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " user_id TEXT PRIMARY KEY,"
+            " certification TEXT NOT NULL,"
+            " current_section TEXT,"
+            " data TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sessions_section"
+            " ON sessions (certification, current_section)"
+        )
+        self.conn.commit()
+
+        self.flusher = None
+
+        if flush_interval > 0:
+            self.flusher = threading.Thread(
+                target=self._flush_loop,
+                name="session-flush",
+                daemon=True
+            )
+            self.flusher.start()
+
+    def get(self, user_id: str):
+        with self.lock:
+            pending = self.pending.get(user_id)
+
+            if pending is not None:
+                data = pending[2]
+            else:
+                row = self.conn.execute(
+                    "SELECT data FROM sessions WHERE user_id = ?",
+                    (user_id,)
+                ).fetchone()
+                data = row[0] if row else None
+
+        # A deleted session is pending as None data
+        return SessionRecord.from_dict(json.loads(data)) if data else None
+
+    def get_many(self, user_ids):
+        found = {}
+        missing = []
+
+        with self.lock:
+            for user_id in dict.fromkeys(user_ids):
+                pending = self.pending.get(user_id)
+
+                if pending is None:
+                    missing.append(user_id)
+                elif pending[2]:
+                    found[user_id] = pending[2]
+
+            # One IN query per chunk, under SQLite's variable limit
+            for i in range(0, len(missing), 500):
+                chunk = missing[i:i + 500]
+                rows = self.conn.execute(
+                    "SELECT user_id, data FROM sessions WHERE user_id IN"
+                    f" ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                found.update(rows)
+
+        return {
+            user_id: SessionRecord.from_dict(json.loads(data))
+            for user_id, data in found.items()
+        }
+
+    def put(self, user_id: str, session: SessionRecord):
+        # Serialize now so later in-place edits can't race the flusher
+        row = (
+            session.certification,
+            session.current_section,
+            json.dumps(session.to_dict())
+        )
+
+        with self.lock:
+            self.pending[user_id] = row
+            full = len(self.pending) >= self.batch_size
+
+        if self.flusher is None:
+            self.flush()
+        elif full:
+            self.wakeup.set()
+
+    def put_many(self, sessions: dict):
+        rows = {
+            user_id: (
+                session.certification,
+                session.current_section,
+                json.dumps(session.to_dict())
+            )
+            for user_id, session in sessions.items()
+        }
+
+        with self.lock:
+            self.pending.update(rows)
+
+        # One transaction for the batch instead of one per session
+        if self.flusher is None:
+            self.flush()
+        else:
+            self.wakeup.set()
+
+    def delete(self, user_id: str):
+        with self.lock:
+            self.pending[user_id] = (None, None, None)
+
+        if self.flusher is None:
+            self.flush()
+
+    def find(self, certification: str, current_section: str = None):
+        self.flush()
+
+        with self.lock:
+            if current_section is None:
+                rows = self.conn.execute(
+                    "SELECT user_id FROM sessions WHERE certification = ?"
+                    " ORDER BY user_id",
+                    (certification,)
+                )
+            else:
+                rows = self.conn.execute(
+                    "SELECT user_id FROM sessions"
+                    " WHERE certification = ? AND current_section = ?"
+                    " ORDER BY user_id",
+                    (certification, current_section)
+                )
+            return [row[0] for row in rows]
+
+    def count(self):
+        self.flush()
+
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def items(self):
+        self.flush()
+
+        with self.lock:
+            rows = self.conn.execute("SELECT user_id, data FROM sessions").fetchall()
+
+        return [
+            (user_id, SessionRecord.from_dict(json.loads(data)))
+            for user_id, data in rows
+        ]
+
+    def stats(self):
+        with self.lock:
+            pending = len(self.pending)
+
+        return {
+            "sessions": self.count(),
+            "pending_writes": pending
+        }
+
+    def flush(self):
+        with self.lock:
+            if not self.pending:
+                return
+
+            batch, self.pending = self.pending, {}
+            now = time.time()
+
+            upserts = [
+                (user_id, cert, section, data, now)
+                for user_id, (cert, section, data) in batch.items()
+                if data is not None
+            ]
+            deletes = [
+                (user_id,)
+                for user_id, (_, _, data) in batch.items()
+                if data is None
+            ]
+
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO sessions"
+                    " (user_id, certification, current_section, data, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    upserts
+                )
+                self.conn.executemany(
+                    "DELETE FROM sessions WHERE user_id = ?",
+                    deletes
+                )
+
+    def _flush_loop(self):
+        while not self.stopped:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def close(self):
+        self.stopped = True
+        self.wakeup.set()
+
+        if self.flusher is not None:
+            self.flusher.join()
+
+        self.flush()
+
+        with self.lock:
+            self.conn.close()
+
+
+# -----------------------------
+# Shared Key-Value Backend
+# -----------------------------
+
+class KVSessionStore(SessionStore):
+    """
+    Sessions in a shared_state store (Redis or its SQLite stand-in),
+    one serialized record per key. Every read goes to the store, so
+    any worker can serve any learner. Each write restarts the record's
+    idle_ttl, so abandoned sessions expire in the store itself.
+    """
+
+    PREFIX = "session:"
+
+    def __init__(self, kv, idle_ttl: float = 6 * 3600):
+        self.kv = kv
+        self.idle_ttl = idle_ttl
+
+    def get(self, user_id: str):
+        data = self.kv.get(self.PREFIX + user_id)
+        return SessionRecord.from_dict(json.loads(data)) if data else None
+
+    def put(self, user_id: str, session: SessionRecord):
+        self.kv.set(
+            self.PREFIX + user_id,
+            json.dumps(session.to_dict()),
+            ttl=self.idle_ttl
+        )
+
+    def delete(self, user_id: str):
+        self.kv.delete(self.PREFIX + user_id)
+
+    def find(self, certification: str, current_section: str = None):
+        """
+        Scans every session; fine for admin use, not for request paths.
+        """
+        found = []
+
+        for key in self.kv.keys(self.PREFIX):
+            session = self.get(key[len(self.PREFIX):])
+
+            if session is None or session.certification != certification:
+                continue
+
+            if current_section is None or session.current_section == current_section:
+                found.append(key[len(self.PREFIX):])
+
+        return sorted(found)
+
+    def count(self):
+        return self.kv.count(self.PREFIX)
+
+    def items(self):
+        found = []
+
+        for key in self.kv.keys(self.PREFIX):
+            session = self.get(key[len(self.PREFIX):])
+
+            if session is not None:
+                found.append((key[len(self.PREFIX):], session))
+
+        return found
+
+
+def create_session_store(kv=None):
+    if SESSION_STORE == "redis" and kv is not None:
+        return KVSessionStore(kv, idle_ttl=SESSION_IDLE_TTL)
+
+    if SESSION_STORE == "sqlite":
+        return SQLiteSessionStore(
+            SESSION_DB_PATH,
+            flush_interval=SESSION_FLUSH_INTERVAL,
+            batch_size=SESSION_FLUSH_BATCH
+        )
+
+    return MemorySessionStore(
+        max_sessions=SESSION_MAX_RESIDENT,
+        idle_ttl=SESSION_IDLE_TTL
+    )
@@ -0,0 +1,235 @@
+import re
+import sqlite3
+import threading
+import time
+
+from config import STATE_BACKEND, STATE_DB_PATH, REDIS_URL
+
+
+# -----------------------------
+# SQLite Backend
+# -----------------------------
+
+class SQLiteKV:
+    """
+    Expiring key-value store in a WAL-mode SQLite file.
+
+    Every uvicorn worker opens the same file, so this is the local
+    stand-in for RedisKV: same methods, no server to run.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.writes = 0
+
+        self.conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " expires_at REAL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS ranked ("
+            " key TEXT NOT NULL,"
+            " member TEXT NOT NULL,"
+            " score REAL NOT NULL,"
+            " PRIMARY KEY (key, member))"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_ranked_score ON ranked (key, score)"
+        )
+        self.conn.commit()
+
+    def get(self, key: str):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value FROM kv WHERE key = ?"
+                " AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+
+        return row[0] if row else None
+
+    def set(self, key: str, value, ttl: float = None):
+        expires_at = time.time() + ttl if ttl else None
+
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at)
+            )
+            self.writes += 1
+
+            # Expired rows are only skipped on read; sweep them now and then
+            if self.writes % 1000 == 0:
+                self.conn.execute(
+                    "DELETE FROM kv WHERE expires_at <= ?",
+                    (time.time(),)
+                )
+
+    def pop(self, key: str):
+        """
+        Delete and return a value; only one caller across all
+        workers gets it.
+        """
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "DELETE FROM kv WHERE key = ? RETURNING value, expires_at",
+                (key,)
+            ).fetchone()
+
+        if not row or (row[1] is not None and row[1] <= time.time()):
+            return None
+
+        return row[0]
+
+    def delete(self, key: str):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def keys(self, prefix: str):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT key FROM kv WHERE key >= ? AND key < ?"
+                " AND (expires_at IS NULL OR expires_at > ?)",
+                (prefix, prefix + "\uffff", time.time())
+            ).fetchall()
+
+        return [row[0] for row in rows]
+
+    def count(self, prefix: str):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM kv WHERE key >= ? AND key < ?"
+                " AND (expires_at IS NULL OR expires_at > ?)",
+                (prefix, prefix + "\uffff", time.time())
+            ).fetchone()[0]
+
+    # ---------------------------------------------------
+    # RANKED SETS
+    # ---------------------------------------------------
+    def rank_add(self, key: str, member: str, score: float):
+        """
+        Add a member to a set ordered by score, or move it to `score`.
+        """
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ranked (key, member, score) VALUES (?, ?, ?)",
+                (key, member, score)
+            )
+
+    def rank_pop(self, key: str, max_score: float, limit: int):
+        """
+        Remove and return up to `limit` (member, score) pairs scored at
+        most max_score, lowest first. Each pair goes to one caller.
+        """
+        with self.lock, self.conn:
+            rows = self.conn.execute(
+                "DELETE FROM ranked WHERE rowid IN ("
+                " SELECT rowid FROM ranked WHERE key = ? AND score <= ?"
+                " ORDER BY score LIMIT ?)"
+                " RETURNING member, score",
+                (key, max_score, limit)
+            ).fetchall()
+
+        return sorted(rows, key=lambda row: row[1])
+
+    def rank_count(self, key: str):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM ranked WHERE key = ?",
+                (key,)
+            ).fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+# -----------------------------
+# Redis Backend
+# -----------------------------
+
+def glob_escape(text: str):
+    """
+    Escape Redis MATCH pattern characters so text matches literally.
+    """
+    return re.sub(r"([\\*?\[\]])", r"\\\1", text)
+
+
+class RedisKV:
+    """
+    The same store on any Redis-compatible server (Redis, Valkey,
+    KeyDB, ...). Needs the optional redis package.
+    """
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("STATE_BACKEND=redis needs: pip install redis")
+
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key: str):
+        return self.client.get(key)
+
+    def set(self, key: str, value, ttl: float = None):
+        self.client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    def pop(self, key: str):
+        return self.client.getdel(key)
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+    def keys(self, prefix: str):
+        return [
+            key.decode("utf-8")
+            for key in self.client.scan_iter(match=f"{glob_escape(prefix)}*", count=1000)
+        ]
+
+    def count(self, prefix: str):
+        return len(self.keys(prefix))
+
+    def rank_add(self, key: str, member: str, score: float):
+        self.client.zadd(key, {member: score})
+
+    def rank_pop(self, key: str, max_score: float, limit: int):
+        rows = self.client.zrangebyscore(key, "-inf", max_score, start=0, num=limit, withscores=True)
+
+        if not rows:
+            return []
+
+        pipe = self.client.pipeline()
+        for member, _ in rows:
+            pipe.zrem(key, member)
+
+        # ZREM returns 1 only for the worker that removed the member
+        return [
+            (member.decode("utf-8"), score)
+            for (member, score), removed in zip(rows, pipe.execute()) if removed
+        ]
+
+    def rank_count(self, key: str):
+        return self.client.zcard(key)
+
+    def close(self):
+        self.client.close()
+
+
+def create_kv():
+    """
+    Shared store for STATE_BACKEND, or None to keep state in-process.
+    """
+    if STATE_BACKEND == "sqlite":
+        return SQLiteKV(STATE_DB_PATH)
+
+    if STATE_BACKEND == "redis":
+        return RedisKV(REDIS_URL)
+
+    return None
@@ -0,0 +1,78 @@
+import asyncio
+import hashlib
+
+
+def prompt_key(model: str, contents, config=None):
+    """
+    Normalized identity of a generation request.
+    Whitespace differences in the prompt do not produce a new key.
+    """
+    text = " ".join(str(contents).split())
+
+    if config is None:
+        settings = ""
+    elif hasattr(config, "model_dump_json"):
+        settings = config.model_dump_json(exclude_none=True)
+    else:
+        settings = repr(config)
+
+    raw = "\x1f".join([model, text, settings])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# -----------------------------
+# Single Flight
+# -----------------------------
+
+class SingleFlight:
+    """
+    Collapse concurrent identical calls into one upstream call.
+
+    The first caller for a key starts the work as its own task; anyone
+    arriving while it runs awaits that task instead of starting another.
+    A caller that gives up (client disconnect) does not cancel the
+    shared task for the others. The leader may attach `state`; each
+    joiner is handed it through join(), e.g. to raise its priority.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn, state=None, join=None):
+
+        entry = self.calls.get(key)
+
+        if entry is None:
+            task = asyncio.ensure_future(fn())
+            self.calls[key] = (task, state)
+            self.leaders += 1
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            task = entry[0]
+            self.coalesced += 1
+
+            if join is not None:
+                join(entry[1])
+
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        entry = self.calls.get(key)
+
+        if entry is not None and entry[0] is task:
+            del self.calls[key]
+
+        # Mark the exception retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        total = self.leaders + self.coalesced
+        return {
+            "in_flight_keys": len(self.calls),
+            "upstream_calls": self.leaders,
+            "coalesced_calls": self.coalesced,
+            "coalesced_ratio": self.coalesced / total if total else 0.0
+        }
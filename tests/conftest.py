@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+# The app is flat modules at the repo root; make them importable here
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class EchoLLM:
+    """
+    Stand-in for GeminiPool: replies with the prompt it was given and
+    remembers the last one.
+    """
+
+    fallback_model = None
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt = None
+
+    def route(self, model):
+        return model
+
+    async def generate(self, model, contents, config=None, priority=None):
+        self.calls += 1
+        self.prompt = contents
+        return type("Response", (), {"text": contents})()
+
+
+@pytest.fixture
+def echo_llm():
+    return EchoLLM()
@@ -0,0 +1,42 @@
+from analytics import ScoreMatrix
+from curriculum import CURRICULUM
+from session_store import SessionRecord
+
+
+def certifications():
+    first, second = list(CURRICULUM.current().certifications.values())[:2]
+    return first, second
+
+
+def test_learner_in_two_certifications_counts_in_each():
+    first, second = certifications()
+    matrix = ScoreMatrix()
+
+    matrix.record("alice", first.name, first.sections[0].id, 40)
+    matrix.record("alice", second.name, second.sections[0].id, 90)
+
+    report = matrix.summary(first.name)
+
+    assert report["learners"] == 1
+    assert [s["section_id"] for s in report["sections"]] == [first.sections[0].id]
+    assert report["sections"][0]["mean_latest"] == 40
+    assert [s["section_id"] for s in matrix.summary(second.name)["sections"]] == [second.sections[0].id]
+
+
+def test_rebuilt_from_sessions_matches_live_recording():
+    first, _ = certifications()
+    live = ScoreMatrix()
+    sessions = {}
+
+    for user_id, scores in (("alice", [40, 80]), ("bob", [95])):
+        session = sessions[user_id] = SessionRecord(first.name)
+
+        for score in scores:
+            session.add_score(score)
+            live.record(user_id, first.name, first.sections[0].id, score)
+
+    # Round trip through the stored form, as after a restart
+    stored = [(u, SessionRecord.from_dict(s.to_dict())) for u, s in sessions.items()]
+    rebuilt = ScoreMatrix.from_sessions(stored)
+
+    assert rebuilt.summary(first.name) == live.summary(first.name)
@@ -0,0 +1,36 @@
+import asyncio
+
+from agent import ChatAgent
+from config import CHAT_CONTEXT_TOKENS
+from memory import SharedShortTermMemory, ShortTermMemory, approx_tokens
+from shared_state import SQLiteKV
+
+
+def test_workers_continue_the_same_chat(tmp_path):
+    path = str(tmp_path / "state.db")
+    first = SharedShortTermMemory(SQLiteKV(path), capacity=2, summary_lines=5)
+    second = SharedShortTermMemory(SQLiteKV(path), capacity=2, summary_lines=5)
+
+    first.add("alice", "user", "What is S3? Tell me more.")
+    second.add("alice", "assistant", "Object storage.")
+    first.add("alice", "user", "And EC2?")
+
+    summary, recent = second.context("alice", 1000)
+
+    assert summary == ["user: What is S3?"]
+    assert [m["content"] for m in recent] == ["Object storage.", "And EC2?"]
+    assert first.count() == 1
+
+
+def test_new_message_counts_against_the_context_budget(echo_llm):
+    memory = ShortTermMemory(capacity=50)
+
+    for i in range(40):
+        memory.add("bob", "user", f"Question {i} " + "x" * 200)
+
+    llm = echo_llm
+    message = "y" * (CHAT_CONTEXT_TOKENS * 2)
+    asyncio.run(ChatAgent(llm, memory).reply("bob", message))
+
+    history = llm.prompt.split("\nuser: " + message)[0]
+    assert approx_tokens(history) + approx_tokens(message) <= CHAT_CONTEXT_TOKENS + 100
@@ -0,0 +1,83 @@
+import json
+import os
+
+import pytest
+
+from config import CURRICULUM_PATH
+from curriculum import Curriculum, CurriculumError, CurriculumStore, validate
+
+
+def cert(*domains, id="cp", name="Cloud Practitioner"):
+    return {
+        "id": id,
+        "name": name,
+        "domains": [{"id": d.lower(), "name": d, "weight": 1} for d in domains]
+    }
+
+
+def write(path, data, version):
+    path.write_text(data if isinstance(data, str) else json.dumps(data))
+    # mtime resolution varies by filesystem; make each edit visible
+    os.utime(path, ns=(version * 10 ** 9, version * 10 ** 9))
+
+
+def test_shipped_curriculum_is_valid():
+
+    with open(CURRICULUM_PATH) as f:
+        assert validate(json.load(f)) == []
+
+
+def test_validation_reports_every_problem():
+
+    data = {"certifications": [
+        cert("Concepts", "Billing"),
+        cert("Concepts", id="cp", name=""),
+        {"id": "x", "name": "X", "domains": [{"id": "y", "name": "Y", "weight": 0}]}
+    ]}
+
+    problems = validate(data)
+
+    assert problems == [
+        "certifications[1].id 'cp' is duplicated",
+        "certifications[1].name must be a non-empty string",
+        "certifications[1].domains[0].id 'concepts' is duplicated",
+        "certifications[2].domains[0].weight must be a positive number"
+    ]
+
+    with pytest.raises(CurriculumError):
+        Curriculum(data)
+
+    assert validate({}) == ["'certifications' must be a non-empty list"]
+
+
+def test_reload_swaps_in_edits_and_keeps_the_last_good_version(tmp_path):
+
+    path = tmp_path / "curriculum.json"
+    write(path, {"certifications": [cert("Concepts", "Billing")]}, 1)
+
+    store = CurriculumStore(str(path), interval=0)
+    first = store.current()
+
+    # Appending a section is compatible with stored positions
+    write(path, {"certifications": [cert("Concepts", "Billing", "Security")]}, 2)
+    second = store.current()
+
+    assert second is not first
+    assert second.version != first.version
+    assert [s.name for s in second.certification("Cloud Practitioner").sections] == [
+        "Concepts", "Billing", "Security"
+    ]
+    assert second.sections["billing"].next == "security"
+
+    # Broken JSON and reordered sections are both refused
+    write(path, "{not json", 3)
+    assert store.current() is second
+
+    write(path, {"certifications": [cert("Billing", "Concepts", "Security")]}, 4)
+    assert store.current() is second
+
+    stats = store.stats()
+
+    assert stats["reloads"] == 1
+    assert stats["reload_errors"] == 2
+    assert "reordered" in stats["last_error"]
@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import api
+from dispatcher import INTERACTIVE, PREFETCH, Dispatcher, LLMOverloaded
+
+
+def test_interactive_calls_overtake_queued_prefetches():
+
+    dispatcher = Dispatcher(max_concurrency=1)
+    order = []
+
+    async def call(name, priority):
+        await dispatcher.acquire("m", 1, priority)
+        order.append(name)
+        dispatcher.release()
+
+    async def run():
+        await dispatcher.acquire("m", 1)
+
+        waiters = [
+            asyncio.ensure_future(call("prefetch-1", PREFETCH)),
+            asyncio.ensure_future(call("prefetch-2", PREFETCH)),
+            asyncio.ensure_future(call("learner", INTERACTIVE))
+        ]
+        await asyncio.sleep(0)
+
+        dispatcher.release()
+        await asyncio.gather(*waiters)
+
+    asyncio.run(run())
+
+    assert order == ["learner", "prefetch-1", "prefetch-2"]
+
+
+def test_token_bucket_holds_calls_until_it_refills():
+
+    # 600 tokens a minute: 10 a second, starting full
+    dispatcher = Dispatcher(model_limits={"m": (1000, 600)})
+
+    async def run():
+        await dispatcher.acquire("m", 600)
+        dispatcher.release()
+
+        started = time.monotonic()
+        await dispatcher.acquire("m", 3)
+        dispatcher.release()
+
+        return time.monotonic() - started
+
+    waited = asyncio.run(run())
+
+    assert 0.2 <= waited < 1.0
+    assert dispatcher.stats()["throttled"] >= 1
+
+
+def test_full_queue_rejects_and_maps_to_503():
+
+    dispatcher = Dispatcher(max_concurrency=1, max_queue=2)
+
+    async def run():
+        await dispatcher.acquire("m", 1)
+        waiters = [asyncio.ensure_future(dispatcher.acquire("m", 1)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        # Prefetch is turned away at half depth, learners at full depth
+        with pytest.raises(LLMOverloaded):
+            await dispatcher.acquire("m", 1, PREFETCH)
+
+        with pytest.raises(LLMOverloaded) as rejected:
+            await dispatcher.acquire("m", 1)
+
+        for waiter in waiters:
+            waiter.cancel()
+
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+        return rejected.value
+
+    error = asyncio.run(run())
+
+    assert dispatcher.stats()["rejected"] == {"interactive": 1, "prefetch": 1}
+
+    response = asyncio.run(api.llm_overloaded(None, error))
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+def test_transient_failures_are_retried_with_backoff():
+
+    dispatcher = Dispatcher(max_retries=3, backoff_base=0.01, backoff_max=0.02)
+    attempts = []
+
+    async def flaky():
+        attempts.append(dispatcher.stats()["active"])
+
+        if len(attempts) < 3:
+            raise httpx.ConnectError("reset")
+
+        return "ok"
+
+    async def broken():
+        raise ValueError("bad request")
+
+    assert asyncio.run(dispatcher.run("m", 1, INTERACTIVE, flaky)) == "ok"
+
+    # Each attempt held a slot, and gave it back before backing off
+    assert attempts == [1, 1, 1]
+    assert dispatcher.stats()["retries"] == 2
+    assert dispatcher.stats()["active"] == 0
+
+    with pytest.raises(ValueError):
+        asyncio.run(dispatcher.run("m", 1, INTERACTIVE, broken))
+
+    assert dispatcher.stats()["retries"] == 2
+
+    for attempt in range(6):
+        assert 0 <= dispatcher.backoff(attempt) <= min(0.02, 0.01 * 2 ** attempt)
@@ -0,0 +1,52 @@
+from eventlog import EventLog
+from session_store import MemorySessionStore, SessionRecord
+
+
+def score(log, store, user_id, value):
+    session = store.get(user_id)
+    session.add_score(value)
+    store.put(user_id, session)
+    log.append("score", user_id, section="s", score=value)
+
+
+def test_snapshot_comes_from_the_store_and_tail_replays_once(tmp_path):
+    store = MemorySessionStore()
+    log = EventLog(str(tmp_path), fsync_interval=0, snapshot_every=4)
+    log.recover()
+
+    for user_id in ("a", "b"):
+        store.put(user_id, SessionRecord("AWS"))
+        log.append("start", user_id, certification="AWS")
+
+    score(log, store, "a", 40)
+    score(log, store, "b", 90)
+
+    assert log.snapshot_due()
+    log.snapshot(store.items())
+    assert not hasattr(log, "sessions")
+
+    # After the snapshot: only the tail replays, each event once
+    score(log, store, "a", 75)
+    log.close()
+
+    recovered = EventLog(str(tmp_path), fsync_interval=0).recover()
+
+    assert recovered["a"].scores == [40, 75]
+    assert recovered["b"].scores == [90]
+
+
+def test_close_snapshots_the_store(tmp_path):
+    store = MemorySessionStore()
+    log = EventLog(str(tmp_path), fsync_interval=0.05)
+    log.recover()
+
+    store.put("a", SessionRecord("AWS"))
+    log.append("start", "a", certification="AWS")
+    score(log, store, "a", 55)
+    log.close(store.items())
+
+    again = EventLog(str(tmp_path), fsync_interval=0)
+    recovered = again.recover()
+
+    assert again.replayed == 0
+    assert recovered["a"].scores == [55]
@@ -0,0 +1,64 @@
+import asyncio
+
+from agent import LearningAgent
+from cache import LessonCache
+
+
+class Index:
+    def __init__(self):
+        self.notes = ""
+
+    def local_context(self, query):
+        return self.notes
+
+
+def test_lessons_follow_their_grounding_notes(echo_llm):
+
+    async def run():
+        llm = echo_llm
+        index = Index()
+        agent = LearningAgent(llm, cache=LessonCache(), retriever=index)
+
+        async def search():
+            await asyncio.sleep(0.01)
+            index.notes = "- S3: object storage"
+
+        # Warm-up waits for the searches that fill the index
+        agent.warm(["Cloud Concepts"], after=[asyncio.ensure_future(search())])
+        await asyncio.gather(*agent.tasks)
+
+        lesson = await agent.generate_lesson("Cloud Concepts")
+        assert "object storage" in lesson
+        warmed = llm.calls
+
+        # New notes are a different prompt, so a different cache entry
+        index.notes = "- EC2: virtual servers"
+        lesson = await agent.generate_lesson("Cloud Concepts")
+        assert "virtual servers" in lesson
+        assert llm.calls == warmed + 1
+
+    asyncio.run(run())
+
+
+def test_degraded_lesson_lookup_does_not_count_misses(echo_llm):
+
+    async def run():
+        llm = echo_llm
+        index = Index()
+        cache = LessonCache()
+        agent = LearningAgent(llm, cache=cache, retriever=index)
+
+        lesson = await agent.generate_lesson("Cloud Concepts")
+
+        async def fail(*args, **kwargs):
+            raise RuntimeError("upstream down")
+
+        llm.generate = fail
+        index.notes = "- EC2: virtual servers"
+        assert await agent.generate_lesson("Cloud Concepts") == lesson
+
+        # The ungrounded lesson stands in; probing variants is free
+        assert cache.misses == 2
+        assert cache.hits == 0
+
+    asyncio.run(run())
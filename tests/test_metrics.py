@@ -0,0 +1,11 @@
+from metrics import Counter
+
+
+def test_label_values_are_escaped():
+
+    counter = Counter("errors_total", "Errors.", labels=("cause",))
+    counter.inc('bad "quote" in C:\\path\nsecond line')
+
+    assert counter.render() == [
+        'errors_total{cause="bad \\"quote\\" in C:\\\\path\\nsecond line"} 1'
+    ]
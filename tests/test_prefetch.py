@@ -0,0 +1,53 @@
+import asyncio
+
+from prefetch import Prefetcher
+
+
+class SlowLessons:
+
+    def __init__(self):
+        self.release = asyncio.Event()
+
+    def has_lesson(self, section, pace):
+        return False
+
+    async def generate_lesson(self, section, pace, priority=None):
+        await self.release.wait()
+
+
+class FullPools:
+    low_water = 0
+
+    def pool_size(self, section):
+        return 10
+
+
+def test_replaced_running_prefetch_does_not_block_cancel():
+
+    async def run():
+        lessons = SlowLessons()
+        prefetcher = Prefetcher(lessons, FullPools(), per_minute=60, concurrency=1)
+
+        prefetcher.schedule("alice", "Cloud Concepts", "normal")
+        await asyncio.sleep(0)
+        # The first prefetch is running; this one waits for the slot
+        prefetcher.schedule("alice", "Security", "normal")
+        await asyncio.sleep(0)
+
+        assert prefetcher.stats()["running"] == 1
+        assert prefetcher.stats()["pending"] == 1
+
+        prefetcher.cancel("alice")
+        await asyncio.sleep(0.01)
+
+        assert prefetcher.cancelled == 1
+        assert prefetcher.stats()["pending"] == 0
+
+        lessons.release.set()
+        await asyncio.sleep(0.01)
+
+        assert prefetcher.stats()["running"] == 0
+        assert prefetcher.completed == 1
+        await prefetcher.aclose()
+
+    asyncio.run(run())
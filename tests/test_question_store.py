@@ -0,0 +1,32 @@
+from question_store import QuestionStore
+from quiz_bank import question_fingerprint
+
+
+def add(store, text, section="Cloud Concepts"):
+    question = {"question": text, "options": ["A", "B"], "answer": "A"}
+    return store.add(section, question, question_fingerprint(question))
+
+
+def test_full_store_keeps_deduplicating_by_evicting_the_oldest():
+    store = QuestionStore(max_items=3)
+    texts = [
+        "Which AWS service stores objects in buckets?",
+        "Which AWS service runs containers without managing servers?",
+        "Which AWS service provides a managed relational database?",
+        "Which AWS service distributes content from edge locations?",
+        "Which AWS service sends notifications to subscribers?"
+    ]
+
+    assert all(add(store, text) for text in texts)
+    assert store.stats()["questions"] == 3
+    assert store.stats()["evicted"] == 2
+
+    # Still indexed: a repeat of a recent question is rejected
+    assert not add(store, texts[-1].upper())
+    assert not add(store, "Which AWS service sends notifications to subscribers!")
+
+    # Evicted: its repeat is accepted again, and no band points at it
+    assert add(store, texts[0])
+    live = set(store.ids.values())
+    assert all(bucket <= live for bucket in store.buckets.values())
+    assert sorted(store.sections["Cloud Concepts"]) == sorted(live)
@@ -0,0 +1,102 @@
+import asyncio
+from collections import deque
+
+from question_store import QuestionStore
+from quiz_bank import QuizBank
+from shared_state import SQLiteKV
+
+
+def repeating_model(questions):
+    calls = []
+
+    async def generate(section, priority=None):
+        calls.append(section)
+        return {"questions": [dict(q) for q in questions]}
+
+    return generate, calls
+
+
+def questions(texts):
+    return [
+        {"question": text, "options": ["A", "B", "C", "D"], "answer": "A"}
+        for text in texts
+    ]
+
+
+async def serve(bank, learners, section="Cloud Concepts"):
+    served = [len((await bank.take(user, section))["questions"]) for user in learners]
+    await asyncio.gather(*bank.tasks, return_exceptions=True)
+    return served
+
+
+def test_repeated_generation_still_serves_every_learner():
+    same = questions([
+        "Which service stores objects?",
+        "Which service runs containers without servers?",
+        "What does IAM control?",
+        "Which database is serverless and key-value?",
+        "What is an Availability Zone?"
+    ])
+    generate, calls = repeating_model(same)
+    bank = QuizBank(generate, quiz_size=5, low_water=3, high_water=10, store=QuestionStore())
+
+    async def run():
+        served = await serve(bank, ["a", "b", "c"])
+        return served, len(calls)
+
+    served, generations = asyncio.run(run())
+
+    assert served == [5, 5, 5]
+    # One cold generation plus one refill that found nothing new
+    assert generations <= 2
+    assert bank.stats()["served_from_store"] == 2
+
+
+def test_near_duplicate_generations_still_serve_every_learner():
+    texts = [
+        "Which AWS service stores objects durably in buckets?",
+        "Which AWS service runs code without managing any servers?",
+        "Which AWS service controls who can access which resources?",
+        "Which AWS service offers a managed relational database engine?",
+        "Which AWS service delivers content from edge locations worldwide?"
+    ]
+    calls = 0
+
+    async def generate(section, priority=None):
+        nonlocal calls
+        calls += 1
+        return {"questions": questions([f"{t[:-1]} today?" if calls % 2 else t for t in texts])}
+
+    bank = QuizBank(generate, quiz_size=5, low_water=3, high_water=10, store=QuestionStore())
+
+    assert asyncio.run(serve(bank, ["a", "b", "c"])) == [5, 5, 5]
+
+
+def test_learner_history_stays_bounded():
+    texts = [f"Question number {i} about storage classes?" for i in range(20)]
+    generate, _ = repeating_model(questions(texts))
+    bank = QuizBank(generate, quiz_size=5, low_water=0, high_water=20, max_learners=3)
+
+    bank.pools["Cloud Concepts"] = deque(questions(texts))
+    asyncio.run(serve(bank, [f"learner-{i}" for i in range(10)]))
+
+    assert len(bank.learners) == 3
+    assert list(bank.learners) == ["learner-7", "learner-8", "learner-9"]
+    assert bank.stats()["learners_evicted"] == 7
+
+
+def test_workers_share_what_a_learner_has_seen(tmp_path):
+    texts = [f"Question number {i} about storage classes?" for i in range(10)]
+    path = str(tmp_path / "state.db")
+    first = QuizBank(repeating_model([])[0], quiz_size=5, low_water=0, kv=SQLiteKV(path))
+    second = QuizBank(repeating_model([])[0], quiz_size=5, low_water=0, kv=SQLiteKV(path))
+
+    first.pools["Cloud Concepts"] = deque(questions(texts))
+    second.pools["Cloud Concepts"] = deque(questions(texts))
+
+    served = asyncio.run(first.take("alice", "Cloud Concepts"))["questions"]
+    first.record_results("alice", "Cloud Concepts", [True, False, True, True, False])
+    again = asyncio.run(second.take("alice", "Cloud Concepts"))["questions"]
+
+    assert not {q["question"] for q in served} & {q["question"] for q in again}
+    assert len(second._history("alice").missed) == 2
@@ -0,0 +1,49 @@
+import json
+
+from quiz_parser import parse_quiz
+
+
+def question(text, answer="S3", options=("EC2", "S3", "IAM", "VPC")):
+    return {"question": text, "options": list(options), "answer": answer}
+
+
+def test_truncated_array_keeps_complete_questions():
+
+    text = json.dumps({"questions": [question("Q1"), question("Q2")]})
+    cut = text[:text.rfind('"answer"')]
+
+    valid, truncated, rejected = parse_quiz(cut)
+
+    assert [q["question"] for q in valid] == ["Q1"]
+    assert truncated
+    assert rejected == 0
+
+
+def test_fenced_json_with_chatter():
+
+    text = "Here is your quiz:\n```json\n" + json.dumps({"questions": [question("Q1")]}) + "\n```"
+
+    assert parse_quiz(text) == ([question("Q1")], False, 0)
+
+
+def test_letter_answers_and_lettered_options_are_repaired():
+
+    item = question("Q1", answer="B)", options=("A) EC2", "B) S3", "C) IAM"))
+
+    valid, _, rejected = parse_quiz(json.dumps({"questions": [item]}))
+
+    assert valid == [question("Q1", options=("EC2", "S3", "IAM"))]
+    assert rejected == 0
+
+
+def test_answer_outside_the_options_is_rejected():
+
+    items = [question("Q1", answer="Lambda"), question("Q2", answer="E")]
+
+    assert parse_quiz(json.dumps({"questions": items})) == ([], False, 2)
+
+
+def test_empty_list_is_not_bad_json():
+
+    assert parse_quiz('{"questions": []}') == ([], False, 0)
+    assert parse_quiz("Sorry, I can't help with that.") == (None, False, 0)
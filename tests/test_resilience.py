@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from dispatcher import Dispatcher
+from resilience import CircuitBreaker, CircuitOpen, hedged
+
+
+def test_hedge_slot_is_released_once_the_loser_finishes():
+
+    released = []
+
+    async def run():
+        calls = []
+
+        async def attempt():
+            calls.append(len(calls))
+
+            if len(calls) == 1:
+                try:
+                    await asyncio.sleep(10)
+                finally:
+                    # The loser is still upstream while it unwinds
+                    await asyncio.sleep(0.02)
+                    released.append("loser-finished")
+
+            return "hedge"
+
+        result = await hedged(
+            attempt,
+            0.01,
+            lambda: True,
+            release=lambda: released.append("released")
+        )
+
+        assert result == ("hedge", True)
+        assert released == []
+
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+
+    assert released == ["loser-finished", "released"]
+
+
+def test_open_breaker_fails_before_taking_a_slot():
+
+    dispatcher = Dispatcher(max_concurrency=1)
+    breaker = CircuitBreaker("m", failures=1)
+    breaker.failure()
+    called = []
+
+    async def call():
+        called.append(True)
+
+    async def run():
+        # Hold the only slot: an admitted call would wait behind it
+        await dispatcher.acquire("m", 1)
+
+        with pytest.raises(CircuitOpen):
+            await asyncio.wait_for(
+                dispatcher.run("m", 1, 0, call, before=breaker.before),
+                timeout=1
+            )
+
+    asyncio.run(run())
+
+    assert called == []
+    assert dispatcher.stats()["queued"] == 0
+    assert dispatcher.stats()["admitted"] == {"interactive": 1, "prefetch": 0}
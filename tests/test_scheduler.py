@@ -0,0 +1,63 @@
+from scheduler import DAY, ReviewScheduler, SharedReviewScheduler
+from shared_state import SQLiteKV
+
+
+def test_workers_share_schedules_and_drain_each_review_once(tmp_path):
+    path = str(tmp_path / "state.db")
+    first = SharedReviewScheduler(SQLiteKV(path))
+    second = SharedReviewScheduler(SQLiteKV(path))
+
+    first.record("alice", "Cloud Concepts", 40, now=0)
+    second.record("alice", "Security", 100, now=0)
+    # Rescheduled: only the latest due time counts
+    first.record("bob", "Cloud Concepts", 40, now=0)
+    first.record("bob", "Cloud Concepts", 40, now=DAY)
+
+    assert [r["section"] for r in second.due_for("alice", now=DAY)] == ["Cloud Concepts", "Security"]
+    assert first.next_due("bob")["due"] == 2 * DAY
+
+    drained = first.drain_due(now=DAY)
+    assert sorted((r["user_id"], r["section"]) for r in drained) == [
+        ("alice", "Cloud Concepts"), ("alice", "Security")
+    ]
+    assert second.drain_due(now=DAY) == []
+    assert [r["user_id"] for r in second.drain_due(now=2 * DAY)] == ["bob"]
+
+
+def test_rescheduling_keeps_memory_proportional_to_live_reviews():
+    reviews = ReviewScheduler()
+
+    for day in range(500):
+        reviews.record("alice", "Cloud Concepts", 40, now=day * DAY)
+        reviews.record("alice", "Security", 40, now=day * DAY)
+
+    assert len(reviews.heaps["alice"]) <= 4
+    assert sum(len(m) for m in reviews.wheel.values()) == 2
+    assert len(reviews.slots) <= 4
+    assert reviews.next_due("alice")["due"] == 500 * DAY
+
+
+def test_drain_stops_at_limit_and_keeps_the_rest():
+    reviews = ReviewScheduler()
+
+    for i in range(5):
+        reviews.record(f"learner-{i}", "Cloud Concepts", 40, now=0)
+
+    first = reviews.drain_due(now=DAY, limit=2)
+    rest = reviews.drain_due(now=DAY, limit=10)
+
+    assert len(first) == 2 and len(rest) == 3
+    assert {r["user_id"] for r in first + rest} == {f"learner-{i}" for i in range(5)}
+    assert reviews.drain_due(now=DAY) == []
+
+
+def test_shared_drain_reads_only_due_slots_up_to_limit(tmp_path):
+    reviews = SharedReviewScheduler(SQLiteKV(str(tmp_path / "state.db")))
+
+    for i in range(5):
+        reviews.record(f"learner-{i}", "Cloud Concepts", 40, now=0)
+    reviews.record("later", "Cloud Concepts", 40, now=10 * DAY)
+
+    assert len(reviews.drain_due(now=DAY, limit=3)) == 3
+    assert len(reviews.drain_due(now=DAY, limit=3)) == 2
+    assert reviews.stats()["wheel_entries"] == 1
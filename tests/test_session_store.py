@@ -0,0 +1,59 @@
+import time
+
+from session_store import KVSessionStore, SessionRecord, SQLiteSessionStore
+from shared_state import SQLiteKV, glob_escape
+
+
+def test_kv_sessions_expire_after_idle_ttl(tmp_path):
+
+    store = KVSessionStore(SQLiteKV(str(tmp_path / "state.db")), idle_ttl=0.05)
+    store.put("alice", SessionRecord("AWS Cloud Practitioner"))
+
+    assert store.get("alice") is not None
+
+    time.sleep(0.1)
+
+    assert store.get("alice") is None
+    assert store.count() == 0
+
+
+def test_redis_match_prefix_is_literal():
+
+    assert glob_escape("session:a*b?[c]") == r"session:a\*b\?\[c\]"
+    assert glob_escape("back\\slash") == "back\\\\slash"
+
+
+def test_sqlite_writes_are_served_from_pending_until_flushed(tmp_path):
+
+    path = str(tmp_path / "sessions.db")
+    # A long interval keeps the background flusher out of the way
+    store = SQLiteSessionStore(path, flush_interval=60)
+    other = SQLiteSessionStore(path, flush_interval=0)
+
+    session = SessionRecord("AWS Cloud Practitioner")
+    session.add_score(80)
+    store.put("alice", session)
+    store.put("bob", SessionRecord("AWS Cloud Practitioner"))
+
+    # This worker sees its own write at once; the file doesn't yet
+    assert store.get("alice").scores == [80]
+    assert len(store.pending) == 2
+    assert other.get("alice") is None
+
+    store.delete("bob")
+    assert store.get("bob") is None
+    assert set(store.get_many(["alice", "bob"])) == {"alice"}
+
+    store.flush()
+
+    assert other.get("alice").scores == [80]
+    assert other.get("bob") is None
+    assert other.count() == 1
+
+    # Closing flushes whatever is still pending
+    store.put("carol", SessionRecord("AWS Cloud Practitioner"))
+    store.close()
+
+    assert other.get("carol") is not None
+
+    other.close()
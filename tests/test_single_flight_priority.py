@@ -0,0 +1,45 @@
+import asyncio
+
+from dispatcher import PREFETCH, Dispatcher
+from llm import GeminiPool
+
+
+class RecordingModels:
+
+    def __init__(self):
+        self.order = []
+
+    async def generate_content(self, model, contents, config=None):
+        self.order.append(contents)
+        await asyncio.sleep(0.02)
+
+
+class RecordingClient:
+
+    def __init__(self):
+        self.models = RecordingModels()
+        self.aio = self
+
+
+def test_learner_joining_a_prefetch_lifts_its_priority():
+    client = RecordingClient()
+
+    async def run():
+        pool = GeminiPool(client=client, dispatcher=Dispatcher(max_concurrency=1))
+        tasks = [asyncio.create_task(pool.generate("m", "busy"))]
+        await asyncio.sleep(0.005)
+
+        tasks.append(asyncio.create_task(pool.generate("m", "P", priority=PREFETCH)))
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(pool.generate("m", "Q0")))
+        tasks.append(asyncio.create_task(pool.generate("m", "Q1")))
+        await asyncio.sleep(0)
+        # A learner now wants exactly what is being prefetched
+        tasks.append(asyncio.create_task(pool.generate("m", "P")))
+
+        await asyncio.gather(*tasks)
+        pool.dispatcher.close()
+
+    asyncio.run(run())
+
+    assert client.models.order == ["busy", "P", "Q0", "Q1"]
@@ -0,0 +1,33 @@
+import traces
+from replay import load_trace
+from traces import TraceRecorder
+
+
+def test_workers_share_one_clock_in_a_trace(tmp_path, monkeypatch):
+
+    path = str(tmp_path / "trace.jsonl")
+    clock = [1000.0]
+    monkeypatch.setattr(traces.time, "time", lambda: clock[0])
+
+    first = TraceRecorder(path, salt="s")
+    second = TraceRecorder(path, salt="s")
+
+    def request(recorder, user_id, at, elapsed):
+        clock[0] = at + elapsed
+        recorder.record(
+            "POST", "/chat", {}, {}, f'{{"user_id": "{user_id}"}}'.encode(), 200, elapsed
+        )
+
+    # The second worker's first request is an hour into the trace, and
+    # a slow request is written after a later, faster one
+    request(first, "alice", 1000.0, 0.5)
+    request(second, "bob", 4600.0, 0.1)
+    request(first, "alice", 1010.0, 5.0)
+    request(first, "alice", 1012.0, 0.1)
+
+    first.close()
+    second.close()
+
+    flows = {len(steps): [step["t"] for step in steps] for steps in load_trace(path)}
+
+    assert flows == {3: [0.0, 10.0, 12.0], 1: [3600.0]}
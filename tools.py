@@ -1,23 +1,38 @@
 import os
 from tavily import TavilyClient
 
+import metrics
+from config import SEARCH_BACKEND, FAKE_SEARCH_LATENCY, TAVILY_SEARCH_DEPTH
+
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 
+_client = None
+
 
 def get_tavily_client():
     """
-    Lazy-load Tavily client.
+    Lazy-load Tavily client, shared by every search.
     Prevents app crash if API key missing.
     """
-    if not TAVILY_API_KEY:
-        return None
+    global _client
+
+    if _client is not None:
+        return _client
+
+    if SEARCH_BACKEND == "fake":
+        from fakes import FakeTavilyClient
+        _client = FakeTavilyClient(latency=FAKE_SEARCH_LATENCY)
+
+    elif TAVILY_API_KEY:
+        _client = TavilyClient(api_key=TAVILY_API_KEY)
 
-    return TavilyClient(api_key=TAVILY_API_KEY)
+    return _client
 
 
-def search_aws(query: str):
+def search_aws(query: str, search_depth: str = TAVILY_SEARCH_DEPTH):
     """
     Safe Tavily search wrapper.
+    Callers wanting caching should go through retrieval.Retriever.
     """
 
     client = get_tavily_client()
@@ -29,7 +44,8 @@ def search_aws(query: str):
         }
 
     try:
-        result = client.search(query=query, search_depth="advanced")
+        with metrics.timed("tavily_search", track_in_flight=True):
+            result = client.search(query=query, search_depth=search_depth)
         return {
             "success": True,
             "data": result
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import time
+
+# Free-text fields: only their length is recorded
+TEXT_FIELDS = ("message", "query")
+
+
+# -----------------------------
+# Anonymization
+# -----------------------------
+
+def anonymize(payload, salt: str):
+    """
+    Copy of a request body or query with user ids replaced by salted
+    hashes and free text reduced to its length. Scores, answers and
+    certification names are kept; replay needs them.
+    """
+    if isinstance(payload, list):
+        return [anonymize(item, salt) for item in payload]
+
+    if not isinstance(payload, dict):
+        return payload
+
+    clean = {}
+
+    for key, value in payload.items():
+        if key in ("user_id", "user_ids"):
+            clean[key] = (
+                [pseudonym(v, salt) for v in value]
+                if isinstance(value, list) else pseudonym(value, salt)
+            )
+        elif key in TEXT_FIELDS:
+            clean[f"{key}_chars"] = len(value) if isinstance(value, str) else 0
+        else:
+            clean[key] = anonymize(value, salt)
+
+    return clean
+
+
+def pseudonym(user_id, salt: str):
+    digest = hashlib.blake2b(
+        str(user_id).encode("utf-8"),
+        key=salt.encode("utf-8")[:64],
+        digest_size=6
+    )
+    return f"anon-{digest.hexdigest()}"
+
+
+# -----------------------------
+# Trace Recorder
+# -----------------------------
+
+class TraceRecorder:
+    """
+    Appends one JSON line per API request: route template, anonymized
+    body, status and latency, with the wall-clock time the request
+    arrived. replay.py turns the file back into traffic.
+
+    Lines are written with a single O_APPEND write each, so several
+    workers can record into one file; they need a shared salt for the
+    same learner to get the same pseudonym. Absolute times keep their
+    lines on one clock even though each worker starts recording at a
+    different moment and lines land slightly out of order.
+    """
+
+    def __init__(self, path: str, salt: str = ""):
+        self.path = path
+        self.salt = salt or os.urandom(16).hex()
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        self.recorded = 0
+
+    def record(
+        self,
+        method: str,
+        route: str,
+        path_params: dict,
+        query: dict,
+        body: bytes,
+        status: int,
+        elapsed: float
+    ):
+        try:
+            payload = json.loads(body) if body else None
+        except ValueError:
+            payload = None
+
+        entry = {
+            "t": round(time.time() - elapsed, 4),
+            "method": method,
+            "route": route,
+            "params": anonymize(path_params, self.salt),
+            "query": anonymize(query, self.salt),
+            "body": anonymize(payload, self.salt),
+            "status": status,
+            "ms": round(elapsed * 1000, 2)
+        }
+
+        os.write(self.fd, (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8"))
+        self.recorded += 1
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
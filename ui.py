@@ -1,9 +1,14 @@
 import streamlit as st
 import requests
 import uuid
+import json
+import time
 
 API_URL = "http://localhost:8000"
 
+# Sidebar progress is revalidated at most this often between actions
+PROGRESS_REFRESH = 15
+
 st.set_page_config(
     page_title="AWS Agentic Learning System",
     page_icon="☁️",
@@ -23,6 +28,107 @@ if "user_id" not in st.session_state:
     st.session_state.score_submitted = False
 
 
+# -------------------------
+# SSE Client
+# -------------------------
+
+def sse_events(response):
+    """
+    Parse a text/event-stream response into (event, data) pairs.
+    """
+    event, data = "message", []
+
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+
+        if line == "":
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
+
+
+def render_lesson_stream(user_id):
+    """
+    Render lesson chunks as they arrive and return the full text.
+    """
+    placeholder = st.empty()
+    text = ""
+
+    with requests.post(
+        f"{API_URL}/teach/stream",
+        json={"user_id": user_id},
+        stream=True,
+        timeout=120
+    ) as r:
+
+        r.raise_for_status()
+
+        for event, data in sse_events(r):
+            if event == "chunk":
+                text += data["text"]
+                placeholder.markdown("### 🧠 Lesson\n\n" + text + "▌")
+
+            elif event == "error":
+                raise RuntimeError(data.get("error"))
+
+    # Cleared so the persisted lesson below renders exactly once
+    placeholder.empty()
+
+    return text
+
+
+# -------------------------
+# Certifications
+# -------------------------
+
+@st.cache_data(ttl=300)
+def load_certifications():
+    """
+    Valid certification names, from the API's curriculum.
+    """
+    r = requests.get(f"{API_URL}/certifications", timeout=10)
+    r.raise_for_status()
+    return [cert["name"] for cert in r.json()["certifications"]]
+
+
+def load_progress(user_id):
+    """
+    The learner's progress, reusing the last copy until it is stale:
+    older than PROGRESS_REFRESH or invalidated by a score. Revalidation
+    sends If-None-Match, so an unchanged session costs a bodiless 304.
+    """
+    cached = st.session_state.get("progress")
+    now = time.monotonic()
+
+    if (
+        cached
+        and not st.session_state.get("progress_stale")
+        and now - cached["at"] < PROGRESS_REFRESH
+    ):
+        return cached["body"]
+
+    headers = {"If-None-Match": cached["etag"]} if cached else {}
+    r = requests.get(f"{API_URL}/progress/{user_id}", headers=headers, timeout=10)
+
+    if r.status_code == 304:
+        body = cached["body"]
+    else:
+        r.raise_for_status()
+        body = r.json()
+
+    st.session_state.progress = {"etag": r.headers.get("ETag"), "body": body, "at": now}
+    st.session_state.progress_stale = False
+
+    return body
+
+
 # -------------------------
 # Sidebar
 # -------------------------
@@ -37,16 +143,15 @@ with st.sidebar:
 
         st.subheader("Choose Certification")
 
-        cert = st.selectbox(
-            "Select Path:",
-            [
-                "AWS Cloud Practitioner",
-                "AWS Solutions Architect Associate",
-                "AWS Developer Associate"
-            ]
-        )
+        try:
+            certifications = load_certifications()
+        except Exception as e:
+            certifications = []
+            st.error(f"Could not load certifications: {e}")
 
-        if st.button("🚀 Start Learning", use_container_width=True):
+        cert = st.selectbox("Select Path:", certifications)
+
+        if st.button("🚀 Start Learning", use_container_width=True, disabled=not cert):
             try:
                 r = requests.post(
                     f"{API_URL}/start",
@@ -70,9 +175,7 @@ with st.sidebar:
     else:
         # Progress
         try:
-            progress = requests.get(
-                f"{API_URL}/progress/{st.session_state.user_id}"
-            ).json()
+            progress = load_progress(st.session_state.user_id)
 
             st.success("🎓 Active Session")
 
@@ -109,19 +212,11 @@ if not st.session_state.started:
 if st.button("📖 Teach Current Section", use_container_width=True):
 
     try:
-        r = requests.post(
-            f"{API_URL}/teach",
-            json={"user_id": st.session_state.user_id}
-        )
-
-        if r.status_code == 200:
-            lesson = r.json().get("lesson")
-            st.session_state.lesson = lesson
-            st.session_state.quiz = None
-            st.session_state.score_submitted = False
+        lesson = render_lesson_stream(st.session_state.user_id)
 
-        else:
-            st.error("Failed to load lesson")
+        st.session_state.lesson = lesson
+        st.session_state.quiz = None
+        st.session_state.score_submitted = False
 
     except Exception as e:
         st.error(str(e))
@@ -165,12 +260,16 @@ if st.session_state.quiz:
 
     answers = []
 
-    for i, q in enumerate(st.session_state.quiz.get("questions", [])):
+    questions = st.session_state.quiz.get("questions", [])
+
+    for i, q in enumerate(questions):
         st.markdown(f"**Q{i+1}. {q['question']}**")
 
+        # Radio returns the option index; grading happens on the server
         choice = st.radio(
             "Select answer:",
-            q["options"],
+            range(len(q["options"])),
+            format_func=lambda j, options=q["options"]: options[j],
             key=f"q{i}"
         )
 
@@ -178,32 +277,34 @@ if st.session_state.quiz:
 
     if st.button("✅ Submit Answers") and not st.session_state.score_submitted:
 
-        correct_answers = [
-            q["answer"] for q in st.session_state.quiz["questions"]
-        ]
-
-        score = sum(
-            1 for a, c in zip(answers, correct_answers) if a == c
-        )
-
-        percent = int((score / len(correct_answers)) * 100)
-
         try:
             r = requests.post(
-                f"{API_URL}/submit-score",
+                f"{API_URL}/submit-answers",
                 json={
                     "user_id": st.session_state.user_id,
-                    "score": percent
+                    "quiz_id": st.session_state.quiz.get("quiz_id"),
+                    "answers": answers
                 }
             )
 
-            feedback = r.json().get("feedback")
+            result = r.json()
 
             st.session_state.score_submitted = True
+            st.session_state.progress_stale = True
 
             st.markdown("### 📊 Performance")
-            st.success(f"Score: {percent}%")
-            st.markdown(feedback)
+
+            if "score" in result:
+                st.success(f"Score: {result['score']}%")
+
+            st.markdown(result.get("feedback"))
+
+            for i, (q, outcome) in enumerate(zip(questions, result.get("results", []))):
+                if not outcome["correct"]:
+                    st.markdown(
+                        f"❌ Q{i+1}: correct answer is "
+                        f"**{q['options'][outcome['answer_index']]}**"
+                    )
 
         except Exception as e:
             st.error(str(e))